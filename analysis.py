@@ -1,7 +1,10 @@
+import argparse
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.preprocessing import MinMaxScaler
+import storage
+from season_ranks import RankIndex
+from quantile_service import QuantileService
 
 def plot_correlation_map(anl_df):
     """
@@ -209,26 +212,29 @@ def plot_position_distribution_by_ppg(target_base, min_ppg=4):
     plt.tight_layout()
     plt.show()
 
-def get_ppg_pos(anl_df, pos):
+def get_ppg_pos(anl_df, pos, ranks=None):
     """
     For each season, finds the PPG of the player at a specific rank (position).
 
     Args:
         anl_df (pd.DataFrame): The analysis DataFrame.
         pos (int): The rank of the player to select (e.g., 50 for the 50th player).
+        ranks (RankIndex): PPG ranks of anl_df by season, built once and reused
+            across calls when given.
 
     Returns:
-        pd.Series: A Series with the PPG for the player at the given
-                   position for each season.
+        float: The PPG of the player at the given position, averaged over the seasons.
     """
-    # Sort by PPG within each season and get the nth player
-    # pos-1 because iloc is 0-indexed
-    return anl_df.groupby('season').apply(lambda x: x.sort_values('PPG', ascending=False).iloc[pos-1], include_groups=False).PPG.mean()
+    if ranks is None:
+        ranks = RankIndex(anl_df, 'PPG', by=['season'])
+    return ranks.mean_at([pos])[pos]
 
 def main():
-    df = pd.read_csv('fantasy_data_history.csv')
+    df = storage.read_table('fantasy_data_history.csv')
 
     anl_df = df[(df.season > '2019-20')]
+    # Each season is sorted by PPG once for all the rank queries below
+    ppg_ranks = RankIndex(anl_df, 'PPG', by=['season'])
 
     avg_players_target = anl_df[(anl_df.Min > 1200) & (anl_df.PPG > 4.4)].groupby('season').size().mean()
     print('Players on target group: ', avg_players_target)
@@ -261,6 +267,10 @@ def main():
         'minutes_last_season_same_team', 'avg_minutes_last_2_seasons_same_team', 
         'avg_minutes_last_3_seasons_same_team'
     ]
+
+    # Feature quantiles of the players above PPG thresholds, by Position and New In Team.
+    # target_base and target_new are its New In Team == False and True groups.
+    target_quantiles = QuantileService(anl_df[anl_df.Min > 1200], features_points + features_minutes, by=['Position', 'New In Team'])
     
     plot_feature_distribution_by_ppg(target_base, features=features_points)
     # Past season Points has a clear separation in our target (PPG)
@@ -270,9 +280,9 @@ def main():
     plot_feature_distribution_by_ppg(target_base, features=features_minutes)
 
     # Past season minutes don't have a clear separation, so I'll use the value of Q1 for avg_minutes_last_2_seasons
-    filter_1 = target_base[(target_base.PPG > 4.4)].avg_points_last_2_seasons.quantile(0.75)
-    filter_2 = target_base[(target_base.PPG > 4.4)].points_last_season.quantile(0.5)
-    filter_3 = target_base[(target_base.PPG > 4.4)].avg_minutes_last_2_seasons.quantile(0.25)
+    filter_1 = target_quantiles.quantile(4.4, 'avg_points_last_2_seasons', 0.75, where={'New In Team': False})
+    filter_2 = target_quantiles.quantile(4.4, 'points_last_season', 0.5, where={'New In Team': False})
+    filter_3 = target_quantiles.quantile(4.4, 'avg_minutes_last_2_seasons', 0.25, where={'New In Team': False})
     print('Avg Points Last 2 Seasons: ', filter_1)
     print('Avg Points Last Season: ', filter_2)
     print('Avg Minutes Last 2 Seasons: ', filter_3)
@@ -300,12 +310,10 @@ def main():
     
     # Filter for FWDs:
     # Split in two types: premium (over Q2 for our 2 features)
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'FWD')].avg_points_last_2_seasons.quantile(0.5)
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'FWD')].points_last_season.quantile(0.5)
+    target_quantiles.query(4, ['avg_points_last_2_seasons', 'points_last_season'], [0.5], where={'Position': 'FWD', 'New In Team': False})
 
     # common (over Q1)
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'FWD')].avg_points_last_2_seasons.quantile(0.25)
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'FWD')].points_last_season.quantile(0.25)
+    target_quantiles.query(4, ['avg_points_last_2_seasons', 'points_last_season'], [0.25], where={'Position': 'FWD', 'New In Team': False})
     
     # Filter for MIDs:
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'MID'], min_ppg=4, features=features_points)
@@ -313,31 +321,28 @@ def main():
     
     # Add minute rule -> important. We have a lot of mids, is crucial to select mids who are playing every game
     # PPG rules -> over Q2
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'MID')].avg_points_last_2_seasons.quantile(0.5)
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'MID')].points_last_season.quantile(0.5)
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'MID')].minutes_last_season.quantile(0.5)
+    target_quantiles.query(4, ['avg_points_last_2_seasons', 'points_last_season', 'minutes_last_season'], [0.5], where={'Position': 'MID', 'New In Team': False})
 
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'DEF'], min_ppg=4, features=features_points)
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'DEF'], min_ppg=4, features=features_minutes)
 
     # minute rule -> not important. Don't differentiate a lot the distributions
     # PPG rules -> over Q5
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'DEF')].avg_points_last_2_seasons.quantile(0.5)
-    target_base[(target_base.PPG > 4) & (target_base.Position == 'DEF')].points_last_season.quantile(0.5)
+    target_quantiles.query(4, ['avg_points_last_2_seasons', 'points_last_season'], [0.5], where={'Position': 'DEF', 'New In Team': False})
     
     # Next steps -> rounds 4/5/6/7
     # GKs need to be analysed
     # We need to open a analysis on New In Team players
     # Keep the analysis split up by positions. 
     # First step, identify our target PPG for this round. I'll use the avg PPG of 70th player per season
-    ppg_70th = get_ppg_pos(anl_df, 70)
+    ppg_70th = get_ppg_pos(anl_df, 70, ppg_ranks)
     print("\nPPG of the 70th player each season:", (ppg_70th))
     
     #Starting by GK
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'GK'], min_ppg=3.8, features=features_points)
     # points_last_season has small influenceon separating data.
     # I'll use Q3 of avg_points_last_2_seasons, as the first split, since it's above Q3 of the other group.
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'GK')].avg_points_last_2_seasons.quantile(0.5)
+    target_quantiles.query(3.8, ['avg_points_last_2_seasons'], [0.5], where={'Position': 'GK', 'New In Team': False})
 
     # For the other positions, first I'll look at the average PPG for New In Team vs Not New in team
     
@@ -358,38 +363,30 @@ def main():
     # MIDs - looking at minutes seems crucial. I'll use Q2 of last season.
     plot_feature_distribution_by_ppg(target_new[target_new.Position == 'MID'], min_ppg=3.8, features=features_points)
     plot_feature_distribution_by_ppg(target_new[target_new.Position == 'MID'], min_ppg=3.8, features=features_minutes)
-    target_new[(target_new.PPG > 3.8) & (target_new.Position == 'MID')].avg_points_last_2_seasons.quantile(0.5)
-    target_new[(target_new.PPG > 3.8) & (target_new.Position == 'MID')].minutes_last_season.quantile(0.5)
+    target_quantiles.query(3.8, ['avg_points_last_2_seasons', 'minutes_last_season'], [0.5], where={'Position': 'MID', 'New In Team': True})
 
     # MIDs - already in league
     # Q1 is good both for avg_points_last_2_seasons and points_last_season
     # However, since a lot of mids can be on the board, I'll use Q2 for premium (4/5) and the rest will be Q1
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'MID'], min_ppg=3.8, features=features_points)
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'MID'], min_ppg=3.8, features=features_minutes)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'MID')].avg_points_last_2_seasons.quantile(0.5)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'MID')].points_last_season.quantile(0.5)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'MID')].minutes_last_season.quantile(0.5)
+    target_quantiles.query(3.8, ['avg_points_last_2_seasons', 'points_last_season', 'minutes_last_season'], [0.5], where={'Position': 'MID', 'New In Team': False})
 
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'MID')].avg_points_last_2_seasons.quantile(0.25)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'MID')].points_last_season.quantile(0.25)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'MID')].minutes_last_season.quantile(0.25)
+    target_quantiles.query(3.8, ['avg_points_last_2_seasons', 'points_last_season', 'minutes_last_season'], [0.25], where={'Position': 'MID', 'New In Team': False})
 
     #FWDS - already in the league
     # splitting data is almost impossible now, using only FWDS already in the league
     # I'll use the minutes from last season (Q2), and Q2 for avg points last 2 seasons.
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'FWD'], min_ppg=3.8, features=features_points)
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'FWD'], min_ppg=3.8, features=features_minutes)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'FWD')].avg_minutes_last_2_seasons.quantile(0.5)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'FWD')].avg_points_last_2_seasons.quantile(0.5)
+    target_quantiles.query(3.8, ['avg_minutes_last_2_seasons', 'avg_points_last_2_seasons'], [0.5], where={'Position': 'FWD', 'New In Team': False})
 
     # For new FWDs:
     # Q2 for points last season and avg 2 seasons
     # Q2 for minutes
     plot_feature_distribution_by_ppg(target_new[target_new.Position == 'FWD'], min_ppg=3.8, features=features_points)
     plot_feature_distribution_by_ppg(target_new[target_new.Position == 'FWD'], min_ppg=3.8, features=features_minutes)
-    target_new[(target_new.PPG > 3.8) & (target_new.Position == 'FWD')].points_last_season.quantile(0.5)
-    target_new[(target_new.PPG > 3.8) & (target_new.Position == 'FWD')].avg_points_last_2_seasons.quantile(0.5)
-    target_new[(target_new.PPG > 3.8) & (target_new.Position == 'FWD')].minutes_last_season.quantile(0.5)
+    target_quantiles.query(3.8, ['points_last_season', 'avg_points_last_2_seasons', 'minutes_last_season'], [0.5], where={'Position': 'FWD', 'New In Team': True})
 
     
     # DEFs
@@ -397,12 +394,11 @@ def main():
     # I'll use Q1 of both groups as threshold for points
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'DEF'], min_ppg=3.8, features=features_points)
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'DEF'], min_ppg=3.8, features=features_minutes)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'DEF')].points_last_season.quantile(0.25)
-    target_base[(target_base.PPG > 3.8) & (target_base.Position == 'DEF')].avg_points_last_2_seasons.quantile(0.25)
+    target_quantiles.query(3.8, ['points_last_season', 'avg_points_last_2_seasons'], [0.25], where={'Position': 'DEF', 'New In Team': False})
 
     # Now GKs, MIDs and DEFs have some options, so I'll work with lowering thresholds
     # FWDs -> trying to find good PPG in lower mins played
-    ppg_100th = get_ppg_pos(anl_df, 100)
+    ppg_100th = get_ppg_pos(anl_df, 100, ppg_ranks)
     print("\nPPG of the 100th player each season:", (ppg_100th))
     # Our target is to find players with >3.5 PPG. Let's see what makes difference to achieve this on DEFs
     
@@ -412,16 +408,14 @@ def main():
     plot_feature_distribution_by_ppg(target_new[target_new.Position == 'DEF'], min_ppg=3.5, features=features_minutes)
     
     # I'll use Q1 in points last season and Q2 in minutes
-    target_new[(target_new.PPG > 3.5) & (target_new.Position == 'DEF')].avg_minutes_last_2_seasons.quantile(0.5)
-    target_new[(target_new.PPG > 3.5) & (target_new.Position == 'DEF')].points_last_season.quantile(0.25)
+    target_quantiles.query(3.5, ['avg_minutes_last_2_seasons', 'points_last_season'], [0.5, 0.25], where={'Position': 'DEF', 'New In Team': True})
 
     # Same analysis for players that aren't new in team
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'DEF'], min_ppg=3.5, features=features_points)
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'DEF'], min_ppg=3.5, features=features_minutes)
     
     # I'll use Q1 in points last season. Minutes aren't a huge differentiator
-    target_base[(target_base.PPG > 3.5) & (target_base.Position == 'DEF')].avg_minutes_last_2_seasons.quantile(0.5)
-    target_base[(target_base.PPG > 3.5) & (target_base.Position == 'DEF')].points_last_season.quantile(0.25)
+    target_quantiles.query(3.5, ['avg_minutes_last_2_seasons', 'points_last_season'], [0.5, 0.25], where={'Position': 'DEF', 'New In Team': False})
 
     # Let's take a look at mifielders
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'MID'], min_ppg=3.5, features=features_points)
@@ -429,19 +423,18 @@ def main():
 
     # Since I'm using a high threshold for minutes for MIDs, now I'll stick with the Q1 for minutes_last_season, that's lower
     # Also I'll use Q1 of points_last_season. To get more outsiders (focus of 7+ picks)
-    target_base[(target_base.PPG > 3.5) & (target_base.Position == 'MID')].minutes_last_season.quantile(0.25)
-    target_base[(target_base.PPG > 3.5) & (target_base.Position == 'MID')].points_last_season.quantile(0.25)
+    target_quantiles.query(3.5, ['minutes_last_season', 'points_last_season'], [0.25], where={'Position': 'MID', 'New In Team': False})
 
     # For FWDs -> most starters are already out. Time to look what players with less than 1500 mins and more than 500 mmins IN THE PREVIOUS SEASON can give
     lower_mins = anl_df[(anl_df.minutes_last_season < 1500) & (anl_df.minutes_last_season > 500)]
+    lower_mins_quantiles = QuantileService(lower_mins, features_points + features_minutes, by=['Position'])
     # Our goal is to find FWDs with few minutes in past season and more minutes in his next season (and points)
     plot_feature_distribution_by_ppg(lower_mins[lower_mins.Position == 'FWD'], min_ppg=3.5, features=features_points)
     plot_feature_distribution_by_ppg(lower_mins[lower_mins.Position == 'FWD'], min_ppg=3.5, features=features_minutes)
 
     # The distributions are slightly similar...
     # Minutes past season (Q3) seems to have some predictability. Also points_last_season can give some insights
-    lower_mins[(lower_mins.PPG > 3.5) & (lower_mins.Position == 'MID')].minutes_last_season.quantile(0.75)
-    lower_mins[(lower_mins.PPG > 3.5) & (lower_mins.Position == 'MID')].points_last_season.quantile(0.5)
+    lower_mins_quantiles.query(3.5, ['minutes_last_season', 'points_last_season'], [0.75, 0.5], where={'Position': 'MID'})
 
     # GKs...
     # A lot still available, so let's do the traditional analysis.
@@ -451,13 +444,14 @@ def main():
     # There is no clear difference there. 
     # Let's use 2500 mins a mins threshold
     # And Q1 points last season
-    target_base[(target_base.PPG > 3.5) & (target_base.Position == 'GK')].points_last_season.quantile(0.25)
+    target_quantiles.query(3.5, ['points_last_season'], [0.25], where={'Position': 'GK', 'New In Team': False})
 
     # Tier 5 -> last tier before selecting only based on initial schedule
-    ppg_125th = get_ppg_pos(anl_df, 125)
+    ppg_125th = get_ppg_pos(anl_df, 125, ppg_ranks)
     print("\nPPG of the 125th player each season:", (ppg_125th))
     # Idea is to get players who performed bad last season, but have some indicators that can get a better performance
     lower_mins = anl_df[(anl_df.points_last_season < 3.5) & (anl_df.minutes_last_season > 800)]
+    lower_mins_quantiles = QuantileService(lower_mins, features_points + features_minutes, by=['Position'])
     
     # Our goal is to find FWDs with few minutes in past season and more minutes in his next season (and points)
     plot_feature_distribution_by_ppg(lower_mins[lower_mins.Position == 'DEF'], min_ppg=3.3, features=features_points)
@@ -465,24 +459,25 @@ def main():
     
     # We have higher Q3 for avg last 2 seasons minutes and a higher Q2 for avg points last season
     # It can indicates to keep an eye on players with some experience
-    lower_mins[(lower_mins.PPG > 3.3) & (lower_mins.Position == 'DEF')].avg_minutes_last_2_seasons.quantile(0.75)
-    lower_mins[(lower_mins.PPG > 3.3) & (lower_mins.Position == 'DEF')].avg_points_last_2_seasons.quantile(0.5)
+    lower_mins_quantiles.query(3.3, ['avg_minutes_last_2_seasons', 'avg_points_last_2_seasons'], [0.75, 0.5], where={'Position': 'DEF'})
 
     # FOR MIDs
     # First idea: low threshold, focused only on past performance for players with more than one season
     # So, using avg_points_last_2_seasons or even avg_points_last_3_seasons
     lower_mins = anl_df[(anl_df.points_last_season < 3.5) & (anl_df.minutes_last_season > 800) & (anl_df.time_in_league > 2)]
+    lower_mins_quantiles = QuantileService(lower_mins, features_points + features_minutes, by=['Position'])
     plot_feature_distribution_by_ppg(lower_mins[lower_mins.Position == 'MID'], min_ppg=3.3, features=features_points)
     plot_feature_distribution_by_ppg(lower_mins[lower_mins.Position == 'MID'], min_ppg=3.3, features=features_minutes)
 
-    lower_mins[(lower_mins.PPG > 3.3) & (lower_mins.Position == 'MID')].avg_points_last_2_seasons.quantile(0.5)
+    lower_mins_quantiles.query(3.3, ['avg_points_last_2_seasons'], [0.5], where={'Position': 'MID'})
     # Idea is to be use a wide threshold, but focused on previous performance for players with more than one season
     # For players with time_in_league <=2, o a different analysis based on last season
     lower_mins = anl_df[(anl_df.points_last_season < 3.5) & (anl_df.minutes_last_season > 800) & (anl_df.time_in_league <= 2)]
+    lower_mins_quantiles = QuantileService(lower_mins, features_points + features_minutes, by=['Position'])
     plot_feature_distribution_by_ppg(lower_mins[lower_mins.Position == 'MID'], min_ppg=3.3, features=features_points)
     plot_feature_distribution_by_ppg(lower_mins[lower_mins.Position == 'MID'], min_ppg=3.3, features=features_minutes)
 
-    lower_mins[(lower_mins.PPG > 3.3) & (lower_mins.Position == 'MID')].points_last_season.quantile(0.5)
+    lower_mins_quantiles.query(3.3, ['points_last_season'], [0.5], where={'Position': 'MID'})
 
     # FOR FWDs
     # Last group, I'll split the analysis
@@ -490,8 +485,8 @@ def main():
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'GK'], min_ppg=3.3, features=features_points)
     plot_feature_distribution_by_ppg(target_base[target_base.Position == 'GK'], min_ppg=3.3, features=features_minutes)
 
-    target_base[(target_base.PPG > 3.3) & (target_base.Position == 'GK')].avg_points_last_2_seasons.quantile(0.25)
-    lower_mins[(lower_mins.PPG > 3.3) & (lower_mins.Position == 'FWD')].points_last_season.quantile(0.75)
+    target_quantiles.query(3.3, ['avg_points_last_2_seasons'], [0.25], where={'Position': 'GK', 'New In Team': False})
+    lower_mins_quantiles.query(3.3, ['points_last_season'], [0.75], where={'Position': 'FWD'})
 
 
 
@@ -505,17 +500,17 @@ def main():
 
 
 
-    ppg_50th = get_ppg_pos(anl_df, 50)
+    ppg_50th = get_ppg_pos(anl_df, 50, ppg_ranks)
     print("\nPPG of the 50th player each season:", (ppg_50th))
 
     
 
-    ppg_50th = get_ppg_pos(anl_df, 100)
+    ppg_50th = get_ppg_pos(anl_df, 100, ppg_ranks)
     print("\nPPG of the 100th player each season:", (ppg_50th))
     
     
     
-    ppg_50th = get_ppg_pos(anl_df, 150)
+    ppg_50th = get_ppg_pos(anl_df, 150, ppg_ranks)
     print("\nPPG of the 150th player each season:", (ppg_50th))
 
     print('Better than 95% of the players?', anl_df[(anl_df.Min > 1200)].PPG.quantile(0.95))
@@ -528,7 +523,10 @@ def main():
     plot_analysis(anl_df, min_ppg=5)
     
 
-if __name__=="__main__": 
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Run the exploratory analysis of the tier thresholds, with interactive plots.')
+    parser.parse_args(argv)
     main()
 
-
+if __name__=="__main__": 
+    command_line()
@@ -0,0 +1,255 @@
+import argparse
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+import player_state
+import process_curr_data
+import rule_engine
+import season_transitions
+import storage
+import team_context
+from data_loader import HISTORY_FILE, PAST_COLUMNS
+from historical_features import calculate_historical_features, calculate_lag_features
+from rule_engine import TIER_SPEC_FILE
+from threshold_sweep import target_mask
+
+POSITION_CODES = {'GK': 1, 'DEF': 2, 'MID': 3, 'FWD': 4}
+
+# Walk-forward: each historical season is tiered as if it were the current one, with
+# features built by process_curr_data from the earlier seasons only, and the tiers
+# are scored against what the players then did in that season.
+#
+# The folds are built the way process_curr_data.main builds the current season from
+# the outputs of a history build, and those outputs are carried from one fold to the
+# next instead of being rebuilt from the past rows:
+# - the transition table, extended by one season per fold with
+#   season_transitions.append_season;
+# - the team context cube of the previous season, from that season's rows;
+# - the player and team states (see player_state.py). A player's history features at a
+#   season only depend on the earlier seasons, so they are computed once, in one pass
+#   over the whole history, and each fold's states are that season's rows. The rolling
+#   means accumulate along a player's whole history, so states rebuilt from a window of
+#   recent seasons could differ in the last bit and move players across thresholds.
+
+def without_manual_adjustments(spec):
+    """
+    Returns a copy of a tier spec without its manual adjustments: name exclusions are
+    dropped, as are rules selecting players by name. They refer to the current season.
+    """
+    spec = copy.deepcopy(spec)
+    for tier in spec['tiers']:
+        tier['rules'] = [rule for rule in tier['rules']
+                         if not any(column == 'Player Name' for column, _, _ in rule['filters'])]
+        for rule in tier['rules']:
+            rule.pop('exclude', None)
+        if 'sheet_order' in tier:
+            names = {rule['name'] for rule in tier['rules']}
+            tier['sheet_order'] = [name for name in tier['sheet_order'] if name in names]
+    return spec
+
+def season_as_current(season_df):
+    """
+    Shapes a historical season like the current-season table read by process_curr_data:
+    Position as the FPL element_type number, and no minutes or PPG yet.
+    """
+    current = season_df[['ID', 'Player Name', 'team_code', 'Position', 'season']].copy()
+    current['Position'] = current['Position'].map(POSITION_CODES)
+    current['Min'] = np.nan
+    current['PPG'] = np.nan
+    return current
+
+def fold_features(past, current):
+    """
+    Builds the features of a season from all the past seasons, as
+    process_curr_data.main does with --full.
+
+    Args:
+        past (pd.DataFrame): Past seasons, with PAST_COLUMNS.
+        current (pd.DataFrame): The season to tier, see season_as_current.
+
+    Returns:
+        pd.DataFrame: The features of the current season rows.
+    """
+    season = current['season'].iloc[0]
+    df = process_curr_data.calculate_new_in_league(current.copy(), past)
+    df = process_curr_data.calculate_new_in_team(df, past)
+    df = process_curr_data.calculate_new_in_league_features(df, past)
+
+    combined_data = pd.concat([past, df], ignore_index=True)
+    combined_data = process_curr_data.calculate_additional_features(combined_data)
+    data_with_hist = calculate_historical_features(combined_data)
+
+    return data_with_hist[data_with_hist['season'] == season].copy()
+
+def lag_table(history):
+    """
+    Computes time_in_league and the history features of every player season in one
+    pass, each from the earlier seasons only.
+
+    Args:
+        history (pd.DataFrame): Player seasons with ID, season, team_code, PPG and Min.
+
+    Returns:
+        pd.DataFrame: ID, season, team_code, time_in_league, PLAYER_FEATURES and
+        TEAM_FEATURES, sorted by ID and season.
+    """
+    df_sorted = history[['ID', 'season', 'team_code', 'PPG', 'Min']].sort_values(['ID', 'season']).reset_index(drop=True)
+    lagged = df_sorted[['ID', 'season', 'team_code']].copy()
+    lagged['time_in_league'] = df_sorted.groupby('ID').cumcount()
+    return lagged.join(calculate_lag_features(df_sorted))
+
+def fold_state(lagged, season):
+    """
+    The player and team states of a season's players as of the end of the previous
+    season, in the shape player_state.state_features reads.
+
+    Returns:
+        tuple: (player state, team state).
+    """
+    rows = lagged[lagged['season'] == season]
+    state = rows[['ID', 'time_in_league'] + player_state.PLAYER_FEATURES].reset_index(drop=True)
+    teams = rows[['ID', 'team_code'] + player_state.TEAM_FEATURES].reset_index(drop=True)
+    return state, teams
+
+def state_fold_features(current, last_season, state, teams, transitions):
+    """
+    Builds the features of a season from the carried state, as process_curr_data.main
+    does from the player state.
+
+    Args:
+        current (pd.DataFrame): The season to tier, see season_as_current.
+        last_season (pd.DataFrame): The previous season's rows, with PAST_COLUMNS.
+        state (pd.DataFrame): The player state of the season, see fold_state.
+        teams (pd.DataFrame): The team state of the season, see fold_state.
+        transitions (pd.DataFrame): The transition table with the season appended.
+
+    Returns:
+        pd.DataFrame: The features of the current season rows.
+    """
+    df = process_curr_data.calculate_new_in_league(current.copy(), last_season, transitions)
+    df = process_curr_data.calculate_new_in_team(df, last_season, transitions)
+
+    cube = team_context.context_cube(last_season)
+    df = process_curr_data.calculate_new_in_league_features(df, last_season, cube)
+    return process_curr_data.calculate_current_features(df, last_season['season'].max(), state, teams, cube)
+
+def score_tiers(features, outcomes, spec, min_ppg=4.4, min_minutes=1200):
+    """
+    Tiers a season and counts the players of each tier and position that made the
+    target group (PPG > min_ppg and Min > min_minutes) that season.
+
+    Returns:
+        pd.DataFrame: season, Tier, Position, players and hits columns.
+    """
+    features = features.reset_index(drop=True)
+    tier, _ = rule_engine.assign_tiers(features, spec)
+    actual = outcomes.set_index('ID').loc[features['ID'], ['PPG', 'Min']].reset_index(drop=True)
+
+    scored = pd.DataFrame({
+        'season': features['season'],
+        'Tier': tier,
+        'Position': features['Position Name'],
+        'hits': target_mask(actual, min_ppg, min_minutes),
+    })
+    scored = scored[scored['Tier'].notna()]
+    return scored.groupby(['season', 'Tier', 'Position'], sort=True) \
+                 .agg(players=('hits', 'size'), hits=('hits', 'sum')).reset_index()
+
+def walk_forward(history, spec, seasons=None, incremental=True):
+    """
+    Runs the walk-forward backtest over historical seasons.
+
+    Args:
+        history (pd.DataFrame): fantasy_data_history.csv.
+        spec (dict): The tier spec.
+        seasons (list): Seasons to tier. Defaults to every season after the first.
+        incremental (bool): Carry the transition table and the player states between
+            folds. If False, every fold rebuilds the features from all the past seasons.
+
+    Returns:
+        pd.DataFrame: Players and hits per season, tier and position.
+    """
+    history = history.drop_duplicates(['ID', 'season'])
+    all_seasons = sorted(history['season'].unique())
+    if seasons is None:
+        seasons = all_seasons[1:]
+    first = all_seasons.index(min(seasons))
+    if first == 0:
+        raise ValueError(f"{all_seasons[0]} is the first season and has no past to build features from")
+
+    if incremental:
+        lagged = lag_table(history)
+        last_season = history[history['season'] == all_seasons[first - 1]][PAST_COLUMNS]
+        transitions = season_transitions.transition_table(last_season)
+
+    results = []
+    # Every season from the first fold on advances the carried state, tiered or not
+    for season in all_seasons[first:all_seasons.index(max(seasons)) + 1]:
+        season_df = history[history['season'] == season]
+        current = season_as_current(season_df)
+        if incremental:
+            transitions = season_transitions.append_season(transitions, current)
+
+        if season in seasons:
+            if incremental:
+                state, teams = fold_state(lagged, season)
+                features = state_fold_features(current, last_season, state, teams, transitions)
+            else:
+                features = fold_features(history[history['season'] < season][PAST_COLUMNS], current)
+            results.append(score_tiers(features, season_df[['ID', 'PPG', 'Min']], spec))
+
+        if incremental:
+            # The season is the previous one of the next fold; append_season only reads
+            # the table's last season
+            transitions = transitions[transitions['season'] == season]
+            last_season = season_df[PAST_COLUMNS]
+
+    return pd.concat(results, ignore_index=True)
+
+def summarize(results):
+    """
+    Adds up players and hits over the folds, per tier and position, with hit rates.
+    """
+    summary = results.groupby(['Tier', 'Position'], sort=True)[['players', 'hits']].sum()
+    totals = results.groupby('Tier', sort=True)[['players', 'hits']].sum()
+    totals['Position'] = 'All'
+    summary = pd.concat([summary.reset_index(), totals.reset_index()], ignore_index=True)
+    summary['hit_rate'] = summary['hits'] / summary['players']
+    return summary.sort_values(['Tier', 'Position'], ignore_index=True)
+
+def main(spec_file=TIER_SPEC_FILE, seasons=None, keep_manual=False, full=False, output=None):
+    """
+    Backtests the tier spec on the historical seasons and prints the hit rates per
+    tier and position.
+    """
+    history = storage.read_table(HISTORY_FILE)
+    spec = rule_engine.load_tier_spec(spec_file)
+    if not keep_manual:
+        spec = without_manual_adjustments(spec)
+
+    start = time.perf_counter()
+    results = walk_forward(history, spec, seasons, incremental=not full)
+    print(f"Walk-forward over {results['season'].nunique()} seasons in {time.perf_counter() - start:.2f}s\n")
+
+    print(results.pivot_table(index='season', columns='Tier', values='hits', aggfunc='sum').fillna(0).astype(int))
+    print()
+    print(summarize(results).to_string(index=False))
+
+    if output:
+        results.to_csv(output, index=False)
+
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Walk-forward backtest of the tier rules on the historical seasons.')
+    parser.add_argument('--spec', default=TIER_SPEC_FILE, help='tier spec file')
+    parser.add_argument('--seasons', nargs='+', help='seasons to tier (default: every season after the first)')
+    parser.add_argument('--keep-manual', action='store_true', help='keep the manual name adjustments of the spec')
+    parser.add_argument('--full', action='store_true', help='rebuild each fold from the whole past instead of the carried state')
+    parser.add_argument('--output', help='CSV file for the per-season results')
+    args = parser.parse_args(argv)
+    main(args.spec, args.seasons, args.keep_manual, args.full, args.output)
+
+if __name__ == '__main__':
+    command_line()
@@ -0,0 +1,95 @@
+"""
+Parse time and peak memory of extracting the current season players from a
+bootstrap-static snapshot: decoding the whole payload and flattening it with
+json_normalize, against streaming the 'elements' array.
+
+The payload is synthetic, with the same shape as the live endpoint (about a hundred
+fields per element, most of them unused here). Run from the repository root:
+    python -m benchmarks.bootstrap_extract --players 700 --scale 10
+"""
+import argparse
+import gzip
+import io
+import json
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+from get_curr_data import columns_to_keep, extract_players
+
+FILLER_FIELDS = 90
+
+def make_payload(n_players, seed=0):
+    """
+    Builds a gzip-compressed synthetic bootstrap-static payload.
+    """
+    rng = random.Random(seed)
+    elements = []
+    for i in range(n_players):
+        element = {
+            'id': i + 1,
+            'code': 100000 + i,
+            'minutes': rng.randint(0, 3420),
+            'points_per_game': f'{rng.uniform(0, 8):.1f}',
+            'web_name': f'Player {i}',
+            'team_code': rng.choice([1, 3, 4, 6, 7, 8, 11, 13, 14, 21, 31, 36, 39, 43, 90, 91, 94]),
+            'element_type': rng.randint(1, 4),
+            'status': rng.choice('aaaadiu'),
+            'news': '',
+        }
+        for j in range(FILLER_FIELDS):
+            element[f'stat_{j}'] = f'{rng.random():.3f}' if j % 2 else rng.randint(0, 500)
+        elements.append(element)
+    payload = {
+        'events': [{'id': gw, 'name': f'Gameweek {gw}', 'finished': False} for gw in range(1, 39)],
+        'teams': [{'id': t, 'code': t, 'name': f'Team {t}'} for t in range(1, 21)],
+        'elements': elements,
+    }
+    return gzip.compress(json.dumps(payload).encode('utf-8'))
+
+def extract_players_normalize(stream):
+    """
+    Previous extraction: decodes the whole payload and flattens every element.
+    """
+    data = json.load(stream)
+    df = pd.json_normalize(data['elements'])
+    df = df[df['status'] != 'u'].copy()
+    df['season'] = '2025-26'
+    return df[columns_to_keep]
+
+def measure(func, compressed):
+    """
+    Returns the wall time, the traced peak memory and the result of func on a fresh stream.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    with gzip.open(io.BytesIO(compressed), 'rb') as stream:
+        result = func(stream)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def main(n_players=700, scales=(1, 10)):
+    for scale in scales:
+        compressed = make_payload(n_players * scale)
+        print(f"{n_players * scale} players, {len(compressed) / 2**20:.1f} MiB compressed")
+
+        results = {}
+        for name, func in [('json_normalize', extract_players_normalize), ('streaming', extract_players)]:
+            elapsed, peak, frame = measure(func, compressed)
+            results[name] = frame
+            print(f"{name:>15}: {elapsed:.3f}s, peak {peak / 2**20:.1f} MiB")
+
+        # Both extractions must write the same CSV
+        expected = results['json_normalize'].to_csv(index=False)
+        assert results['streaming'].to_csv(index=False) == expected
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the bootstrap-static player extraction.')
+    parser.add_argument('--players', type=int, default=700, help='elements in the base payload')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10], help='payload size multipliers')
+    args = parser.parse_args()
+    main(args.players, args.scale)
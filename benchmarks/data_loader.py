@@ -0,0 +1,53 @@
+"""
+Parse time and peak memory of the shared history loader against the previous
+approach of reading every column of each season CSV and narrowing afterwards.
+
+Run from the repository root:
+    python -m benchmarks.data_loader
+"""
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+from data_loader import POSITIONS, get_season_files, load_history
+
+
+def load_history_full_width(all_files):
+    """
+    Previous loader: parses every column of each season, then keeps the ones in use.
+    """
+    cols_to_use = ['code', 'minutes', 'points_per_game', 'total_points', 'birth_date', 'web_name', 'team_code', 'team_join_date', 'element_type']
+    li = []
+    for filename in all_files:
+        df = pd.read_csv(filename, index_col=None, header=0, encoding='utf-8-sig')
+        df.columns = df.columns.str.replace('"', '')
+        df['season'] = os.path.basename(filename).split('_data.csv')[0]
+        li.append(df.reindex(columns=cols_to_use + ['season']))
+    frame = pd.concat(li, axis=0, ignore_index=True)
+    frame['element_type'] = frame['element_type'].map(POSITIONS)
+    return frame
+
+def measure(func, *args):
+    """
+    Returns the wall time, the traced peak memory and the result of func(*args).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def main():
+    all_files = list(get_season_files().values())
+
+    for name, func in [('full width', load_history_full_width), ('schema loader', load_history)]:
+        elapsed, peak, frame = measure(func, all_files)
+        footprint = frame.memory_usage(deep=True).sum()
+        print(f"{name:>14}: {elapsed:.3f}s, peak {peak / 2**20:.1f} MiB, frame {footprint / 2**20:.2f} MiB")
+
+if __name__ == "__main__":
+    main()
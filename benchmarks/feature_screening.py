@@ -0,0 +1,41 @@
+"""
+Wall time and peak memory of the feature screening on synthetic seasons with the
+extra raw columns (xG, bonus, ICT...), for a growing number of seasons. The seasons
+are streamed, so the peak memory should stay flat while the time grows linearly.
+
+Run from the repository root:
+    python -m benchmarks.feature_screening --seasons 9 36 90
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks import synthetic
+from data_loader import get_season_files
+from feature_screening import screen_features
+
+def main(season_counts=(9, 36, 90), n_players=synthetic.BASE_PLAYERS, lags=(1, 2)):
+    for n_seasons in season_counts:
+        with tempfile.TemporaryDirectory() as path:
+            synthetic.write_seasons(synthetic.make_seasons(n_seasons, n_players), path)
+            season_files = get_season_files(path)
+
+            start = time.perf_counter()
+            screen_features(season_files, lags)
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            screening = screen_features(season_files, lags)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        print(f"{n_seasons:>4} seasons x {n_players} players: {elapsed:.2f}s, "
+              f"peak {peak / 2**20:.1f} MiB, {screening['feature'].nunique()} features")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the streamed feature screening.')
+    parser.add_argument('--seasons', type=int, nargs='+', default=[9, 36, 90], help='numbers of synthetic seasons')
+    parser.add_argument('--players', type=int, default=synthetic.BASE_PLAYERS, help='players per season')
+    args = parser.parse_args()
+    main(args.seasons, args.players)
@@ -0,0 +1,125 @@
+"""
+Timing comparison between the legacy per-player iterrows implementation of
+calculate_historical_features and the vectorized one in historical_features.
+
+Run from the repository root:
+    python -m benchmarks.historical_features
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+import build_analysis_data
+from data_loader import load_history
+from historical_features import calculate_historical_features
+
+
+def calculate_historical_features_iterrows(df):
+    """
+    Legacy implementation, kept as the reference for the vectorized engine.
+
+    This includes:
+    - PPG from prior seasons (last 1, avg last 2, avg last 3).
+    - Minutes played in prior seasons (last 1, avg last 2, avg last 3).
+    - Minutes played in prior seasons for the *same team* as the current season.
+
+    Args:
+        df (pd.DataFrame): The DataFrame with player data for all seasons.
+
+    Returns:
+        pd.DataFrame: The DataFrame with all historical columns added.
+    """
+    df_sorted = df.sort_values(by=['ID', 'season'])
+
+    def calculate_player_history(group):
+        # Ensure the group is sorted by season for correct shifting and rolling
+        group = group.sort_values('season')
+
+        # --- Historical PPG ---
+        shifted_ppg = group['PPG'].shift(1)
+        group['points_last_season'] = shifted_ppg
+        group['avg_points_last_2_seasons'] = shifted_ppg.rolling(2, min_periods=1).mean()
+        group['avg_points_last_3_seasons'] = shifted_ppg.rolling(3, min_periods=1).mean()
+
+        # --- Historical Minutes (Overall) ---
+        shifted_min = group['Min'].shift(1)
+        group['minutes_last_season'] = shifted_min
+        group['avg_minutes_last_2_seasons'] = shifted_min.rolling(2, min_periods=1).mean()
+        group['avg_minutes_last_3_seasons'] = shifted_min.rolling(3, min_periods=1).mean()
+
+        # --- Historical Minutes (Same Team) ---
+        same_team_hist_data = []
+        # Iterate through each row (season) of the player's history
+        for index, row in group.iterrows():
+            current_season = row['season']
+            current_team = row['team_code']
+
+            # Get all seasons for this player *before* the current one
+            history = group[group['season'] < current_season]
+
+            # From that history, get only the seasons played at the *same team*
+            same_team_history = history[history['team_code'] == current_team].sort_values('season', ascending=False)
+
+            # Calculate metrics based on this filtered, same-team history
+            if not same_team_history.empty:
+                min_last = same_team_history.head(1)['Min'].iloc[0]
+                # Use .mean() which handles cases with fewer than 2 or 3 seasons gracefully
+                avg_min_2 = same_team_history.head(2)['Min'].mean()
+                avg_min_3 = same_team_history.head(3)['Min'].mean()
+            else:
+                # If no history with this team, all metrics are NaN
+                min_last, avg_min_2, avg_min_3 = np.nan, np.nan, np.nan
+
+            same_team_hist_data.append({
+                'index': index,
+                'minutes_last_season_same_team': min_last,
+                'avg_minutes_last_2_seasons_same_team': avg_min_2,
+                'avg_minutes_last_3_seasons_same_team': avg_min_3
+            })
+
+        # Join the calculated same-team history back to the group
+        if same_team_hist_data:
+            same_team_df = pd.DataFrame(same_team_hist_data).set_index('index')
+            group = group.join(same_team_df)
+
+        return group
+
+    # Apply the complex calculation to each player group
+    # The columns are selected explicitly so the ID column is passed to each group, as in pandas < 3
+    df_with_hist = df_sorted.groupby('ID', group_keys=False)[list(df_sorted.columns)].apply(calculate_player_history)
+
+    return df_with_hist
+
+def time_function(func, df, repeats):
+    """
+    Runs func on a copy of df `repeats` times and returns the best wall time and the last result.
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        df_copy = df.copy()
+        start = time.perf_counter()
+        result = func(df_copy)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(repeats=3):
+    all_data = load_history()
+    all_data = build_analysis_data.calculate_new_in_league(all_data)
+    all_data = build_analysis_data.calculate_new_in_team(all_data)
+    all_data = build_analysis_data.calculate_additional_features(all_data)
+
+    legacy_time, legacy_result = time_function(calculate_historical_features_iterrows, all_data, repeats)
+    vectorized_time, vectorized_result = time_function(calculate_historical_features, all_data, repeats)
+
+    # Both paths must produce the same rows, columns and values
+    pd.testing.assert_frame_equal(legacy_result, vectorized_result, check_exact=True)
+
+    print(f"Rows: {len(all_data)}, players: {all_data['ID'].nunique()}")
+    print(f"iterrows (legacy): {legacy_time:.3f}s")
+    print(f"vectorized:        {vectorized_time:.3f}s")
+    print(f"speedup:           {legacy_time / vectorized_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
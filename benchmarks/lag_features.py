@@ -0,0 +1,64 @@
+"""
+Wall time of the declared lag features on synthetic seasons: the history features
+of calculate_historical_features alone, then with the same windows declared on every
+extra raw column (xG, bonus, ICT...). The extended declarations share the sort and
+the groupings of the base ones, so they cost one shift and one rolling per window of
+each added column rather than another pass over the history.
+
+Run from the repository root:
+    python -m benchmarks.lag_features --scale 1 10
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks import synthetic
+from historical_features import HISTORICAL_FEATURES, calculate_historical_features
+
+def extended_features(columns=synthetic.EXTRA_COLUMNS):
+    """
+    HISTORICAL_FEATURES plus last season and 2/3 season means of each column, by player.
+    """
+    features = dict(HISTORICAL_FEATURES)
+    for column in columns:
+        features[f'{column}_last_season'] = (column, 'last', 1, ('ID',))
+        features[f'avg_{column}_last_2_seasons'] = (column, 'mean', 2, ('ID',))
+        features[f'avg_{column}_last_3_seasons'] = (column, 'mean', 3, ('ID',))
+    return features
+
+def synthetic_history(n_seasons, n_players, seed=0):
+    """
+    Synthetic seasons in one frame, with the pipeline names of the schema columns.
+    """
+    frames = []
+    for season, frame in synthetic.make_seasons(n_seasons, n_players, seed=seed).items():
+        frames.append(frame.rename(columns={'code': 'ID', 'minutes': 'Min', 'points_per_game': 'PPG'}).assign(season=season))
+    return pd.concat(frames, ignore_index=True)
+
+def best_time(df, features, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = calculate_historical_features(df, features)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(scales=(1, 10), repeats=3):
+    extended = extended_features()
+    for scale in scales:
+        df = synthetic_history(synthetic.BASE_SEASONS, synthetic.BASE_PLAYERS * scale)
+        base_time, base = best_time(df, HISTORICAL_FEATURES, repeats)
+        extended_time, result = best_time(df, extended, repeats)
+
+        # The base columns do not depend on the other declarations
+        pd.testing.assert_frame_equal(base, result[base.columns], check_exact=True)
+        print(f"{len(df):>8} rows: {len(HISTORICAL_FEATURES)} features {base_time:.3f}s, "
+              f"{len(extended)} features {extended_time:.3f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the declared lag features.')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10], help='multiples of the history players per season')
+    parser.add_argument('--repeats', type=int, default=3, help='runs per timing, the best is kept')
+    args = parser.parse_args()
+    main(args.scale, args.repeats)
@@ -0,0 +1,75 @@
+"""
+Wall time of the influential_player_left membership test: the previous row-wise
+apply (rebuilding the set of lost (team, position) pairs on every row) against the
+hashed lookup of team_context.team_position_isin, on the current season squad
+repeated to grow it. Both must flag the same rows.
+
+Run from the repository root:
+    python -m benchmarks.membership --scale 1 10 100
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import process_curr_data
+import storage
+import team_context
+from data_loader import HISTORY_FILE, PAST_COLUMNS, load_current_season
+
+def isin_apply(current_season_df, pairs):
+    """
+    Previous implementation: one Python call per row, each building the set of pairs.
+    """
+    return current_season_df.apply(
+        lambda row: tuple(row[['team_code', 'Position Name']]) in set(map(tuple, pairs.to_numpy())),
+        axis=1
+    ).to_numpy(dtype=bool)
+
+def isin_hashed(current_season_df, pairs):
+    return team_context.team_position_isin(current_season_df, pairs, ['team_code', 'Position Name'])
+
+def lost_pairs(current_season_df, past_data):
+    """
+    The (team, position) pairs that lost an influential player, as in
+    process_curr_data.calculate_new_in_league_features.
+    """
+    last_season = past_data[past_data['season'] == past_data['season'].max()]
+    influential = last_season[((last_season['PPG'] > 3) & (last_season['Min'] > 1500)) | (last_season['Min'] > 2300)].copy()
+    influential['current_team_code'] = influential['ID'].map(current_season_df.drop_duplicates('ID').set_index('ID')['team_code'])
+    left = influential[(influential['current_team_code'] != influential['team_code']) | influential['current_team_code'].isnull()]
+    return left[['team_code', 'Position']].rename(columns={'Position': 'Position Name'}).drop_duplicates()
+
+def main(scales=(1, 10), repeats=3):
+    past_data = storage.read_table(HISTORY_FILE, columns=PAST_COLUMNS)
+    current = load_current_season()
+    current['Position Name'] = current['Position'].map({1: 'GK', 2: 'DEF', 3: 'MID', 4: 'FWD'})
+    pairs = lost_pairs(current, past_data)
+
+    for scale in scales:
+        squad = pd.concat([current] * scale, ignore_index=True)
+        timings = {}
+        for name, func in [('apply', isin_apply), ('hashed', isin_hashed)]:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                flags = func(squad, pairs)
+            timings[name] = ((time.perf_counter() - start) / repeats, flags)
+
+        assert np.array_equal(timings['apply'][1], timings['hashed'][1])
+        apply_time, hashed_time = timings['apply'][0], timings['hashed'][0]
+        print(f"{len(squad):>7} rows: apply {apply_time * 1000:9.1f} ms, hashed {hashed_time * 1000:6.2f} ms ({apply_time / hashed_time:.0f}x)")
+
+    # The full current season features, as written by process_curr_data
+    df = process_curr_data.calculate_new_in_league(current.drop(columns=['Position Name']), past_data)
+    df = process_curr_data.calculate_new_in_team(df, past_data)
+    start = time.perf_counter()
+    process_curr_data.calculate_new_in_league_features(df, past_data)
+    print(f"calculate_new_in_league_features: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the team/position membership test.')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10], help='copies of the current season squad')
+    parser.add_argument('--repeats', type=int, default=3, help='runs averaged per timing')
+    args = parser.parse_args()
+    main(args.scale, args.repeats)
@@ -0,0 +1,53 @@
+"""
+Scaling of the history loader over a list of worker counts, for thread and
+process pools. Every run must return the same frame as the serial load.
+
+Run from the repository root:
+    python -m benchmarks.parallel_loader [--workers 1 2 4] [--repeats R]
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from data_loader import get_season_files, load_history
+
+
+def best_time(all_files, workers, executor, repeats):
+    """
+    Returns the best wall time over `repeats` loads and the last loaded frame.
+    """
+    best = float('inf')
+    frame = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frame = load_history(all_files, workers=workers, executor=executor)
+        best = min(best, time.perf_counter() - start)
+    return best, frame
+
+DEFAULT_WORKERS = [1, 2, 4]
+
+def main(worker_counts=DEFAULT_WORKERS, repeats=3):
+    all_files = list(get_season_files().values())
+    cpus = os.cpu_count() or 1
+
+    serial_time, serial_frame = best_time(all_files, 1, 'thread', repeats)
+    print(f"{len(all_files)} season files, {cpus} CPUs, serial: {serial_time:.3f}s")
+    if any(workers > cpus for workers in worker_counts):
+        print(f"Worker counts above {cpus} share the CPUs, so they measure pool overhead rather than speedup.")
+
+    for executor in ['thread', 'process']:
+        for workers in worker_counts:
+            if workers <= 1:
+                continue
+            elapsed, frame = best_time(all_files, workers, executor, repeats)
+            pd.testing.assert_frame_equal(frame, serial_frame)
+            print(f"{executor:>7} x{workers:<3}: {elapsed:.3f}s ({serial_time / elapsed:.2f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark parallel season loading.')
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKERS, help='worker counts to compare with the serial load')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    main(args.workers, args.repeats)
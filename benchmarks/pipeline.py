@@ -0,0 +1,166 @@
+"""
+Wall time and peak memory of every pipeline stage on synthetic history at growing
+scales, from loading the season files to the tier filters.
+
+Each scale multiplies either the seasons or the players per season of the real
+history_data (9 seasons of about 720 players). Results are appended to a JSON lines
+file with the commit they were measured on, so a stage getting slower or bigger
+shows up against the runs of earlier commits.
+
+Run from the repository root:
+    python -m benchmarks.pipeline --scale 1 10 100 --axis seasons players
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import build_analysis_data
+import rule_engine
+from benchmarks.synthetic import BASE_PLAYERS, BASE_SEASONS, make_seasons, write_seasons
+from data_loader import load_history
+from historical_features import calculate_historical_features
+from rule_based_filtering import apply_filters
+from rule_engine import TIER_SPEC_FILE
+
+RESULTS_FILE = os.path.join('benchmarks', 'results', 'pipeline.jsonl')
+
+def git_commit():
+    """
+    Returns the short hash of the checked out commit, with a '+' if the tree has changes.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if dirty else '')
+
+def filter_tiers(data, spec):
+    """
+    Applies every rule of the tier spec to its position rows with apply_filters, as
+    the tier sweep and backtest do on historical seasons. Rules on columns missing
+    from data are skipped.
+    """
+    data = data.assign(**{spec.get('position_column', 'Position'): data['Position']})
+    position_rows = rule_engine.group_rows(data, 'Position')
+    selected = []
+    for tier in spec['tiers']:
+        for rule in tier['rules']:
+            if not rule['filters'] or any(column not in data.columns for column, _, _ in rule['filters']):
+                continue
+            columns, relationships, values = zip(*rule['filters'])
+            for position in rule.get('positions') or list(position_rows):
+                if position in position_rows:
+                    selected.append(apply_filters(data, list(columns), list(values), list(relationships), position_rows[position]))
+    return selected
+
+def measure_stage(func, data):
+    """
+    Returns the wall time, the traced peak memory and the result of func(data).
+
+    tracemalloc slows allocations down, so the time comes from a separate untraced run.
+    """
+    start = time.perf_counter()
+    func(data)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def run_stages(all_files, spec):
+    """
+    Runs the pipeline stages in order, each on the output of the previous one.
+
+    Returns:
+        list: (stage, wall seconds, peak traced bytes, output rows) for each stage.
+    """
+    stages = [
+        ('load_history', lambda _: load_history(all_files)),
+        ('calculate_new_in_league', build_analysis_data.calculate_new_in_league),
+        ('calculate_new_in_team', build_analysis_data.calculate_new_in_team),
+        ('calculate_additional_features', build_analysis_data.calculate_additional_features),
+        ('calculate_historical_features', calculate_historical_features),
+        ('apply_filters', lambda df: filter_tiers(df, spec)),
+    ]
+    timings = []
+    data = None
+    for name, func in stages:
+        elapsed, peak, result = measure_stage(func, data)
+        rows = sum(len(frame) for frame in result) if isinstance(result, list) else len(result)
+        timings.append((name, elapsed, peak, rows))
+        if not isinstance(result, list):
+            data = result
+    return timings
+
+def load_results(path=RESULTS_FILE):
+    """
+    Reads the recorded runs. Returns an empty list if there are none.
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def previous_run(records, commit, axis, scale, stage):
+    """
+    Returns the latest record of a stage at an axis and scale measured on another commit.
+    """
+    for record in reversed(records):
+        if record['commit'] != commit and record['axis'] == axis and record['scale'] == scale and record['stage'] == stage:
+            return record
+    return None
+
+def main(scales=(1, 10, 100), axes=('seasons', 'players'), output=RESULTS_FILE, seed=0):
+    spec = rule_engine.load_tier_spec(TIER_SPEC_FILE)
+    commit = git_commit()
+    history = load_results(output)
+    run_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    records = []
+    for axis in axes:
+        for scale in scales:
+            n_seasons = BASE_SEASONS * scale if axis == 'seasons' else BASE_SEASONS
+            n_players = BASE_PLAYERS * scale if axis == 'players' else BASE_PLAYERS
+            with tempfile.TemporaryDirectory() as path:
+                all_files = write_seasons(make_seasons(n_seasons, n_players, seed=seed), path)
+                timings = run_stages(all_files, spec)
+
+            print(f"\n{axis} x{scale}: {n_seasons} seasons of {n_players} players")
+            for stage, elapsed, peak, rows in timings:
+                record = {
+                    'commit': commit, 'run_at': run_at, 'python': platform.python_version(),
+                    'axis': axis, 'scale': scale, 'seasons': n_seasons, 'players': n_players,
+                    'stage': stage, 'seconds': elapsed, 'peak_bytes': peak, 'rows': rows,
+                }
+                records.append(record)
+
+                line = f"{stage:>30}: {elapsed:8.3f}s, peak {peak / 2**20:8.1f} MiB, {rows:>9} rows"
+                before = previous_run(history, commit, axis, scale, stage)
+                if before is not None:
+                    line += f"  ({elapsed / before['seconds']:.2f}x time, {peak / max(before['peak_bytes'], 1):.2f}x memory vs {before['commit']})"
+                print(line)
+
+    if output:
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'a') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages on synthetic history.')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100], help='multiples of the real history size')
+    parser.add_argument('--axis', nargs='+', default=['seasons', 'players'], choices=['seasons', 'players'],
+                        help='scale the number of seasons, of players per season, or both in turn')
+    parser.add_argument('--output', default=RESULTS_FILE, help='JSON lines file the results are appended to')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the synthetic history')
+    args = parser.parse_args()
+    main(args.scale, args.axis, args.output, args.seed)
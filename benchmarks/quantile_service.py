@@ -0,0 +1,61 @@
+"""
+Wall time of target-group feature quantiles over a grid of positions, New In Team,
+PPG thresholds, features and quantiles: one boolean mask, filtered copy and
+.quantile() per cell, as in analysis.main, against one QuantileService query.
+Both must give the same values.
+
+Run from the repository root:
+    python -m benchmarks.quantile_service
+"""
+import argparse
+import time
+
+import numpy as np
+
+import storage
+from historical_features import HISTORICAL_FEATURES
+from quantile_service import QuantileService
+
+POSITIONS = ['GK', 'DEF', 'MID', 'FWD']
+THRESHOLDS = [3.3, 3.5, 3.8, 4, 4.4, 5]
+QUANTILES = [0.25, 0.5, 0.75]
+
+def masked_quantiles(target, features):
+    values = []
+    for position in POSITIONS:
+        for new_in_team in [False, True]:
+            base = target[target['New In Team'] == new_in_team]
+            for min_ppg in THRESHOLDS:
+                for feature in features:
+                    for q in QUANTILES:
+                        values.append(base[(base.PPG > min_ppg) & (base.Position == position)][feature].quantile(q))
+    return np.array(values)
+
+def service_quantiles(target, features):
+    service = QuantileService(target, features, by=['Position', 'New In Team'])
+    table = service.query(THRESHOLDS, features, QUANTILES, where={'Position': POSITIONS, 'New In Team': [False, True]})
+    # In the grid order of masked_quantiles
+    table['position_order'] = table['Position'].map({position: i for i, position in enumerate(POSITIONS)})
+    table = table.sort_values(['position_order', 'New In Team'], kind='stable')
+    return table['value'].to_numpy()
+
+def main():
+    df = storage.read_table('fantasy_data_history.csv')
+    anl_df = df[(df.season > '2019-20')]
+    target = anl_df[anl_df.Min > 1200]
+    features = list(HISTORICAL_FEATURES)
+
+    start = time.perf_counter()
+    expected = masked_quantiles(target, features)
+    masked_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = service_quantiles(target, features)
+    service_time = time.perf_counter() - start
+
+    assert np.array_equal(expected, result, equal_nan=True)
+    print(f"{len(expected)} quantiles: masks {masked_time:.3f}s, service {service_time:.3f}s ({masked_time / service_time:.0f}x)")
+
+if __name__ == "__main__":
+    argparse.ArgumentParser(description='Benchmark the target-group quantile queries.').parse_args()
+    main()
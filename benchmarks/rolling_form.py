@@ -0,0 +1,67 @@
+"""
+Wall time of the gameweek form features (cumulative-sum differences) against a
+groupby().rolling() sum, for growing window lengths, on synthetic gameweek rows.
+
+Run from the repository root:
+    python -m benchmarks.rolling_form --players 5000 --seasons 5
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from gameweek_history import calculate_form_features
+
+def make_gameweeks(n_players, n_seasons, seed=0):
+    """
+    Builds synthetic stored gameweeks: every player plays every gameweek of every season.
+    """
+    rng = np.random.default_rng(seed)
+    seasons = [f'{2016 + i}-{17 + i}' for i in range(n_seasons)]
+    n = n_players * n_seasons * 38
+    minutes = rng.choice([0, 0, 20, 60, 90], size=n).astype('int16')
+    frame = pd.DataFrame({
+        'ID': np.repeat(np.arange(n_players, dtype='int32'), n_seasons * 38),
+        'season': np.tile(np.repeat(seasons, 38), n_players),
+        'GW': np.tile(np.arange(1, 39, dtype='int8'), n_players * n_seasons),
+        'Min': minutes,
+        'Pts': np.where(minutes > 0, rng.integers(0, 12, size=n), 0).astype('int16'),
+        'Starts': (minutes >= 60).astype('float32'),
+        'Fixtures': np.int8(1),
+        'Apps': (minutes > 0).astype('int8'),
+    })
+    frame['season'] = frame['season'].astype(pd.CategoricalDtype(seasons, ordered=True))
+    return frame
+
+def rolling_form(gameweeks, window):
+    """
+    Reference: windowed sums with groupby().rolling(), whose cost grows with the window.
+    """
+    df = gameweeks.sort_values(['ID', 'season', 'GW']).reset_index(drop=True)
+    sums = df.groupby(['ID', 'season'], observed=True)[['Pts', 'Min', 'Fixtures', 'Apps']] \
+             .rolling(window, min_periods=1).sum().reset_index(drop=True)
+    return sums['Pts'] / sums['Apps'].replace(0, np.nan)
+
+def main(n_players=5000, n_seasons=5, windows=(3, 10, 38)):
+    gameweeks = make_gameweeks(n_players, n_seasons)
+    print(f"{len(gameweeks)} gameweek rows")
+
+    for window in windows:
+        start = time.perf_counter()
+        features = calculate_form_features(gameweeks, [window])
+        cumsum_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = rolling_form(gameweeks, window)
+        rolling_time = time.perf_counter() - start
+
+        assert np.allclose(features[f'PPG_last_{window}_GW'], expected, equal_nan=True)
+        print(f"window {window:>2}: cumsum {cumsum_time:.3f}s, rolling {rolling_time:.3f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the gameweek form features.')
+    parser.add_argument('--players', type=int, default=5000, help='synthetic players')
+    parser.add_argument('--seasons', type=int, default=5, help='synthetic seasons')
+    args = parser.parse_args()
+    main(args.players, args.seasons)
@@ -0,0 +1,97 @@
+"""
+Wall time of the tier filters: the previous apply_filters (one boolean indexing per
+predicate, on a fresh per-position slice) against compiled rules evaluated on cached
+per-position row positions, and of a full tier assignment from tier_rules.json.
+
+Run from the repository root:
+    python -m benchmarks.rule_engine --scale 1 10 100
+"""
+import argparse
+import time
+
+import pandas as pd
+
+import rule_engine
+import storage
+
+# (position, columns, values, relationships), shaped like the tier rules of rule_based_filtering.main
+RULES = [
+    (4, ['New In Team', 'points_last_season', 'avg_points_last_2_seasons', 'avg_minutes_last_2_seasons'], [False, 4.1, 4.2, 1736], ['==', '>=', '>=', '>=']),
+    (3, ['New In Team', 'points_last_season', 'avg_points_last_2_seasons', 'minutes_last_season'], [False, 4.2, 3.9, 2454], ['==', '>=', '>=', '>=']),
+    (2, ['New In Team', 'points_last_season', 'avg_points_last_2_seasons', 'minutes_last_season'], [False, 3.9, 3.85, 1200], ['==', '>=', '>=', '>=']),
+    (1, ['New In Team', 'avg_points_last_2_seasons', 'minutes_last_season'], [False, 3.95, 1200], ['==', '>=', '>=']),
+    (3, ['New In Team', 'time_in_league', 'points_last_season', 'minutes_last_season'], [False, 2, 3, 1000], ['==', '<=', '>=', '>=']),
+    (2, ['team_code', 'points_last_season'], [[3, 14, 43], 3.0], ['not in', '>=']),
+    (4, ['team_code', 'Min'], [[3, 14, 43, 8], 0], ['in', '>']),
+]
+
+def apply_filters_legacy(data, filters_columns=[], filters_values=[], relationships=[]):
+    """
+    Previous apply_filters: copies the frame and indexes it once per predicate.
+    """
+    data_filtered = data.copy()
+    for i, column in enumerate(filters_columns):
+        value = filters_values[i]
+        relationship = relationships[i]
+        if relationship == '>':
+            data_filtered = data_filtered[data_filtered[column] > value]
+        elif relationship == '<':
+            data_filtered = data_filtered[data_filtered[column] < value]
+        elif relationship == '>=':
+            data_filtered = data_filtered[data_filtered[column] >= value]
+        elif relationship == '<=':
+            data_filtered = data_filtered[data_filtered[column] <= value]
+        elif relationship == '==':
+            data_filtered = data_filtered[data_filtered[column] == value]
+        elif relationship == '!=':
+            data_filtered = data_filtered[data_filtered[column] != value]
+        elif relationship == 'in':
+            data_filtered = data_filtered[data_filtered[column].isin(value)]
+        elif relationship == 'not in':
+            data_filtered = data_filtered[~data_filtered[column].isin(value)]
+    return data_filtered
+
+def run_legacy(data):
+    return [apply_filters_legacy(data[data.Position == position], columns, values, relationships)
+            for position, columns, values, relationships in RULES]
+
+def run_compiled(data):
+    position_rows = rule_engine.group_rows(data, 'Position')
+    results = []
+    for position, columns, values, relationships in RULES:
+        steps = rule_engine.compile_rule(columns, values, relationships)
+        results.append(rule_engine.select(data, steps, position_rows[position]))
+    return results
+
+def main(scales=(1, 10, 100), repeats=5):
+    base = storage.read_table('25_26_data_parsed.csv')
+    spec = rule_engine.load_tier_spec('tier_rules.json')
+
+    for scale in scales:
+        data = pd.concat([base] * scale, ignore_index=True)
+        timings = {}
+        for name, func in [('legacy', run_legacy), ('compiled', run_compiled)]:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                results = func(data)
+            timings[name] = (time.perf_counter() - start) / repeats
+            if name == 'legacy':
+                expected = results
+
+        for result, reference in zip(results, expected):
+            pd.testing.assert_frame_equal(result, reference)
+        print(f"{len(data):>7} rows: legacy {timings['legacy'] * 1000:.1f} ms, compiled {timings['compiled'] * 1000:.1f} ms")
+
+        # Full tier assignment from the spec file, as run by rule_based_filtering.main
+        data['Position Name'] = data.Position.map({1: 'GK', 2: 'DEF', 3: 'MID', 4: 'FWD'})
+        start = time.perf_counter()
+        for _ in range(repeats):
+            rule_engine.assign_tiers(data, spec)
+        print(f"{'':>13}assign_tiers {(time.perf_counter() - start) / repeats * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the tier filters.')
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100], help='copies of the current season table')
+    parser.add_argument('--repeats', type=int, default=5, help='runs averaged per timing')
+    args = parser.parse_args()
+    main(args.scale, args.repeats)
@@ -0,0 +1,46 @@
+"""
+Wall time of replacement-level PPG queries: the previous get_ppg_pos, which sorts
+every season again for each rank, against one RankIndex answering all the ranks.
+Both must give the same averages.
+
+Run from the repository root:
+    python -m benchmarks.season_ranks --ranks 50 70 100 125 150
+"""
+import argparse
+import time
+
+import numpy as np
+
+import storage
+from season_ranks import RankIndex
+
+def get_ppg_pos_apply(anl_df, pos):
+    """
+    Previous implementation of analysis.get_ppg_pos.
+    """
+    return anl_df.groupby('season').apply(lambda x: x.sort_values('PPG', ascending=False).iloc[pos-1], include_groups=False).PPG.mean()
+
+def main(ranks=(50, 70, 100, 125, 150), all_ranks=700):
+    df = storage.read_table('fantasy_data_history.csv')
+    anl_df = df[(df.season > '2019-20')]
+
+    start = time.perf_counter()
+    expected = [get_ppg_pos_apply(anl_df, rank) for rank in ranks]
+    apply_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = RankIndex(anl_df, 'PPG', by=['season']).mean_at(ranks)
+    index_time = time.perf_counter() - start
+
+    assert np.array_equal(expected, result.to_numpy())
+    print(f"{len(ranks)} ranks: apply {apply_time * 1000:.1f} ms, rank index {index_time * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    RankIndex(anl_df, 'PPG', by=['season', 'Position']).mean_at(np.arange(1, all_ranks + 1))
+    print(f"ranks 1-{all_ranks} by position: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the PPG rank queries.')
+    parser.add_argument('--ranks', type=int, nargs='+', default=[50, 70, 100, 125, 150], help='ranks to query')
+    args = parser.parse_args()
+    main(args.ranks)
@@ -0,0 +1,57 @@
+"""
+Import time of each cli.py command, measured with `python -X importtime` in a fresh
+interpreter: the total time of the imports the command pays before running, and which
+of the heavy plotting/statistics packages it pulls in.
+
+Run from the repository root:
+    python -m benchmarks.startup --repeats 5
+"""
+import argparse
+import subprocess
+import sys
+
+import cli
+
+HEAVY_PACKAGES = ['matplotlib', 'seaborn', 'scipy', 'sklearn']
+
+def parse_importtime(stderr):
+    """
+    Parses -X importtime output.
+
+    Returns:
+        tuple: (total import time in ms, set of top-level packages imported).
+    """
+    total_us = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module importing them
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+        packages.add(name.strip().split('.')[0])
+    return total_us / 1000, packages
+
+def command_import_time(command):
+    """
+    Imports of a command in a fresh interpreter, as cli.main does before running it.
+    """
+    code = f"import cli, importlib; importlib.import_module(cli.COMMANDS[{command!r}][0])"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+def main(commands=None, repeats=3):
+    commands = commands or list(cli.COMMANDS)
+    for command in commands:
+        runs = [command_import_time(command) for _ in range(repeats)]
+        best = min(total for total, _ in runs)
+        heavy = sorted(package for package in HEAVY_PACKAGES if package in runs[0][1])
+        print(f"{command:<12}{best:8.1f} ms  heavy imports: {', '.join(heavy) or '-'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the import time of the cli.py commands.')
+    parser.add_argument('--command', nargs='+', choices=list(cli.COMMANDS), help='commands to measure (default: all)')
+    parser.add_argument('--repeats', type=int, default=3, help='runs per command, the fastest is kept')
+    args = parser.parse_args()
+    main(args.command, args.repeats)
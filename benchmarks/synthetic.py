@@ -0,0 +1,106 @@
+"""
+Synthetic season files shaped like history_data, for benchmarks at scales the real
+data does not reach.
+
+Every season keeps most of the previous season's players, moves some of them to
+another team and signs new ones, so New In League/Team and the same-team history
+see the same kind of churn as the real seasons.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import POSITIONS
+
+# history_data has 9 seasons of about 720 players each, at 20 teams
+BASE_SEASONS = 9
+BASE_PLAYERS = 720
+TEAM_CODES = [1, 2, 3, 4, 6, 7, 8, 11, 14, 17, 21, 31, 36, 39, 43, 54, 56, 90, 91, 94]
+
+# Numeric raw columns written next to the schema ones, as in the raw players files
+EXTRA_COLUMNS = ['goals_scored', 'assists', 'bonus', 'bps', 'ict_index', 'expected_goals', 'expected_assists']
+
+def season_names(n_seasons, last_start=2024):
+    """
+    Season names ending at last_start, e.g. ['2023-24', '2024-25'] for 2 seasons.
+    Years stay 4 digits for up to a thousand seasons, so names sort like the real ones.
+    """
+    return [f'{year}-{(year + 1) % 100:02d}' for year in range(last_start - n_seasons + 1, last_start + 1)]
+
+def make_seasons(n_seasons=BASE_SEASONS, n_players=BASE_PLAYERS, retention=0.8, transfer_rate=0.1, seed=0):
+    """
+    Builds raw season frames with the columns of PLAYER_SCHEMA plus EXTRA_COLUMNS.
+
+    Args:
+        n_seasons (int): Number of seasons.
+        n_players (int): Players per season.
+        retention (float): Share of a season's players still in the league the next season.
+        transfer_rate (float): Share of the retained players moving to another team.
+        seed (int): Random seed.
+
+    Returns:
+        dict: Season name -> raw DataFrame, in season order.
+    """
+    rng = np.random.default_rng(seed)
+    teams = np.array(TEAM_CODES, dtype='int16')
+    next_id = 1
+
+    ids = np.arange(next_id, next_id + n_players)
+    next_id += n_players
+    team = rng.choice(teams, size=n_players)
+    position = rng.integers(1, len(POSITIONS) + 1, size=n_players)
+
+    seasons = {}
+    for season in season_names(n_seasons):
+        n = len(ids)
+        minutes = np.where(rng.random(n) < 0.3, 0, rng.integers(1, 3421, size=n))
+        starts = minutes / 90
+        ppg = np.where(minutes > 0, np.round(rng.gamma(2.0, 1.2, size=n), 1), 0.0)
+        frame = pd.DataFrame({
+            'code': ids,
+            'minutes': minutes,
+            'points_per_game': ppg,
+            'total_points': np.round(ppg * np.ceil(starts)).astype('int64'),
+            'birth_date': '1998-01-01',
+            'web_name': [f'Player {i}' for i in ids],
+            'team_code': team,
+            'team_join_date': f'{season[:4]}-07-01',
+            'element_type': position,
+        })
+        frame['goals_scored'] = rng.poisson(starts * np.array([0, 0.02, 0.15, 0.35])[position - 1])
+        frame['assists'] = rng.poisson(starts * 0.08)
+        frame['bonus'] = rng.poisson(starts * 0.15)
+        frame['bps'] = np.round(starts * rng.normal(18, 5, size=n)).astype('int64')
+        frame['ict_index'] = np.round(starts * rng.gamma(2.0, 2.5, size=n), 1)
+        frame['expected_goals'] = np.round(frame['goals_scored'] * rng.uniform(0.6, 1.4, size=n), 2)
+        frame['expected_assists'] = np.round(frame['assists'] * rng.uniform(0.6, 1.4, size=n), 2)
+        seasons[season] = frame
+
+        # Next season: keep most players, move some of them, fill up with new players
+        kept = rng.random(n) < retention
+        ids, team, position = ids[kept], team[kept], position[kept]
+        moved = rng.random(len(ids)) < transfer_rate
+        team = np.where(moved, rng.choice(teams, size=len(ids)), team)
+        n_new = n_players - len(ids)
+        ids = np.concatenate([ids, np.arange(next_id, next_id + n_new)])
+        next_id += n_new
+        team = np.concatenate([team, rng.choice(teams, size=n_new)])
+        position = np.concatenate([position, rng.integers(1, len(POSITIONS) + 1, size=n_new)])
+
+    return seasons
+
+def write_seasons(seasons, path):
+    """
+    Writes season frames as history_data style files, '<season>_data.csv' in path.
+
+    Returns:
+        list: The files written, in season order.
+    """
+    os.makedirs(path, exist_ok=True)
+    files = []
+    for season, frame in seasons.items():
+        filename = os.path.join(path, f'{season}_data.csv')
+        frame.to_csv(filename)
+        files.append(filename)
+    return files
@@ -0,0 +1,132 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SNAPSHOT_DIR = os.path.join('curr_data', 'snapshots')
+SNAPSHOT_PREFIX = 'bootstrap-static'
+
+# Bytes of the response body read and compressed at a time
+CHUNK_SIZE = 64 * 1024
+
+# Each response body is kept gzip-compressed as <prefix>-<UTC timestamp>.json.gz, and
+# latest.json records the hash and HTTP validators of the newest snapshot.
+
+def create_session(pool_size=4, retries=3):
+    """
+    Creates a pooled requests session that retries failed requests with backoff.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def load_latest(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Loads the metadata of the newest snapshot. Returns None if there is none.
+    """
+    path = os.path.join(snapshot_dir, 'latest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def fetch(session, url, latest=None, timeout=30):
+    """
+    Performs a conditional GET with the validators of the newest snapshot.
+
+    The body is not read yet: save_snapshot streams it to disk. The response should be
+    closed (or used as a context manager) once done with.
+
+    Returns:
+        requests.Response: The response. Its status is 304 when nothing changed.
+    """
+    headers = {}
+    if latest is not None:
+        if latest.get('etag'):
+            headers['If-None-Match'] = latest['etag']
+        if latest.get('last_modified'):
+            headers['If-Modified-Since'] = latest['last_modified']
+
+    response = session.get(url, headers=headers, timeout=timeout, stream=True)
+    response.raise_for_status()
+    return response
+
+def save_snapshot(response, snapshot_dir=SNAPSHOT_DIR, prefix=SNAPSHOT_PREFIX, chunk_size=CHUNK_SIZE):
+    """
+    Stores a response body as a timestamped gzip snapshot, unless it is byte-identical
+    to the newest snapshot.
+
+    The body is read chunk by chunk, hashed and compressed into a partial file as it
+    arrives, so it is never held in memory whole. The partial file is renamed to the
+    snapshot name if the body changed, and removed otherwise.
+
+    Args:
+        response (requests.Response): A 200 response, fetched with stream=True.
+        snapshot_dir (str): Directory of the snapshots.
+        prefix (str): File name prefix of the snapshots.
+        chunk_size (int): Bytes read from the body at a time.
+
+    Returns:
+        tuple: (metadata, changed). metadata describes the newest snapshot and changed
+        is False when the body matched it.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    filename = f'{prefix}-{timestamp}.json.gz'
+    part_path = os.path.join(snapshot_dir, filename + '.part')
+
+    digest = hashlib.sha256()
+    try:
+        with gzip.open(part_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(part_path)
+        raise
+    sha256 = digest.hexdigest()
+    latest = load_latest(snapshot_dir)
+
+    if latest is not None and latest['sha256'] == sha256:
+        os.remove(part_path)
+        changed = False
+    else:
+        os.replace(part_path, os.path.join(snapshot_dir, filename))
+        latest = {'file': filename, 'sha256': sha256}
+        changed = True
+
+    # Validators are refreshed even when the body did not change
+    latest['etag'] = response.headers.get('ETag')
+    latest['last_modified'] = response.headers.get('Last-Modified')
+    with open(os.path.join(snapshot_dir, 'latest.json'), 'w') as f:
+        json.dump(latest, f, indent=2)
+
+    return latest, changed
+
+def open_snapshot(filename, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Opens a snapshot as a binary stream of its decompressed JSON.
+    """
+    return gzip.open(os.path.join(snapshot_dir, filename), 'rb')
+
+def read_snapshot(filename, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Reads the raw JSON bytes of a snapshot.
+    """
+    with gzip.open(os.path.join(snapshot_dir, filename), 'rb') as f:
+        return f.read()
+
+def list_snapshots(snapshot_dir=SNAPSHOT_DIR, prefix=SNAPSHOT_PREFIX):
+    """
+    Lists the snapshot files, oldest first.
+    """
+    return sorted(os.path.basename(path) for path in glob.glob(os.path.join(snapshot_dir, f'{prefix}-*.json.gz')))
@@ -1,58 +1,22 @@
 import pandas as pd
-import glob
+import argparse
 import os
 import numpy as np
+import gameweek_history
+import player_state
+import season_manifest
+import season_transitions
+from instrumentation import PipelineReport, run_stage
+import storage
+import team_context
+from data_loader import HISTORY_FILE, get_season_files, load_history, parse_dates
+from historical_features import calculate_historical_features
 
-def load_data():
-    """
-    Loads all player data from CSV files in the history_data directory,
-    selects specific columns, and adds a 'season' column based on the filename.
+MANIFEST_FILE = 'fantasy_data_history.manifest.json'
 
-    Returns:
-        pandas.DataFrame: A single DataFrame containing all historical data.
-    """
-    path = 'history_data'
-    all_files = glob.glob(os.path.join(path, "*_data.csv"))
-    
-    li = []
-    
-    cols_to_use = ['code', 'minutes', 'points_per_game', 'total_points', 'birth_date', 'web_name', 'team_code', 'team_join_date', 'element_type']
-
-    for filename in all_files:
-        df = pd.read_csv(filename, index_col=None, header=0, encoding='utf-8-sig')
-        df.columns = df.columns.str.replace('"', '') # Clean column names
-
-        # Extract season from filename
-        season = os.path.basename(filename).split('_data.csv')[0]
-        df['season'] = season
-        
-        # Ensure all requested columns are present, fill missing with NaN
-        for col in cols_to_use:
-            if col not in df.columns:
-                df[col] = pd.NA
-
-        # Select only the required columns
-        df = df[cols_to_use + ['season']]
-        
-        li.append(df)
-
-    frame = pd.concat(li, axis=0, ignore_index=True)
-    
-    # Rename to old column names
-    frame.rename(columns={
-        'code': 'ID',
-        'web_name': 'Player Name',
-        'element_type': 'Position',
-        'total_points': 'Tot Pts',
-        'points_per_game': 'PPG',
-        'minutes': 'Min'
-    }, inplace=True)
-    
-    positions = {1: 'GK', 2: 'DEF', 3: 'MID', 4: 'FWD'}
-    frame['Position'] = frame.Position.map(positions)
-    return frame
+RAW_COLUMNS = ['ID', 'Min', 'PPG', 'Tot Pts', 'birth_date', 'Player Name', 'team_code', 'team_join_date', 'Position', 'season']
 
-def calculate_new_in_league(df):
+def calculate_new_in_league(df, transitions=None):
     """
     Calculates the 'New In League' feature for each player.
 
@@ -61,36 +25,20 @@ def calculate_new_in_league(df):
 
     Args:
         df (pd.DataFrame): The DataFrame with player data for all seasons.
+        transitions (pd.DataFrame): The transition table of df (see season_transitions.py).
+            Built from df if None.
 
     Returns:
-        pd.DataFrame: The DataFrame with the 'New In League' column added.
+        pd.DataFrame: The DataFrame with the 'New In League' column added, sorted by season.
     """
     df_sorted = df.sort_values('season').reset_index(drop=True)
-    seasons = df_sorted['season'].unique()
-    
-    df_list = []
-
-    # For the first season, 'New In League' is False for everyone
-    first_season_df = df_sorted[df_sorted['season'] == seasons[0]].copy()
-    first_season_df['New In League'] = False
-    df_list.append(first_season_df)
-
-    # Iterate from the second season
-    for i in range(1, len(seasons)):
-        previous_season = seasons[i-1]
-        current_season = seasons[i]
-        
-        players_in_previous_season = df_sorted[df_sorted['season'] == previous_season]['ID'].unique()
-        
-        current_season_df = df_sorted[df_sorted['season'] == current_season].copy()
-        
-        current_season_df['New In League'] = ~current_season_df['ID'].isin(players_in_previous_season)
-        
-        df_list.append(current_season_df)
-        
-    return pd.concat(df_list, ignore_index=True)
-
-def calculate_new_in_team(df):
+    if transitions is None:
+        transitions = season_transitions.transition_table(df_sorted)
+
+    df_sorted['New In League'] = season_transitions.transition_flags(df_sorted, transitions)['New In League']
+    return df_sorted
+
+def calculate_new_in_team(df, transitions=None):
     """
     Calculates the 'New In Team' feature for each player.
 
@@ -99,45 +47,18 @@ def calculate_new_in_team(df):
 
     Args:
         df (pd.DataFrame): The DataFrame with player data for all seasons.
+        transitions (pd.DataFrame): The transition table of df (see season_transitions.py).
+            Built from df if None.
 
     Returns:
-        pd.DataFrame: The DataFrame with the 'New In Team' column added.
+        pd.DataFrame: The DataFrame with the 'New In Team' column added, sorted by season.
     """
     df_sorted = df.sort_values('season').reset_index(drop=True)
-    seasons = df_sorted['season'].unique()
-    
-    df_list = []
-
-    # For the first season, 'New In Team' is False for everyone
-    first_season_df = df_sorted[df_sorted['season'] == seasons[0]].copy()
-    first_season_df['New In Team'] = False
-    df_list.append(first_season_df)
-
-    # Iterate from the second season
-    for i in range(1, len(seasons)):
-        previous_season = seasons[i-1]
-        current_season = seasons[i]
-        
-        previous_season_df = df_sorted[df_sorted['season'] == previous_season]
-        current_season_df = df_sorted[df_sorted['season'] == current_season].copy()
-
-        # Create a mapping of player ID to team_code for the previous season
-        # Using drop_duplicates to handle cases where a player might have multiple entries per season
-        previous_season_teams = previous_season_df[['ID', 'team_code']].drop_duplicates(subset=['ID']).set_index('ID')['team_code']
-        
-        # Map the previous season's team to the current season's players
-        current_season_df['previous_team_code'] = current_season_df['ID'].map(previous_season_teams)
-        
-        # A player is new in the team if they have no previous team or their team has changed
-        current_season_df['New In Team'] = (current_season_df['previous_team_code'].isnull()) | \
-                                           (current_season_df['team_code'] != current_season_df['previous_team_code'])
-        
-        # Drop the helper column
-        current_season_df.drop(columns=['previous_team_code'], inplace=True)
-
-        df_list.append(current_season_df)
-        
-    return pd.concat(df_list, ignore_index=True)
+    if transitions is None:
+        transitions = season_transitions.transition_table(df_sorted)
+
+    df_sorted['New In Team'] = season_transitions.transition_flags(df_sorted, transitions)['New In Team']
+    return df_sorted
 
 def calculate_additional_features(df):
     """
@@ -161,149 +82,119 @@ def calculate_additional_features(df):
     seasons = sorted(df_sorted['season'].unique())
     season_map = {season: prev_season for season, prev_season in zip(seasons[1:], seasons[:-1])}
     
-    # Create a 'previous_season' column to merge on
+    # Create a 'previous_season' column to look up the context cube on
     df_sorted['previous_season'] = df_sorted['season'].map(season_map)
 
-    # --- Feature 1: max_minutes_in_position_past_season ---
-    # Pre-calculate max minutes per team/position for all seasons
-    max_min_pos = df_sorted.groupby(['season', 'team_code', 'Position'])['Min'].max().reset_index()
-    max_min_pos.rename(columns={'Min': 'max_minutes_in_position_past_season', 'season': 'previous_season'}, inplace=True)
-    
-    # Merge this data into the main dataframe
-    df_with_features = pd.merge(
-        df_sorted,
-        max_min_pos,
-        how='left',
-        left_on=['previous_season', 'team_code', 'Position'],
-        right_on=['previous_season', 'team_code', 'Position']
-    )
-    # Set the value to NaN if the player is not new in the team
-    df_with_features['max_minutes_in_position_past_season'] = df_with_features['max_minutes_in_position_past_season'].where(df_with_features['New In Team'], np.nan)
-
-    # --- Feature 2: max_minutes_by_signing_past_season ---
-    # Get all new signings from all seasons
-    new_signings = df_sorted[df_sorted['New In Team'] == True]
-    # Calculate the max minutes for these signings per team and season
-    max_min_signings = new_signings.groupby(['season', 'team_code'])['Min'].max().reset_index()
-    max_min_signings.rename(columns={'Min': 'max_minutes_by_signing_past_season', 'season': 'previous_season'}, inplace=True)
-
-    # Merge this data into the main dataframe
-    df_with_features = pd.merge(
-        df_with_features,
-        max_min_signings,
-        how='left',
-        left_on=['previous_season', 'team_code'],
-        right_on=['previous_season', 'team_code']
-    )
-    # Set the value to NaN if the player is not an existing player
-    df_with_features['max_minutes_by_signing_past_season'] = df_with_features['max_minutes_by_signing_past_season'].where(df_with_features['New In Team'] == False, np.nan)
-
-    # --- New Feature: avg_ppg_position_team_high_minutes ---
-    # Pre-calculate average PPG for players with >1400 minutes per team/position for all seasons
-    avg_ppg_pos_team = df_sorted[df_sorted['Min'] > 1400].groupby(['season', 'team_code', 'Position'])['PPG'].mean().reset_index()
-    avg_ppg_pos_team.rename(columns={'PPG': 'avg_ppg_position_team_high_minutes', 'season': 'previous_season'}, inplace=True)
-
-    # Merge this data into the main dataframe
-    df_with_features = pd.merge(
-        df_with_features,
-        avg_ppg_pos_team,
-        how='left',
-        left_on=['previous_season', 'team_code', 'Position'],
-        right_on=['previous_season', 'team_code', 'Position']
-    )
-    # Set the value to NaN if the player is not new in the team
-    df_with_features['avg_ppg_position_team_high_minutes'] = df_with_features['avg_ppg_position_team_high_minutes'].where(df_with_features['New In Team'], np.nan)
-
-    # Clean up helper column
-    df_with_features.drop(columns=['previous_season'], inplace=True)
+    # --- Features 1, 2 and 4: team context of the previous season ---
+    # All read from one aggregate cube keyed by (season, team_code, Position), see team_context.py
+    cube = team_context.context_cube(df_sorted)
+    context = team_context.previous_season_context(df_sorted, cube)
+    df_with_features = df_sorted.drop(columns=['previous_season']).join(context)
     
     return df_with_features
 
-def calculate_historical_features(df):
+def build_features(all_data, report=None):
     """
-    Calculates historical performance metrics for each player.
+    Runs every feature stage over the loaded player data.
 
-    This includes:
-    - PPG from prior seasons (last 1, avg last 2, avg last 3).
-    - Minutes played in prior seasons (last 1, avg last 2, avg last 3).
-    - Minutes played in prior seasons for the *same team* as the current season.
+    Args:
+        all_data (pd.DataFrame): The loaded player data.
+        report (PipelineReport): Records each stage if given.
+    """
+    # Both flags are read from one transition table
+    transitions = run_stage(report, 'season_transitions', season_transitions.transition_table, all_data)
+    all_data_with_features = run_stage(report, 'new_in_league', calculate_new_in_league, all_data, transitions)
+    all_data_with_features = run_stage(report, 'new_in_team', calculate_new_in_team, all_data_with_features, transitions)
+    all_data_with_features = run_stage(report, 'additional_features', calculate_additional_features, all_data_with_features)
+    all_data_with_features = run_stage(report, 'historical_features', calculate_historical_features, all_data_with_features)
+    return all_data_with_features
+
+def build_incremental(season_files, changed, history_file=HISTORY_FILE, workers=1, report=None):
+    """
+    Rebuilds only the seasons affected by changed inputs and splices them into the
+    existing history table.
+
+    Every feature of a season depends on earlier seasons only, so the first changed
+    season and all the seasons after it are recomputed; earlier rows are kept as they are.
+    The recomputation uses the existing table as context for the kept seasons, except the
+    one right before the first changed season, which is reloaded from its file so the
+    team/position aggregates see the same rows as a full build.
 
     Args:
-        df (pd.DataFrame): The DataFrame with player data for all seasons.
+        season_files (dict): Mapping of season name to input file path.
+        changed (list): Seasons whose inputs changed since the last build, sorted, see
+            season_manifest.changed_seasons. The existing table is returned as it is if empty.
+        history_file (str): The existing history table.
+        workers (int): Number of season files parsed in parallel.
+        report (PipelineReport): Records each stage if given.
 
     Returns:
-        pd.DataFrame: The DataFrame with all historical columns added.
+        pd.DataFrame: The full history table with the affected seasons recomputed.
     """
-    df_sorted = df.sort_values(by=['ID', 'season'])
-
-    def calculate_player_history(group):
-        # Ensure the group is sorted by season for correct shifting and rolling
-        group = group.sort_values('season')
-
-        # --- Historical PPG ---
-        shifted_ppg = group['PPG'].shift(1)
-        group['points_last_season'] = shifted_ppg
-        group['avg_points_last_2_seasons'] = shifted_ppg.rolling(2, min_periods=1).mean()
-        group['avg_points_last_3_seasons'] = shifted_ppg.rolling(3, min_periods=1).mean()
-
-        # --- Historical Minutes (Overall) ---
-        shifted_min = group['Min'].shift(1)
-        group['minutes_last_season'] = shifted_min
-        group['avg_minutes_last_2_seasons'] = shifted_min.rolling(2, min_periods=1).mean()
-        group['avg_minutes_last_3_seasons'] = shifted_min.rolling(3, min_periods=1).mean()
-
-        # --- Historical Minutes (Same Team) ---
-        same_team_hist_data = []
-        # Iterate through each row (season) of the player's history
-        for index, row in group.iterrows():
-            current_season = row['season']
-            current_team = row['team_code']
-
-            # Get all seasons for this player *before* the current one
-            history = group[group['season'] < current_season]
-
-            # From that history, get only the seasons played at the *same team*
-            same_team_history = history[history['team_code'] == current_team].sort_values('season', ascending=False)
-
-            # Calculate metrics based on this filtered, same-team history
-            if not same_team_history.empty:
-                min_last = same_team_history.head(1)['Min'].iloc[0]
-                # Use .mean() which handles cases with fewer than 2 or 3 seasons gracefully
-                avg_min_2 = same_team_history.head(2)['Min'].mean()
-                avg_min_3 = same_team_history.head(3)['Min'].mean()
-            else:
-                # If no history with this team, all metrics are NaN
-                min_last, avg_min_2, avg_min_3 = np.nan, np.nan, np.nan
-
-            same_team_hist_data.append({
-                'index': index,
-                'minutes_last_season_same_team': min_last,
-                'avg_minutes_last_2_seasons_same_team': avg_min_2,
-                'avg_minutes_last_3_seasons_same_team': avg_min_3
-            })
-
-        # Join the calculated same-team history back to the group
-        if same_team_hist_data:
-            same_team_df = pd.DataFrame(same_team_hist_data).set_index('index')
-            group = group.join(same_team_df)
-
-        return group
-
-    # Apply the complex calculation to each player group
-    df_with_hist = df_sorted.groupby('ID', group_keys=False).apply(calculate_player_history)
-
-    return df_with_hist
-
-def main():
+    # The CSV is the file hashed in the manifest, and round_trip parsing keeps its floats
+    # bit-identical when the kept rows are written back
+    existing = run_stage(report, 'load_existing', storage.read_csv, history_file, float_precision='round_trip')
+    # Dates are parsed as in the reloaded seasons, so every row writes them back in one format
+    existing = parse_dates(existing)
+
+    if not changed:
+        return existing
+
+    first_changed = changed[0]
+    kept = existing[existing['season'] < first_changed]
+    kept_seasons = sorted(kept['season'].unique())
+
+    reload_seasons = [season for season in season_files if season >= first_changed]
+    if kept_seasons:
+        reload_seasons = [kept_seasons[-1]] + reload_seasons
+    print(f"Changed seasons: {', '.join(changed)}. Recomputing {first_changed} onwards.")
+
+    context = kept[kept['season'] < reload_seasons[0]][RAW_COLUMNS]
+    reloaded = run_stage(report, 'load', load_history, [season_files[season] for season in reload_seasons], workers=workers)
+
+    recomputed = build_features(pd.concat([frame for frame in [context, reloaded] if not frame.empty], ignore_index=True), report)
+    recomputed = recomputed[recomputed['season'].astype(str) >= first_changed]
+
+    all_data_with_features = pd.concat([frame for frame in [kept, recomputed] if not frame.empty], ignore_index=True)
+    return all_data_with_features.sort_values(['ID', 'season']).reset_index(drop=True)
+
+def main(incremental=False, workers=1, gameweek_features=False, form_cutoff=None, report_file=None, profile=False):
     """
     Main function to load data, calculate features, and explore the result.
+
+    Args:
+        incremental (bool): Recompute only the seasons whose input files changed since
+            the last build. Falls back to a full build if there is no usable manifest.
+        workers (int): Number of season files parsed in parallel.
+        gameweek_features (bool): Add the rolling form columns computed from the
+            gameweek store (see gameweek_history.py). Each season's rows get the form
+            as of the end of the previous season, as its own gameweeks make up its PPG.
+        form_cutoff (int): Read the previous season's form as of this gameweek
+            instead of its last one.
+        report_file (str): Writes the JSON timing report of the stages to this file.
+        profile (bool): Adds cProfile and tracemalloc captures to the report.
     """
-    all_data = load_data()
-    
-    all_data_with_features = calculate_new_in_league(all_data)
-    all_data_with_features = calculate_new_in_team(all_data_with_features)
-    all_data_with_features = calculate_additional_features(all_data_with_features)
-    all_data_with_features = calculate_historical_features(all_data_with_features)
+    report = PipelineReport('build_analysis_data', profile) if report_file or profile else None
+    season_files = get_season_files()
+    manifest = season_manifest.load_manifest(MANIFEST_FILE)
+
+    if incremental and manifest is not None and os.path.exists(HISTORY_FILE) and \
+       manifest['output']['sha256'] == season_manifest.file_sha256(HISTORY_FILE):
+        fingerprints = season_manifest.fingerprint_seasons(season_files, manifest)
+        changed = season_manifest.changed_seasons(manifest, fingerprints)
+        if not changed:
+            if not gameweek_features:
+                print("No season inputs changed, keeping the existing history table.")
+                return
+            # The gameweek store is not fingerprinted, so the form columns are refreshed even then
+            print("No season inputs changed, refreshing the form columns of the existing rows.")
+        all_data_with_features = build_incremental(season_files, changed, workers=workers, report=report)
+    else:
+        if incremental:
+            print("No manifest matching the existing history table, running a full build.")
+        fingerprints = season_manifest.fingerprint_seasons(season_files, manifest)
+        all_data = run_stage(report, 'load', load_history, workers=workers)
+        all_data_with_features = build_features(all_data, report)
     
     print("Sample of the data with the 'New In League' feature:")
     print(all_data_with_features.head())
@@ -352,11 +243,40 @@ def main():
         ]
         print(new_players_sample[['season', 'Player Name', 'team_code', 'Position', 'avg_ppg_position_team_high_minutes']].head())
 
-    all_data_with_features = all_data_with_features[~all_data_with_features.Position.isna()]
-    all_data_with_features
-    all_data_with_features.to_csv('fantasy_data_history.csv', index=False)
+    if gameweek_features:
+        gameweeks = gameweek_history.read_gameweeks()
+        all_data_with_features = run_stage(report, 'gameweek_features', gameweek_history.add_form_features, all_data_with_features, gameweeks,
+                                           previous_season=True, cutoff_gameweek=form_cutoff)
+    else:
+        # Rows kept by an incremental build carry the form columns of the last build, recomputed rows do not
+        all_data_with_features = all_data_with_features.drop(columns=[col for col in gameweek_history.form_columns() if col in all_data_with_features.columns])
 
+    all_data_with_features = all_data_with_features[~all_data_with_features.Position.isna()]
+    run_stage(report, 'write', storage.write_table, all_data_with_features, HISTORY_FILE)
+    # Written after the history table, from its rows, for process_curr_data to build the current season from
+    season_transitions.write_transitions(season_transitions.transition_table(all_data_with_features))
+    team_context.write_context(team_context.context_cube(all_data_with_features))
+    player_state.write_state(all_data_with_features)
+    season_manifest.write_manifest(MANIFEST_FILE, fingerprints, HISTORY_FILE)
+
+    if report is not None:
+        print("\n--- Stage timings ---")
+        print(report.summary())
+        if report_file:
+            report.write(report_file)
+
+
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Build fantasy_data_history.csv from the history_data season files.')
+    parser.add_argument('--incremental', action='store_true', help='only recompute seasons whose input files changed')
+    parser.add_argument('--workers', type=int, default=1, help='number of season files parsed in parallel')
+    parser.add_argument('--gameweek-features', action='store_true', help='add the previous season\'s rolling form columns from the gameweek store')
+    parser.add_argument('--form-cutoff-gameweek', type=int, help='read the previous season\'s form as of this gameweek instead of its last one')
+    parser.add_argument('--report', help='JSON file for the per-stage timing report')
+    parser.add_argument('--profile', action='store_true', help='add cProfile and tracemalloc captures to the stage timings')
+    args = parser.parse_args(argv)
+    main(incremental=args.incremental, workers=args.workers, gameweek_features=args.gameweek_features,
+         form_cutoff=args.form_cutoff_gameweek, report_file=args.report, profile=args.profile)
 
 if __name__ == "__main__":
-    main()
-
+    command_line()
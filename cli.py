@@ -0,0 +1,44 @@
+import argparse
+import importlib
+import sys
+
+# Single entry point for the pipeline scripts:
+#     python cli.py <command> [options]
+# Each command runs the command_line() of its module, which parses the rest of the
+# arguments (python cli.py <command> --help lists them). Only that module is imported,
+# so process or tier runs never import the plotting and statistics libraries that
+# analyze and report need.
+
+# Command -> (module, description)
+COMMANDS = {
+    'download': ('get_data', 'download the history_data season files through the local cache'),
+    'snapshot': ('get_curr_data', 'snapshot bootstrap-static and extract the current season players'),
+    'gameweeks': ('gameweek_history', 'ingest the per-gameweek player histories into the gameweek store'),
+    'build': ('build_analysis_data', 'build fantasy_data_history.csv from the history_data season files'),
+    'process': ('process_curr_data', 'build the current season features'),
+    'tier': ('rule_based_filtering', 'assign the current season players to tiers'),
+    'sweep': ('threshold_sweep', 'sweep the tier thresholds against the historical seasons'),
+    'backtest': ('backtest', 'walk-forward backtest of the tier rules'),
+    'screen': ('feature_screening', 'screen the lagged raw columns as predictors of next-season PPG'),
+    'analyze': ('analysis', 'exploratory analysis of the tier thresholds, with interactive plots'),
+    'positional': ('positional_analysis', 'points curves and distributions by position, with interactive plots'),
+    'report': ('report', 'render the analysis plots to a static HTML report, without a display'),
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='cli.py',
+        description='Fantasy draft analysis pipeline.',
+        epilog='commands:\n' + '\n'.join(f'  {command:<12}{description}' for command, (_, description) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command', help='one of the commands below')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='options of the command')
+    args = parser.parse_args(argv)
+
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    module.command_line(args.args, prog=f'cli.py {args.command}')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
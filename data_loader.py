@@ -0,0 +1,179 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pandas as pd
+
+import storage
+
+HISTORY_PATH = 'history_data'
+CURRENT_SEASON = '2025-26'
+CURRENT_SEASON_FILE = os.path.join('curr_data', f'{CURRENT_SEASON}_data.csv')
+# The history table written by build_analysis_data.py
+HISTORY_FILE = 'fantasy_data_history.csv'
+# Columns of the history table the current season's features are built from, and that
+# the player state keeps of each player's latest season
+PAST_COLUMNS = ['Player Name', 'ID', 'PPG', 'season', 'Min', 'team_code', 'New In Team', 'Position']
+
+POSITIONS = {1: 'GK', 2: 'DEF', 3: 'MID', 4: 'FWD'}
+
+# Format and dtype of the date columns of the FPL files
+DATE_FORMAT = '%Y-%m-%d'
+DATE_DTYPE = 'datetime64[s]'
+
+# Raw FPL column -> (pipeline column, parser dtype). Only these columns are ever parsed.
+# PPG stays float64: the tier thresholds sit on 2-decimal boundaries of PPG averages,
+# and float32 rounding would move players across them. Names are kept as 'str', which
+# is Arrow-backed under pandas 3, rather than as Python objects; dates are parsed.
+PLAYER_SCHEMA = {
+    'code': ('ID', 'int32'),
+    'minutes': ('Min', 'int32'),
+    'points_per_game': ('PPG', 'float64'),
+    'total_points': ('Tot Pts', 'int32'),
+    'birth_date': ('birth_date', DATE_DTYPE),
+    'web_name': ('Player Name', 'str'),
+    'team_code': ('team_code', 'int16'),
+    'team_join_date': ('team_join_date', DATE_DTYPE),
+    'element_type': ('Position', 'int8'),
+}
+# Pipeline names of the date columns
+DATE_COLUMNS = [name for name, dtype in PLAYER_SCHEMA.values() if dtype == DATE_DTYPE]
+
+# Position categories, in FPL element_type order
+POSITION_DTYPE = pd.CategoricalDtype(list(POSITIONS.values()))
+
+def get_season_files(path=HISTORY_PATH):
+    """
+    Finds the season files in the history_data directory.
+
+    Returns:
+        dict: Mapping of season name (e.g. '2024-25') to its file path, in season order.
+    """
+    all_files = glob.glob(os.path.join(path, "*_data.csv"))
+    return {season_from_filename(filename): filename for filename in sorted(all_files)}
+
+def season_from_filename(filename):
+    """
+    Extracts the season from a season file name, e.g. 'history_data/2024-25_data.csv' -> '2024-25'.
+    """
+    return os.path.basename(filename).split('_data.csv')[0]
+
+def parse_dates(frame, columns=DATE_COLUMNS):
+    """
+    Parses the given date columns of a frame, skipping the ones it does not have.
+    """
+    for col in columns:
+        if col in frame.columns:
+            frame[col] = pd.to_datetime(frame[col], format=DATE_FORMAT).astype(DATE_DTYPE)
+    return frame
+
+def read_players(filename, schema=PLAYER_SCHEMA):
+    """
+    Reads the schema columns of a player file with their declared dtypes.
+
+    Only the schema columns are parsed; columns missing from the file are filled with NaN.
+
+    Args:
+        filename (str): Path to a player CSV (or the CSV name of its columnar copy).
+        schema (dict): Raw column -> (pipeline column, dtype).
+
+    Returns:
+        pandas.DataFrame: The schema columns, with the original column names, in schema order.
+    """
+    # Date columns are read as strings and parsed afterwards, the CSV parser takes no datetime dtype
+    dates = [col for col, (_, dtype) in schema.items() if dtype == DATE_DTYPE]
+    dtypes = {col: 'str' if col in dates else dtype for col, (_, dtype) in schema.items()}
+    df = parse_dates(storage.read_table(filename, columns=list(schema), dtype=dtypes), dates)
+
+    # Ensure all requested columns are present, fill missing with NaN
+    for col in schema:
+        if col not in df.columns:
+            df[col] = pd.NA
+
+    return df[list(schema)].astype({col: DATE_DTYPE for col in dates})
+
+def load_season(filename, schema=PLAYER_SCHEMA):
+    """
+    Loads a single season file and adds a 'season' column based on the filename.
+
+    Returns:
+        pandas.DataFrame: The season data, with the original column names.
+    """
+    df = read_players(filename, schema)
+    df['season'] = season_from_filename(filename)
+    return df
+
+def rename_players(frame, schema=PLAYER_SCHEMA):
+    """
+    Renames raw FPL columns to the pipeline column names.
+    """
+    return frame.rename(columns={col: name for col, (name, _) in schema.items()})
+
+def load_seasons(all_files, workers=1, executor='thread'):
+    """
+    Loads several season files, optionally in parallel.
+
+    Each season is parsed independently, so the files are spread over a pool of workers.
+    Results come back in the order of all_files whatever order the workers finish in.
+
+    Args:
+        all_files (list): Season files to load.
+        workers (int): Number of parallel workers. 1 parses the files one at a time.
+        executor (str): 'thread' or 'process' pool.
+
+    Returns:
+        list: One DataFrame per file, in the order of all_files.
+    """
+    if workers <= 1 or len(all_files) <= 1:
+        return [load_season(filename) for filename in all_files]
+
+    if executor == 'thread':
+        pool_class = ThreadPoolExecutor
+    elif executor == 'process':
+        pool_class = ProcessPoolExecutor
+    else:
+        raise ValueError(f"Unknown executor: {executor}")
+
+    with pool_class(max_workers=min(workers, len(all_files))) as pool:
+        return list(pool.map(load_season, all_files))
+
+def load_history(all_files=None, categorical=True, workers=1, executor='thread'):
+    """
+    Loads all player data from the season files in the history_data directory,
+    selecting the schema columns and adding a 'season' column based on the filename.
+
+    Args:
+        all_files (list): Season files to load. Defaults to every file in history_data.
+        categorical (bool): Store Position, season and team_code as categoricals.
+        workers (int): Number of seasons parsed in parallel.
+        executor (str): 'thread' or 'process' pool, used when workers > 1.
+
+    Returns:
+        pandas.DataFrame: A single DataFrame containing all historical data.
+    """
+    if all_files is None:
+        all_files = list(get_season_files().values())
+
+    frame = pd.concat(load_seasons(all_files, workers, executor), axis=0, ignore_index=True)
+    frame = rename_players(frame)
+
+    frame['Position'] = frame.Position.map(POSITIONS)
+    if categorical:
+        frame['Position'] = frame['Position'].astype(POSITION_DTYPE)
+        frame['season'] = frame['season'].astype(pd.CategoricalDtype(sorted(frame['season'].unique()), ordered=True))
+        frame['team_code'] = frame['team_code'].astype('category')
+    return frame
+
+def load_current_season(filename=CURRENT_SEASON_FILE, season=CURRENT_SEASON):
+    """
+    Loads the current season player data written by get_curr_data.py.
+
+    Position is kept as the FPL element_type number, as the current-season features expect.
+
+    Returns:
+        pandas.DataFrame: ID, Min, PPG, Player Name, team_code, Position and season columns.
+    """
+    schema = {col: PLAYER_SCHEMA[col] for col in ['code', 'minutes', 'points_per_game', 'web_name', 'team_code', 'element_type']}
+    df = rename_players(read_players(filename, schema), schema)
+    df['season'] = season
+    return df
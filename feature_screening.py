@@ -0,0 +1,233 @@
+import argparse
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import storage
+from data_loader import POSITIONS, get_season_files
+
+# Feature screening correlates every numeric column of the raw season files, lagged by
+# one or more seasons, with the next season's PPG: e.g. expected_goals_lag1 is a
+# player's xG of the season before the target season. The seasons are streamed in
+# order, keeping only the last max(lags) seasons in memory, and every target season is
+# one block: its players are joined to their lagged columns and the block's moments
+# are merged into running moments per position, all columns at once.
+#
+# Correlations are pairwise complete: each feature uses the rows where both it and the
+# target are present. Rank correlations are computed on percentile ranks within each
+# season block and pooled like the Pearson ones, so they stream and are not driven by
+# season-to-season shifts of the raw scales.
+
+ALL_POSITIONS = 'ALL'
+
+TARGET = 'points_per_game'
+MINUTES = 'minutes'
+# Numeric columns that identify players or teams rather than describe them
+ID_COLUMNS = ['Unnamed: 0', 'code', 'id', 'team', 'team_code', 'element_type', 'squad_number']
+
+class Moments:
+    """
+    Running pairwise-complete means and (co)variances of feature columns against a target.
+
+    Block moments are merged with the parallel update of Chan et al., so the result
+    does not depend on how the rows were split into blocks.
+    """
+    STATS = ['n', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy']
+
+    def __init__(self):
+        self.stats = pd.DataFrame(columns=self.STATS, dtype='float64')
+
+    def update(self, x, y):
+        """
+        Merges a block into the moments.
+
+        Args:
+            x (pd.DataFrame): Feature values of the block's rows, NaN where missing.
+            y (np.ndarray or pd.DataFrame): Target value of each row, or a frame of
+                target values per feature, with the columns of x.
+        """
+        values = x.to_numpy(dtype='float64')
+        if isinstance(y, pd.DataFrame):
+            targets = y[x.columns].to_numpy(dtype='float64')
+        else:
+            targets = np.broadcast_to(np.asarray(y, dtype='float64')[:, None], values.shape)
+        present = ~np.isnan(values) & ~np.isnan(targets)
+
+        n = present.sum(axis=0).astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_x = np.where(present, values, 0).sum(axis=0) / n
+            mean_y = np.where(present, targets, 0).sum(axis=0) / n
+        dx = np.where(present, values - mean_x, 0)
+        dy = np.where(present, targets - mean_y, 0)
+        block = pd.DataFrame({
+            'n': n, 'mean_x': mean_x, 'mean_y': mean_y,
+            'm2_x': (dx * dx).sum(axis=0), 'm2_y': (dy * dy).sum(axis=0), 'c_xy': (dx * dy).sum(axis=0),
+        }, index=x.columns)
+        block = block[block['n'] > 0]
+
+        current = self.stats.reindex(self.stats.index.union(block.index)).fillna(0)
+        block = block.reindex(current.index).fillna(0)
+        n_a, n_b = current['n'], block['n']
+        total = n_a + n_b
+        delta_x = block['mean_x'] - current['mean_x']
+        delta_y = block['mean_y'] - current['mean_y']
+        weight = (n_a * n_b / total).where(total > 0, 0)
+        share = (n_b / total).where(total > 0, 0)
+        self.stats = pd.DataFrame({
+            'n': total,
+            'mean_x': current['mean_x'] + delta_x * share,
+            'mean_y': current['mean_y'] + delta_y * share,
+            'm2_x': current['m2_x'] + block['m2_x'] + delta_x * delta_x * weight,
+            'm2_y': current['m2_y'] + block['m2_y'] + delta_y * delta_y * weight,
+            'c_xy': current['c_xy'] + block['c_xy'] + delta_x * delta_y * weight,
+        })
+
+    def correlation(self, min_count=3):
+        """
+        Pearson correlation per feature, NaN for constant features or fewer than min_count rows.
+        """
+        stats = self.stats
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = stats['c_xy'] / np.sqrt(stats['m2_x'] * stats['m2_y'])
+        return r.where((stats['n'] >= min_count) & (stats['m2_x'] > 0) & (stats['m2_y'] > 0))
+
+def numeric_columns(season_df):
+    """
+    The numeric columns of a raw season frame that can be screened.
+    """
+    columns = season_df.select_dtypes('number').columns
+    return [col for col in columns if col not in ID_COLUMNS]
+
+def season_block(target_df, previous, lags, min_minutes):
+    """
+    Builds a target season's block: its players' next-season PPG and position, and the
+    lagged numeric columns of the previous seasons.
+
+    Args:
+        target_df (pd.DataFrame): The raw target season.
+        previous (list): The raw frames of the previous seasons, latest last, indexed by code.
+        lags (list): Lags to build, 1 for the season before the target season.
+        min_minutes (int): Players of the target season with fewer minutes are left out.
+
+    Returns:
+        tuple: (lagged features frame, target array, position array).
+    """
+    target_df = target_df[target_df[MINUTES] >= min_minutes].drop_duplicates('code')
+    codes = target_df['code'].to_numpy()
+    features = []
+    for lag in lags:
+        if lag > len(previous):
+            continue
+        lagged = previous[-lag]
+        columns = numeric_columns(lagged)
+        features.append(lagged[columns].reindex(codes).add_suffix(f'_lag{lag}').reset_index(drop=True))
+    x = pd.concat(features, axis=1) if features else pd.DataFrame(index=range(len(codes)))
+    return x, target_df[TARGET].to_numpy(dtype='float64'), target_df['element_type'].map(POSITIONS).to_numpy()
+
+def block_ranks(x, y):
+    """
+    Percentile ranks of each feature and of the target within a block, over the rows
+    where both are present, so every feature's ranks and target ranks cover the same rows.
+
+    Returns:
+        tuple: (feature ranks, target ranks per feature), both with the columns of x.
+    """
+    values = x.to_numpy(dtype='float64')
+    targets = np.broadcast_to(y[:, None], values.shape)
+    present = ~np.isnan(values) & ~np.isnan(targets)
+    x_ranks = pd.DataFrame(np.where(present, values, np.nan), columns=x.columns).rank(pct=True)
+    y_ranks = pd.DataFrame(np.where(present, targets, np.nan), columns=x.columns).rank(pct=True)
+    return x_ranks, y_ranks
+
+def screen_features(season_files=None, lags=(1,), min_minutes=1200):
+    """
+    Correlates the lagged numeric columns of the season files with next-season PPG,
+    per position and over all positions.
+
+    Args:
+        season_files (dict): Season name -> raw season file, consecutive seasons in
+            order. Defaults to every file in history_data.
+        lags (list): Lags to screen, in seasons.
+        min_minutes (int): Minimum target season minutes of the screened players.
+
+    Returns:
+        pd.DataFrame: One row per position and feature with 'position', 'feature',
+        'lag', 'n', 'pearson' and 'rank_correlation'.
+    """
+    if season_files is None:
+        season_files = get_season_files()
+    lags = sorted(set(lags))
+    pearson = {}
+    ranked = {}
+    previous = deque(maxlen=max(lags))
+
+    for season, filename in season_files.items():
+        season_df = storage.read_table(filename)
+        if previous:
+            x, y, positions = season_block(season_df, list(previous), lags, min_minutes)
+            for position in [ALL_POSITIONS] + list(POSITIONS.values()):
+                rows = np.ones(len(y), dtype=bool) if position == ALL_POSITIONS else positions == position
+                if not rows.any():
+                    continue
+                block_x, block_y = x[rows].reset_index(drop=True), y[rows]
+                pearson.setdefault(position, Moments()).update(block_x, block_y)
+                ranked.setdefault(position, Moments()).update(*block_ranks(block_x, block_y))
+        previous.append(season_df.drop_duplicates('code').set_index('code'))
+
+    tables = []
+    for position, moments in pearson.items():
+        table = pd.DataFrame({
+            'position': position,
+            'n': moments.stats['n'].astype('int64'),
+            'pearson': moments.correlation(),
+            'rank_correlation': ranked[position].correlation(),
+        })
+        tables.append(table.rename_axis('feature').reset_index())
+    if not tables:
+        return pd.DataFrame(columns=['position', 'feature', 'lag', 'n', 'pearson', 'rank_correlation'])
+    result = pd.concat(tables, ignore_index=True)
+    result['lag'] = result['feature'].str.extract(r'_lag(\d+)$', expand=False).astype('int64')
+    return result[['position', 'feature', 'lag', 'n', 'pearson', 'rank_correlation']]
+
+def top_predictors(screening, top=10, by='rank_correlation', min_count=100):
+    """
+    The features most correlated with next-season PPG, positively or negatively, per position.
+
+    Args:
+        screening (pd.DataFrame): The output of screen_features.
+        top (int): Features kept per position.
+        by (str): 'rank_correlation' or 'pearson'.
+        min_count (int): Features with fewer screened rows are left out.
+
+    Returns:
+        pd.DataFrame: The screening rows of the top features, by position and decreasing |correlation|.
+    """
+    ranked = screening[screening['n'] >= min_count].dropna(subset=[by])
+    ranked = ranked.assign(strength=ranked[by].abs()).sort_values(['position', 'strength'], ascending=[True, False])
+    return ranked.groupby('position', sort=False).head(top).drop(columns='strength').reset_index(drop=True)
+
+def main(lags=(1,), min_minutes=1200, top=10, by='rank_correlation', output=None):
+    screening = screen_features(lags=lags, min_minutes=min_minutes)
+    if output:
+        screening.to_csv(output, index=False)
+        print(f"Wrote {len(screening)} rows to {output}")
+
+    best = top_predictors(screening, top, by)
+    with pd.option_context('display.width', 160, 'display.max_rows', None):
+        for position, table in best.groupby('position', sort=False):
+            print(f"\n{position}: top {len(table)} predictors of next-season PPG by {by}")
+            print(table.drop(columns='position').to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Screen the lagged raw columns as predictors of next-season PPG.')
+    parser.add_argument('--lags', type=int, nargs='+', default=[1], help='lags to screen, in seasons')
+    parser.add_argument('--min-minutes', type=int, default=1200, help='minimum target season minutes')
+    parser.add_argument('--top', type=int, default=10, help='predictors listed per position')
+    parser.add_argument('--by', choices=['rank_correlation', 'pearson'], default='rank_correlation', help='correlation to rank by')
+    parser.add_argument('--output', help='CSV file for the full screening table')
+    args = parser.parse_args(argv)
+    main(args.lags, args.min_minutes, args.top, args.by, args.output)
+
+if __name__ == '__main__':
+    command_line()
@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'http')
+USER_AGENT = 'epl-fantasy-analysis'
+
+# Raw response bodies are stored by content hash under objects/, and index.json maps
+# each URL to the hash of its latest body plus the validators needed for conditional requests.
+
+def object_path(cache_dir, sha256):
+    """
+    Returns the path of a cached body in the content-addressed store.
+    """
+    return os.path.join(cache_dir, 'objects', sha256[:2], sha256)
+
+def load_index(cache_dir):
+    """
+    Loads the URL index of the cache. Returns an empty index if there is none yet.
+    """
+    path = os.path.join(cache_dir, 'index.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_index(cache_dir, index):
+    """
+    Writes the URL index of the cache atomically.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, 'index.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def read_object(cache_dir, sha256):
+    """
+    Reads a cached body by its content hash.
+    """
+    with open(object_path(cache_dir, sha256), 'rb') as f:
+        return f.read()
+
+def store_object(cache_dir, content):
+    """
+    Stores a body in the content-addressed store and returns its hash.
+    Identical bodies are stored once.
+    """
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = object_path(cache_dir, sha256)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return sha256
+
+def conditional_get(url, entry=None, timeout=30):
+    """
+    Performs a blocking GET, sending the cached ETag/Last-Modified validators if any.
+
+    Works for http(s):// and file:// URLs.
+
+    Args:
+        url (str): The URL to fetch.
+        entry (dict): The cache index entry of the URL, if any.
+        timeout (float): Socket timeout in seconds.
+
+    Returns:
+        tuple: (content, etag, last_modified). content is None when the server
+        answered 304 Not Modified.
+    """
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    if entry is not None:
+        if entry.get('etag'):
+            request.add_header('If-None-Match', entry['etag'])
+        if entry.get('last_modified'):
+            request.add_header('If-Modified-Since', entry['last_modified'])
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read(), response.headers.get('ETag'), response.headers.get('Last-Modified')
+    except urllib.error.HTTPError as error:
+        if error.code == 304:
+            return None, entry.get('etag'), entry.get('last_modified')
+        raise
+
+async def request_with_retries(url, entry=None, retries=3, backoff=1.0):
+    """
+    Runs conditional_get in a worker thread, retrying failed requests with exponential
+    backoff. Client errors (HTTP 4xx) are raised at once, as retrying cannot fix them.
+
+    Returns:
+        tuple: (content, etag, last_modified), see conditional_get.
+    """
+    for attempt in range(retries):
+        try:
+            return await asyncio.to_thread(conditional_get, url, entry)
+        except urllib.error.HTTPError as error:
+            if error.code < 500 or attempt == retries - 1:
+                raise
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            if attempt == retries - 1:
+                raise
+        await asyncio.sleep(backoff * 2 ** attempt)
+
+async def fetch(url, index, cache_dir=DEFAULT_CACHE_DIR, offline=False, retries=3, backoff=1.0):
+    """
+    Fetches a URL through the local cache.
+
+    The blocking request runs in a worker thread, so several fetches can be awaited
+    concurrently. Failed requests are retried with exponential backoff, except client
+    errors (HTTP 4xx).
+
+    Args:
+        url (str): The URL to fetch.
+        index (dict): The cache URL index. Updated in place with the new entry.
+        cache_dir (str): The cache directory.
+        offline (bool): Serve from the cache only, without any network request.
+        retries (int): Number of attempts before giving up.
+        backoff (float): Delay in seconds before the first retry, doubled each time.
+
+    Returns:
+        tuple: (content, changed). changed is False when the body is the same
+        as the one cached on the previous fetch.
+    """
+    entry = index.get(url)
+
+    if offline:
+        if entry is None:
+            raise FileNotFoundError(f"{url} is not in the cache at {cache_dir}")
+        return read_object(cache_dir, entry['sha256']), False
+
+    content, etag, last_modified = await request_with_retries(url, entry, retries, backoff)
+
+    if content is None:
+        # 304 Not Modified: the cached body is still current
+        if os.path.exists(object_path(cache_dir, entry['sha256'])):
+            return read_object(cache_dir, entry['sha256']), False
+        # The cached body is gone, so ask again without the validators
+        content, etag, last_modified = await request_with_retries(url, None, retries, backoff)
+
+    sha256 = store_object(cache_dir, content)
+    changed = entry is None or entry['sha256'] != sha256
+    index[url] = {
+        'sha256': sha256,
+        'etag': etag,
+        'last_modified': last_modified,
+        'fetched_at': time.time(),
+    }
+    return content, changed
+
+async def fetch_all(urls, cache_dir=DEFAULT_CACHE_DIR, concurrency=4, offline=False):
+    """
+    Fetches several URLs concurrently through the local cache.
+
+    Args:
+        urls (list): The URLs to fetch.
+        cache_dir (str): The cache directory.
+        concurrency (int): Maximum number of requests in flight.
+        offline (bool): Serve from the cache only.
+
+    Returns:
+        list: One (content, changed) tuple per URL, in the order of urls.
+    """
+    index = load_index(cache_dir)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded_fetch(url):
+        async with semaphore:
+            return await fetch(url, index, cache_dir, offline)
+
+    try:
+        return await asyncio.gather(*(bounded_fetch(url) for url in urls))
+    finally:
+        if not offline:
+            save_index(cache_dir, index)
@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import glob
+import io
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import fetcher
+import storage
+from data_loader import CURRENT_SEASON, CURRENT_SEASON_FILE, HISTORY_PATH, get_season_files
+from get_data import BASE_URL
+
+GAMEWEEK_PATH = 'gameweek_data'
+
+# Rolling windows, in gameweeks, of the form features
+FORM_WINDOWS = [3, 5]
+
+# Raw merged_gw.csv column -> (store column, dtype). 'element' is the season-specific
+# player id; it is mapped to the player code ('ID' in fantasy_data_history.csv).
+# 'starts' is only published from 2022-23 on.
+GAMEWEEK_SCHEMA = {
+    'element': ('element', 'int32'),
+    'round': ('GW', 'int8'),
+    'minutes': ('Min', 'int16'),
+    'total_points': ('Pts', 'int16'),
+    'starts': ('Starts', 'float32'),
+}
+
+# The store keeps one directory per season, and each ingestion appends one part file
+# named after the gameweeks it holds:
+#   gameweek_data/season=2024-25/gw-01-38.parquet
+#   gameweek_data/season=2025-26/gw-01-07.parquet, gw-08-08.parquet, ...
+# The store is append-only only while stored gameweeks do not change. A gameweek
+# ingested while it was still being played, or corrected upstream later, is stored
+# again once its rows change: the parts from the first changed gameweek on are
+# rewritten in place and the superseded rows are not kept.
+
+PART_PATTERN = re.compile(r'gw-(\d+)-(\d+)\.parquet$')
+
+def gameweek_url(base_url, season):
+    """
+    Returns the merged_gw.csv URL of a season. base_url can be http(s):// or file://.
+    """
+    return f'{base_url.rstrip("/")}/{season}/gws/merged_gw.csv'
+
+def season_dir(season, root=GAMEWEEK_PATH):
+    """
+    Returns the partition directory of a season.
+    """
+    return os.path.join(root, f'season={season}')
+
+def stored_parts(season, root=GAMEWEEK_PATH):
+    """
+    Lists the part files of a season as (first GW, last GW, path), in gameweek order.
+    """
+    parts = []
+    for path in glob.glob(os.path.join(season_dir(season, root), 'gw-*.parquet')):
+        match = PART_PATTERN.search(path)
+        if match:
+            parts.append((int(match.group(1)), int(match.group(2)), path))
+    return sorted(parts)
+
+def last_stored_gameweek(season, root=GAMEWEEK_PATH):
+    """
+    Returns the last gameweek stored for a season, or 0 if there is none.
+    """
+    parts = stored_parts(season, root)
+    return parts[-1][1] if parts else 0
+
+def element_codes(season, path=HISTORY_PATH, current_file=CURRENT_SEASON_FILE):
+    """
+    Maps the season-specific element ids of a season to player codes, using its
+    players_raw file in history_data, or the current season file written by
+    get_curr_data.py for the current season.
+
+    Returns:
+        pd.Series: Player code indexed by element id.
+    """
+    if season == CURRENT_SEASON:
+        filename = current_file
+    else:
+        season_files = get_season_files(path)
+        if season not in season_files:
+            raise FileNotFoundError(f"No players file for {season} in {path}, needed to map element ids to player codes")
+        filename = season_files[season]
+
+    players = storage.read_table(filename, columns=['id', 'code'])
+    if 'id' not in players.columns:
+        raise ValueError(f"{filename} has no 'id' column to map element ids to player codes; run get_curr_data.py again")
+    return players.set_index('id')['code']
+
+def parse_gameweeks(content, codes, season):
+    """
+    Parses a merged_gw.csv into one row per player and gameweek.
+
+    Double gameweeks have one raw row per fixture; they are summed, and 'Fixtures'
+    and 'Apps' count the fixtures and the appearances (minutes > 0) of the gameweek.
+
+    Args:
+        content (bytes): The merged_gw.csv content.
+        codes (pd.Series): Player code indexed by element id, see element_codes.
+            Rows of elements missing from it are dropped.
+        season (str): The season of the file.
+
+    Returns:
+        pd.DataFrame: ID, season, GW, Min, Pts, Starts, Fixtures and Apps columns,
+        sorted by ID and GW.
+    """
+    dtypes = {col: dtype for col, (_, dtype) in GAMEWEEK_SCHEMA.items()}
+    raw = pd.read_csv(io.BytesIO(content), usecols=lambda col: col in GAMEWEEK_SCHEMA,
+                      dtype=dtypes, encoding_errors='replace')
+    raw = raw.rename(columns={col: name for col, (name, _) in GAMEWEEK_SCHEMA.items()})
+    if 'Starts' not in raw.columns:
+        raw['Starts'] = np.float32(np.nan)
+    raw['ID'] = raw['element'].map(codes)
+    raw = raw[raw['ID'].notna()].astype({'ID': 'int32'})
+    raw['Apps'] = (raw['Min'] > 0).astype('int8')
+    raw['Fixtures'] = np.int8(1)
+    raw['Starts_known'] = raw['Starts'].notna()
+
+    frame = raw.groupby(['ID', 'GW'], sort=True).agg(
+        Min=('Min', 'sum'),
+        Pts=('Pts', 'sum'),
+        Starts=('Starts', 'sum'),
+        Starts_known=('Starts_known', 'any'),
+        Fixtures=('Fixtures', 'sum'),
+        Apps=('Apps', 'sum'),
+    ).reset_index()
+    # Seasons without the starts column keep NaN instead of 0 starts
+    frame['Starts'] = frame['Starts'].where(frame.pop('Starts_known'))
+    frame.insert(1, 'season', season)
+    return frame
+
+def changed_gameweeks(frame, season, root=GAMEWEEK_PATH):
+    """
+    Lists the gameweeks of a parsed season whose rows are not stored yet or differ
+    from the stored ones, in gameweek order.
+    """
+    columns = [col for col in frame.columns if col != 'season']
+    parts = stored_parts(season, root)
+    stored = pd.concat([storage.read_columnar(path) for _, _, path in parts], ignore_index=True) if parts else frame.iloc[:0]
+    stored_by_gameweek = dict(list(stored.groupby('GW', sort=False)))
+
+    changed = []
+    for gameweek, rows in frame.groupby('GW', sort=True):
+        previous = stored_by_gameweek.get(gameweek)
+        if previous is None or not rows[columns].reset_index(drop=True).equals(previous[columns].reset_index(drop=True)):
+            changed.append(gameweek)
+    return changed
+
+def append_gameweeks(frame, season, root=GAMEWEEK_PATH):
+    """
+    Stores the gameweeks of a season that are new or changed since they were stored.
+
+    Parts holding only earlier gameweeks are kept; a part holding the first changed
+    gameweek is cut back to the gameweeks before it, later parts are removed, and
+    the gameweeks from the first changed one on are written as a new part file.
+
+    Args:
+        frame (pd.DataFrame): Parsed gameweeks of the season, see parse_gameweeks.
+        season (str): The season.
+        root (str): Root directory of the store.
+
+    Returns:
+        int: Number of gameweeks written, new or updated.
+    """
+    changed = changed_gameweeks(frame, season, root)
+    if not changed:
+        return 0
+
+    first = changed[0]
+    for part_first, part_last, path in stored_parts(season, root):
+        if part_last < first:
+            continue
+        if part_first < first:
+            kept = storage.read_columnar(path)
+            storage.write_columnar(kept[kept['GW'] < first], os.path.join(season_dir(season, root), f'gw-{part_first:02d}-{first - 1:02d}.parquet'))
+        os.remove(path)
+
+    new_rows = frame[frame['GW'] >= first]
+    last = new_rows['GW'].max()
+    os.makedirs(season_dir(season, root), exist_ok=True)
+    path = os.path.join(season_dir(season, root), f'gw-{first:02d}-{last:02d}.parquet')
+    storage.write_columnar(new_rows.drop(columns='season'), path)
+    return new_rows['GW'].nunique()
+
+def read_gameweeks(seasons=None, columns=None, root=GAMEWEEK_PATH):
+    """
+    Reads the stored gameweeks of some or all seasons.
+
+    Args:
+        seasons (list): Seasons to read. Defaults to every stored season.
+        columns (list): Columns to read, besides season. Reads every column if None.
+        root (str): Root directory of the store.
+
+    Returns:
+        pd.DataFrame: The gameweek rows, with an ordered categorical season column.
+    """
+    if seasons is None:
+        seasons = sorted(os.path.basename(path).split('=', 1)[1] for path in glob.glob(os.path.join(root, 'season=*')))
+
+    li = []
+    for season in seasons:
+        for _, _, path in stored_parts(season, root):
+            part = storage.read_columnar(path, columns)
+            part['season'] = season
+            li.append(part)
+    if not li:
+        raise FileNotFoundError(f"No gameweek data stored in {root}")
+
+    frame = pd.concat(li, axis=0, ignore_index=True)
+    frame['season'] = frame['season'].astype(pd.CategoricalDtype(sorted(seasons), ordered=True))
+    return frame
+
+def rolling_sums(frame, columns, window, keys):
+    """
+    Sums columns over the last `window` rows of each group, as a difference of
+    cumulative sums: one pass over the rows whatever the window length.
+
+    frame must be sorted by keys and then by time.
+    """
+    totals = frame[columns].astype('float64').fillna(0).groupby([frame[key] for key in keys], sort=False, observed=True).cumsum()
+    lagged = totals.groupby([frame[key] for key in keys], sort=False, observed=True).shift(window).fillna(0)
+    return totals - lagged
+
+def calculate_form_features(gameweeks, windows=FORM_WINDOWS):
+    """
+    Calculates the rolling form of each player over the last N gameweeks of the season.
+
+    For each window N:
+    - 'PPG_last_N_GW': points per appearance over the last N gameweeks (NaN without appearances).
+    - 'Min_share_last_N_GW': share of the available minutes (90 per fixture) played.
+    - 'Starts_last_N_GW': number of starts (NaN for seasons without the starts column).
+
+    Windows cover the player's last N stored gameweeks and do not cross seasons.
+
+    Args:
+        gameweeks (pd.DataFrame): Stored gameweeks, see read_gameweeks.
+        windows (list): Window lengths in gameweeks.
+
+    Returns:
+        pd.DataFrame: ID, season, GW and the form columns, sorted by ID, season and GW.
+    """
+    df = gameweeks.sort_values(['ID', 'season', 'GW']).reset_index(drop=True)
+    keys = ['ID', 'season']
+    features = df[['ID', 'season', 'GW']].copy()
+
+    for window in windows:
+        sums = rolling_sums(df, ['Pts', 'Min', 'Fixtures', 'Apps'], window, keys)
+        features[f'PPG_last_{window}_GW'] = sums['Pts'] / sums['Apps'].replace(0, np.nan)
+        features[f'Min_share_last_{window}_GW'] = sums['Min'] / (90 * sums['Fixtures'])
+
+        starts = rolling_sums(df, ['Starts'], window, keys)['Starts']
+        features[f'Starts_last_{window}_GW'] = starts.where(df['Starts'].notna())
+
+    return features
+
+def form_columns(windows=FORM_WINDOWS):
+    """
+    Lists the form columns produced for the given windows.
+    """
+    return [f'{name}_last_{window}_GW' for window in windows for name in ['PPG', 'Min_share', 'Starts']]
+
+def add_form_features(df, gameweeks, windows=FORM_WINDOWS, previous_season=False, cutoff_gameweek=None):
+    """
+    Adds each player's form to a season-level table such as fantasy_data_history.csv.
+
+    By default a row gets the form as of the last stored gameweek of its own season,
+    which is what the current season table needs. A season's own gameweeks make up
+    its PPG, so a table whose rows are targets (the history table) uses
+    previous_season: a row then gets the form as of the end of the season before it,
+    like the other lag features.
+
+    Args:
+        df (pd.DataFrame): Table with one row per ID and season.
+        gameweeks (pd.DataFrame): Stored gameweeks, see read_gameweeks.
+        windows (list): Window lengths in gameweeks.
+        previous_season (bool): Join the form of the previous season instead of the
+            row's own season.
+        cutoff_gameweek (int): Form as of this gameweek of the season read instead
+            of its last stored gameweek.
+
+    Returns:
+        pd.DataFrame: df with the form columns added (NaN where no gameweeks are stored),
+        replacing any existing ones.
+    """
+    features = calculate_form_features(gameweeks, windows)
+    if cutoff_gameweek is not None:
+        features = features[features['GW'] <= cutoff_gameweek]
+    latest = features.groupby(['ID', 'season'], sort=False, observed=True).tail(1)
+    latest = latest.drop(columns='GW')
+    latest['season'] = latest['season'].astype(str)
+
+    key_season = df['season'].astype(str)
+    if previous_season:
+        # The form of each season is joined to the rows of the season after it
+        seasons = sorted(set(key_season) | set(latest['season']))
+        next_season = dict(zip(seasons[:-1], seasons[1:]))
+        latest['season'] = latest['season'].map(next_season)
+        latest = latest[latest['season'].notna()]
+
+    df = df.drop(columns=[col for col in form_columns(windows) if col in df.columns])
+    merged = df.assign(season=key_season).merge(latest, on=['ID', 'season'], how='left')
+    merged['season'] = df['season'].values
+    merged.index = df.index
+    return merged
+
+def main(seasons=None, base_url=BASE_URL, cache_dir=fetcher.DEFAULT_CACHE_DIR, offline=False, root=GAMEWEEK_PATH):
+    """
+    Downloads the merged_gw.csv of each season through the local cache and stores
+    the gameweeks that are new or changed.
+
+    Args:
+        seasons (list): Seasons to ingest. Defaults to every season in history_data
+            and the current season.
+        base_url (str): Root of the data repository, http(s):// or file://.
+        cache_dir (str): Directory of the local download cache.
+        offline (bool): Use the cache only, without network requests.
+        root (str): Root directory of the gameweek store.
+    """
+    if seasons is None:
+        seasons = list(get_season_files()) + [CURRENT_SEASON]
+
+    urls = [gameweek_url(base_url, season) for season in seasons]
+    results = asyncio.run(fetcher.fetch_all(urls, cache_dir, offline=offline))
+
+    for season, (content, _) in zip(seasons, results):
+        frame = parse_gameweeks(content, element_codes(season), season)
+        written = append_gameweeks(frame, season, root)
+        print(f'{season}: {written} new or updated gameweeks, stored up to GW {last_stored_gameweek(season, root)}')
+
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Ingest the per-gameweek player histories into the gameweek store.')
+    parser.add_argument('--seasons', nargs='+', help='seasons to ingest (default: every season in history_data and the current season)')
+    parser.add_argument('--base-url', default=BASE_URL, help='data repository root, http(s):// or file://')
+    parser.add_argument('--cache-dir', default=fetcher.DEFAULT_CACHE_DIR, help='local download cache')
+    parser.add_argument('--offline', action='store_true', help='use the local cache only')
+    parser.add_argument('--root', default=GAMEWEEK_PATH, help='gameweek store directory')
+    args = parser.parse_args(argv)
+    main(args.seasons, args.base_url, args.cache_dir, args.offline, args.root)
+
+if __name__ == '__main__':
+    command_line()
@@ -1,32 +1,113 @@
+import argparse
+from array import array
+
+import numpy as np
 import pandas as pd
-import requests
+
+import bootstrap_snapshots
+import json_stream
 
 s = '2025-26'
 url = 'https://fantasy.premierleague.com/api/bootstrap-static/'
 
-response = requests.get(url)
-data = response.json()
+# Select and reorder columns. 'id' is the season-specific element id, kept to map the
+# gameweek histories to player codes (see gameweek_history.py)
+columns_to_keep = ['code', 'id', 'minutes', 'points_per_game', 'web_name', 'team_code', 'element_type', 'season']
+
+# Fields held in typed int64 buffers while streaming; the others are kept as Python objects
+int_columns = ['code', 'id', 'minutes', 'team_code', 'element_type']
+
+def append_value(buffers, col, value):
+    """
+    Appends a value to a column buffer, turning a typed buffer into a plain list
+    if the value does not fit (e.g. a null).
+    """
+    try:
+        buffers[col].append(value)
+    except TypeError:
+        buffers[col] = list(buffers[col]) + [value]
+
+def extract_players(stream, season=s):
+    """
+    Builds the current season player table from a bootstrap-static payload stream.
+
+    The 'elements' array is walked one element at a time: unavailable players are
+    skipped during the walk and only the kept fields are copied into column buffers,
+    so the whole document is never held in memory.
+
+    Args:
+        stream: Binary file-like object with the bootstrap-static JSON.
+        season (str): The season to tag the rows with.
 
-df = pd.json_normalize(data['elements'])
+    Returns:
+        pd.DataFrame: One row per available player, with columns_to_keep.
+    """
+    element_columns = [col for col in columns_to_keep if col != 'season']
+    buffers = {col: array('q') if col in int_columns else [] for col in element_columns}
 
-# Filter out players that are unavailable
-df = df[df['status'] != 'u']
+    for element in json_stream.iter_array_items(stream, 'elements'):
+        # Filter out players that are unavailable
+        if element.get('status') == 'u':
+            continue
+        for col in element_columns:
+            append_value(buffers, col, element.get(col))
 
+    df = pd.DataFrame({
+        col: np.frombuffer(buffer, dtype=np.int64) if isinstance(buffer, array) else buffer
+        for col, buffer in buffers.items()
+    }, columns=element_columns)
 
-# Add season column
-df['season'] = s
+    # Add season column
+    df['season'] = season
+    return df
 
-# Select and reorder columns
-columns_to_keep = ['code', 'minutes', 'points_per_game', 'web_name', 'team_code', 'element_type', 'season']
-df = df[columns_to_keep]
+def main(url=url, snapshot_dir=bootstrap_snapshots.SNAPSHOT_DIR, force=False):
+    """
+    Polls bootstrap-static, snapshots the response and rewrites the current season
+    file only when the payload changed.
 
+    Args:
+        url (str): The bootstrap-static endpoint.
+        snapshot_dir (str): Directory of the compressed response snapshots.
+        force (bool): Rewrite the current season file even if the payload did not change.
 
-# Rename id to code to match historical data
-#df.rename(columns={'id': 'code'}, inplace=True)
-df.to_csv(f'curr_data/{s}_data.csv', index=False)
+    Returns:
+        bool: True if the current season file was written.
+    """
+    session = bootstrap_snapshots.create_session()
+    latest = bootstrap_snapshots.load_latest(snapshot_dir)
+    with bootstrap_snapshots.fetch(session, url, latest) as response:
+        if response.status_code == 304:
+            changed = False
+        else:
+            # The body is streamed into the snapshot, then extracted from it below
+            latest, changed = bootstrap_snapshots.save_snapshot(response, snapshot_dir)
+
+    if not changed and not force:
+        print(f"bootstrap-static unchanged since {latest['file']}, skipping processing.")
+        return False
+
+    with bootstrap_snapshots.open_snapshot(latest['file'], snapshot_dir) as stream:
+        df = extract_players(stream)
+
+    # Rename id to code to match historical data
+    #df.rename(columns={'id': 'code'}, inplace=True)
+    df.to_csv(f'curr_data/{s}_data.csv', index=False)
+    print(f"New snapshot {latest['file']}, wrote curr_data/{s}_data.csv")
+    return True
+
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Snapshot bootstrap-static and extract the current season players.')
+    parser.add_argument('--url', default=url, help='bootstrap-static endpoint')
+    parser.add_argument('--snapshot-dir', default=bootstrap_snapshots.SNAPSHOT_DIR, help='directory of the response snapshots')
+    parser.add_argument('--force', action='store_true', help='process the payload even if it did not change')
+    args = parser.parse_args(argv)
+    main(args.url, args.snapshot_dir, args.force)
+
+if __name__ == '__main__':
+    command_line()
 
 # Create new columns
 # Just for 'New In League' Players
 # Get the maximum PPG of a player in his team and in his position, in the previous season
 # Get the if a player with > 3 PPG and minutes > 1500 left the club (i.e, in the past season the team had a player with more than 3 PPG and now this player isn't in the team)
-
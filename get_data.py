@@ -1,9 +1,62 @@
+import argparse
+import asyncio
+import io
+import os
+
 import pandas as pd
 
+import fetcher
+
 seasons = ['2016-17', '2017-18', '2018-19', '2019-20', '2020-21', '2021-22', '2022-23', '2023-24',
            '2024-25']
 
-for s in seasons:
-    df = pd.read_csv(f'https://raw.githubusercontent.com/vaastav/Fantasy-Premier-League/refs/heads/master/data/{s}/players_raw.csv')
+BASE_URL = 'https://raw.githubusercontent.com/vaastav/Fantasy-Premier-League/refs/heads/master/data'
+
+def season_url(base_url, season):
+    """
+    Returns the players_raw.csv URL of a season. base_url can be http(s):// or file://.
+    """
+    return f'{base_url.rstrip("/")}/{season}/players_raw.csv'
+
+def write_season(content, season, path='history_data'):
+    """
+    Writes a downloaded players_raw.csv to history_data/{season}_data.csv.
+    """
+    df = pd.read_csv(io.BytesIO(content))
+    df.to_csv(os.path.join(path, f'{season}_data.csv'))
+
+def main(base_url=BASE_URL, cache_dir=fetcher.DEFAULT_CACHE_DIR, concurrency=4, offline=False, force=False):
+    """
+    Downloads every season concurrently through the local cache and writes the season
+    files whose content changed since the last download.
+
+    Args:
+        base_url (str): Root of the data repository, http(s):// or file://.
+        cache_dir (str): Directory of the local download cache.
+        concurrency (int): Maximum number of downloads in flight.
+        offline (bool): Use the cache only, without network requests.
+        force (bool): Rewrite the season files even if their content did not change.
+    """
+    urls = [season_url(base_url, s) for s in seasons]
+    results = asyncio.run(fetcher.fetch_all(urls, cache_dir, concurrency, offline))
+
+    for s, (content, changed) in zip(seasons, results):
+        output = os.path.join('history_data', f'{s}_data.csv')
+        if not changed and not force and os.path.exists(output):
+            print(f'{s}: unchanged')
+            continue
+        write_season(content, s)
+        print(f'{s}: written to {output}')
+
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Download the historical players_raw.csv of every season.')
+    parser.add_argument('--base-url', default=BASE_URL, help='data repository root, http(s):// or file://')
+    parser.add_argument('--cache-dir', default=fetcher.DEFAULT_CACHE_DIR, help='local download cache')
+    parser.add_argument('--concurrency', type=int, default=4, help='maximum downloads in flight')
+    parser.add_argument('--offline', action='store_true', help='use the local cache only')
+    parser.add_argument('--force', action='store_true', help='rewrite season files even if unchanged')
+    args = parser.parse_args(argv)
+    main(args.base_url, args.cache_dir, args.concurrency, args.offline, args.force)
 
-    df.to_csv(f'history_data/{s}_data.csv')
\ No newline at end of file
+if __name__ == '__main__':
+    command_line()
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+# Lag features are declared as: feature -> (value column, aggregation, seasons, partition).
+# A feature aggregates the value column over the partition's last `seasons` rows before
+# the current one, e.g. ('Min', 'mean', 3, ('ID', 'team_code')) is the mean minutes of
+# the player's last 3 earlier seasons at the current team, even when there were seasons
+# at other clubs in between. 'last' takes the previous row's value (seasons must be 1);
+# the other aggregations are pandas rolling aggregations ('mean', 'sum', 'max', 'min')
+# over the seasons available, so a player with one earlier season gets that season.
+#
+# All the features are computed over one sort by (ID, season). Each partition is ordered
+# once, so its groups are contiguous, and each value column is shifted once along that
+# order. Every window is then one rolling aggregation over the whole shifted column, with
+# window bounds cut at the group starts and shared by all the columns of the partition.
+# These are the bounds and the aggregation kernel of a groupby().rolling(), so the
+# values are bit-identical to it without its per-group overhead.
+
+HISTORICAL_FEATURES = {
+    # --- Historical PPG ---
+    'points_last_season': ('PPG', 'last', 1, ('ID',)),
+    'avg_points_last_2_seasons': ('PPG', 'mean', 2, ('ID',)),
+    'avg_points_last_3_seasons': ('PPG', 'mean', 3, ('ID',)),
+    # --- Historical Minutes (Overall) ---
+    'minutes_last_season': ('Min', 'last', 1, ('ID',)),
+    'avg_minutes_last_2_seasons': ('Min', 'mean', 2, ('ID',)),
+    'avg_minutes_last_3_seasons': ('Min', 'mean', 3, ('ID',)),
+    # --- Historical Minutes (Same Team) ---
+    'minutes_last_season_same_team': ('Min', 'last', 1, ('ID', 'team_code')),
+    'avg_minutes_last_2_seasons_same_team': ('Min', 'mean', 2, ('ID', 'team_code')),
+    'avg_minutes_last_3_seasons_same_team': ('Min', 'mean', 3, ('ID', 'team_code')),
+}
+
+SAME_TEAM_FEATURES = {feature: spec for feature, spec in HISTORICAL_FEATURES.items() if spec[3] == ('ID', 'team_code')}
+
+AGGREGATIONS = ['last', 'mean', 'sum', 'max', 'min']
+
+def compile_features(features):
+    """
+    Groups feature declarations by partition and value column, so each partition is
+    grouped once and each column shifted once.
+
+    Returns:
+        dict: partition -> {value column -> [(feature, aggregation, seasons)]}.
+    """
+    plan = {}
+    for feature, (column, aggregation, seasons, partition) in features.items():
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation for {feature}: {aggregation}")
+        if aggregation == 'last' and seasons != 1:
+            raise ValueError(f"'last' takes 1 season, {feature} has {seasons}")
+        plan.setdefault(tuple(partition), {}).setdefault(column, []).append((feature, aggregation, seasons))
+    return plan
+
+class GroupWindows(BaseIndexer):
+    """
+    Rolling window bounds given as arrays, for windows that must not cross group starts.
+    """
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        return self.start, self.end
+
+def partition_order(df_sorted, partition):
+    """
+    Orders the rows of df_sorted by partition group, keeping their order within a group.
+
+    Returns:
+        tuple: (row positions in partition order, start position of each ordered row's
+        group). Rows with a missing partition key are left out.
+    """
+    keys = [df_sorted[key] for key in partition]
+    codes = df_sorted.groupby(keys, sort=False, observed=True).ngroup().to_numpy()
+    rows = np.flatnonzero(~np.isnan(codes))
+    order = rows[np.argsort(codes[rows], kind='stable')]
+
+    ordered_codes = codes[order]
+    positions = np.arange(len(order))
+    new_group = np.ones(len(order), dtype=bool)
+    new_group[1:] = ordered_codes[1:] != ordered_codes[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0)) if len(order) else positions
+    return order, group_start
+
+def calculate_lag_features(df_sorted, features=HISTORICAL_FEATURES):
+    """
+    Computes declared lag features over player data sorted by ID and season.
+
+    Players without a value in a partition key (e.g. no team_code) are left as NaN
+    for the features of that partition.
+
+    Args:
+        df_sorted (pd.DataFrame): Player data sorted by ID and season.
+        features (dict): Feature declarations, see HISTORICAL_FEATURES.
+
+    Returns:
+        pd.DataFrame: One column per feature, in declaration order, aligned on df_sorted's index.
+    """
+    computed = {}
+    for partition, columns in compile_features(features).items():
+        order, group_start = partition_order(df_sorted, partition)
+        positions = np.arange(len(order))
+        # The first row of a group has no previous season
+        first = positions == group_start
+        windows = {}
+
+        for column, column_features in columns.items():
+            values = df_sorted[column].to_numpy(dtype='float64', na_value=np.nan)[order]
+            shifted = np.empty(len(order))
+            shifted[1:] = values[:-1]
+            shifted[first] = np.nan
+            shifted = pd.Series(shifted)
+
+            for feature, aggregation, seasons in column_features:
+                if aggregation == 'last':
+                    result = shifted.to_numpy()
+                else:
+                    if seasons not in windows:
+                        start = np.maximum(positions - seasons + 1, group_start).astype('int64')
+                        windows[seasons] = GroupWindows(start=start, end=(positions + 1).astype('int64'))
+                    result = shifted.rolling(windows[seasons], min_periods=1).agg(aggregation).to_numpy()
+                feature_values = np.full(len(df_sorted), np.nan)
+                feature_values[order] = result
+                computed[feature] = feature_values
+
+    return pd.DataFrame({feature: computed[feature] for feature in features}, index=df_sorted.index)
+
+def calculate_same_team_minutes(df_sorted):
+    """
+    Calculates minutes played in prior seasons for the *same team* as the current season.
+
+    Args:
+        df_sorted (pd.DataFrame): Player data sorted by ID and season.
+
+    Returns:
+        pd.DataFrame: The three same-team minutes columns, aligned on df_sorted's index.
+    """
+    return calculate_lag_features(df_sorted, SAME_TEAM_FEATURES)
+
+def calculate_historical_features(df, features=HISTORICAL_FEATURES):
+    """
+    Calculates historical performance metrics for each player.
+
+    This includes:
+    - PPG from prior seasons (last 1, avg last 2, avg last 3).
+    - Minutes played in prior seasons (last 1, avg last 2, avg last 3).
+    - Minutes played in prior seasons for the *same team* as the current season.
+
+    All metrics are computed column-wise over the whole frame with grouped
+    shifts and rolling means, instead of one Python loop per player.
+
+    Args:
+        df (pd.DataFrame): The DataFrame with player data for all seasons.
+        features (dict): Feature declarations, see HISTORICAL_FEATURES.
+
+    Returns:
+        pd.DataFrame: The DataFrame with all historical columns added.
+    """
+    df_sorted = df.sort_values(by=['ID', 'season']).copy()
+    return df_sorted.join(calculate_lag_features(df_sorted, features))
@@ -0,0 +1,175 @@
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# A pipeline run records one entry per stage (load, features, write...) with its wall
+# and CPU time, the rows and in-memory size of the frames going in and out and,
+# when profiling, the tracemalloc peak and the top cProfile functions. The run is
+# written as one JSON report that a scheduler can scrape.
+
+REPORT_VERSION = 1
+
+# cProfile functions kept per stage, by cumulative time
+PROFILE_TOP = 15
+
+def frame_rows(value):
+    """
+    Number of rows of a DataFrame or Series, None for anything else.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+def frame_bytes(value):
+    """
+    In-memory size of a DataFrame or Series, counting the contents of object columns.
+    None for anything else.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    return None
+
+def top_functions(profiler, limit=PROFILE_TOP):
+    """
+    Lists the functions of a cProfile run with the highest cumulative time.
+
+    Returns:
+        list: Dicts with 'function', 'calls', 'total_seconds' and 'cumulative_seconds'.
+    """
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f'{os.path.basename(filename)}:{line}({name})',
+            'calls': calls,
+            'total_seconds': total,
+            'cumulative_seconds': cumulative,
+        })
+    rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+    return rows[:limit]
+
+class PipelineReport:
+    """
+    Collects the stage timings of one pipeline run.
+
+    Args:
+        pipeline (str): Name of the pipeline, e.g. 'build_analysis_data'.
+        profile (bool): Also capture a cProfile and the tracemalloc peak of every
+            stage. Both slow the stages down, so their times are not comparable with
+            unprofiled runs.
+    """
+    def __init__(self, pipeline, profile=False):
+        self.pipeline = pipeline
+        self.profile = profile
+        self.stages = []
+        self.started_at = datetime.now(timezone.utc)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    def stage(self, name, func, *args, **kwargs):
+        """
+        Runs func(*args, **kwargs) as a stage and records it.
+
+        Rows and size in are taken from the first argument, rows and size out from the
+        result, when they are DataFrames.
+
+        Returns:
+            The result of func.
+        """
+        source = args[0] if args else None
+        entry = {'stage': name, 'rows_in': frame_rows(source), 'bytes_in': frame_bytes(source)}
+
+        profiler = cProfile.Profile() if self.profile else None
+        # Tracing started by the caller (e.g. a benchmark) is left running, and its peak is not reset
+        started_tracing = self.profile and not tracemalloc.is_tracing()
+        if self.profile:
+            if started_tracing:
+                tracemalloc.start()
+            traced_start, peak_start = tracemalloc.get_traced_memory()
+            profiler.enable()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            entry['wall_seconds'] = time.perf_counter() - wall_start
+            entry['cpu_seconds'] = time.process_time() - cpu_start
+            if self.profile:
+                profiler.disable()
+                _, peak_end = tracemalloc.get_traced_memory()
+                # The stage's own peak, above what was traced when it started. Under the
+                # caller's tracing, a stage that stays below the caller's earlier peak does
+                # not move it, and is only known to peak at most this much.
+                entry['peak_traced_bytes'] = peak_end - traced_start
+                entry['peak_is_upper_bound'] = not started_tracing and peak_end == peak_start
+                if started_tracing:
+                    tracemalloc.stop()
+
+        entry['rows_out'] = frame_rows(result)
+        entry['bytes_out'] = frame_bytes(result)
+        if self.profile:
+            entry['top_functions'] = top_functions(profiler)
+        self.stages.append(entry)
+        return result
+
+    def to_dict(self):
+        """
+        The report as a JSON-serializable dict.
+        """
+        return {
+            'version': REPORT_VERSION,
+            'pipeline': self.pipeline,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_seconds': time.perf_counter() - self._wall_start,
+            'cpu_seconds': time.process_time() - self._cpu_start,
+            'profile': self.profile,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'stages': self.stages,
+        }
+
+    def write(self, path):
+        """
+        Writes the report as JSON.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self):
+        """
+        One line per stage with its times, rows and output size.
+        """
+        lines = []
+        for entry in self.stages:
+            line = f"{entry['stage']:>30}: {entry['wall_seconds']:7.3f}s wall, {entry['cpu_seconds']:7.3f}s cpu"
+            if entry['rows_in'] is not None and entry['rows_out'] is not None:
+                line += f", {entry['rows_in']} -> {entry['rows_out']} rows"
+            elif entry['rows_out'] is not None:
+                line += f", {entry['rows_out']} rows"
+            if entry['bytes_out'] is not None:
+                line += f", {entry['bytes_out'] / 2**20:.1f} MiB"
+            if 'peak_traced_bytes' in entry:
+                bound = '<= ' if entry['peak_is_upper_bound'] else ''
+                line += f", peak {bound}{entry['peak_traced_bytes'] / 2**20:.1f} MiB"
+            lines.append(line)
+        return '\n'.join(lines)
+
+def run_stage(report, name, func, *args, **kwargs):
+    """
+    Runs func as a stage of report, or just calls it if there is no report.
+    """
+    if report is None:
+        return func(*args, **kwargs)
+    return report.stage(name, func, *args, **kwargs)
@@ -0,0 +1,124 @@
+import codecs
+import json
+
+# Incremental reader for large JSON documents shaped like the FPL API responses:
+# a top-level object with one big array (bootstrap-static 'elements', event/{id}/live
+# 'elements', element-summary 'history') that we want item by item. Only one item
+# is decoded at a time, so memory stays bounded by the largest item, not the document.
+
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+def iter_array_items(stream, key, chunk_size=1 << 16):
+    """
+    Yields the items of the array stored under a top-level key of a JSON object.
+
+    The stream is read in chunks; other top-level values are decoded one at a time
+    and dropped.
+
+    Args:
+        stream: A binary file-like object (e.g. an open file or gzip stream).
+        key (str): The top-level key holding the array.
+        chunk_size (int): Number of bytes read at a time.
+
+    Yields:
+        The decoded array items, in document order.
+    """
+    reader = _Reader(stream, chunk_size)
+
+    reader.expect('{')
+    while True:
+        if reader.peek() == '}':
+            return
+        name = reader.decode_value()
+        reader.expect(':')
+
+        if name != key:
+            reader.decode_value()
+        else:
+            reader.expect('[')
+            if reader.peek() == ']':
+                reader.advance()
+            else:
+                while True:
+                    yield reader.decode_value()
+                    if reader.peek() == ',':
+                        reader.advance()
+                        continue
+                    reader.expect(']')
+                    break
+
+        if reader.peek() == ',':
+            reader.advance()
+            continue
+        reader.expect('}')
+        return
+
+class _Reader:
+    """
+    Text buffer over a binary stream, refilled as values are consumed.
+    """
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, size=None):
+        """
+        Reads one more chunk into the buffer. Returns False at the end of the stream.
+        """
+        if self.eof:
+            return False
+        chunk = self.stream.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            self.buffer += self.decoder.decode(b'', final=True)
+            return False
+        # Drop the consumed part before growing the buffer
+        self.buffer = self.buffer[self.pos:] + self.decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Returns the next non-whitespace character without consuming it.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def advance(self):
+        self.pos += 1
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {found!r}")
+        self.advance()
+
+    def decode_value(self):
+        """
+        Decodes the next JSON value, reading more of the stream until it is complete.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                # A number running into the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Read at least as much as is pending, so a long value is not re-parsed once per chunk
+            self.fill(max(self.chunk_size, len(self.buffer) - self.pos))
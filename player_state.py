@@ -0,0 +1,138 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import storage
+from data_loader import PAST_COLUMNS
+from historical_features import HISTORICAL_FEATURES, calculate_historical_features, calculate_same_team_minutes
+
+STATE_FILE = 'player_state.csv'
+TEAM_STATE_FILE = 'player_team_state.csv'
+
+# The player state is what the next season's features need from the past, per player:
+# the player's latest season (team, position, PPG, minutes...), the number of seasons
+# in the league and the history features of a next-season row. The team state holds
+# the same-team minutes features of a next-season row at each of the player's past
+# teams. With both, the features of a new season are index lookups on its own rows.
+#
+# The history features are computed by appending one placeholder next-season row per
+# player (and per player and team) to the history and running the same grouped shifts
+# and rolling means, so the values are exactly those of a run over the whole history.
+
+# A season name sorting after every real season
+NEXT_SEASON = '~next'
+
+PLAYER_FEATURES = [feature for feature, spec in HISTORICAL_FEATURES.items() if spec[3] == ('ID',)]
+TEAM_FEATURES = [feature for feature, spec in HISTORICAL_FEATURES.items() if spec[3] == ('ID', 'team_code')]
+
+def next_season_rows(keys):
+    """
+    Placeholder next-season rows for the given ID (and team_code) keys, with no PPG or minutes.
+    """
+    rows = keys.copy()
+    rows['season'] = NEXT_SEASON
+    rows['PPG'] = np.nan
+    rows['Min'] = np.nan
+    return rows
+
+def player_state(history):
+    """
+    Builds the state of every player of the history table.
+
+    Args:
+        history (pd.DataFrame): Past player seasons with ID, season, team_code, PPG, Min
+            and the PAST_COLUMNS available.
+
+    Returns:
+        pd.DataFrame: One row per ID with the latest season's columns (in the history's
+        column order), time_in_league and PLAYER_FEATURES of the next season.
+    """
+    history = history.assign(season=history['season'].astype(str))
+    last_columns = [col for col in history.columns if col in PAST_COLUMNS]
+    latest = history.sort_values(['ID', 'season']).drop_duplicates('ID', keep='last')[last_columns]
+
+    placeholders = next_season_rows(pd.DataFrame({'ID': latest['ID'].to_numpy(), 'team_code': np.nan}))
+    frame = pd.concat([history[['ID', 'season', 'team_code', 'PPG', 'Min']], placeholders], ignore_index=True)
+    with_features = calculate_historical_features(frame)
+    next_rows = with_features[with_features['season'] == NEXT_SEASON].set_index('ID')
+
+    state = latest.set_index('ID', drop=False)
+    state['time_in_league'] = history.groupby('ID').size()
+    for col in PLAYER_FEATURES:
+        state[col] = next_rows[col]
+    return state.reset_index(drop=True)
+
+def team_state(history):
+    """
+    Builds the same-team minutes state of every (ID, team_code) of the history table.
+
+    Returns:
+        pd.DataFrame: One row per (ID, team_code) with TEAM_FEATURES of the next season.
+    """
+    history = history[['ID', 'season', 'team_code', 'Min']].assign(season=history['season'].astype(str))
+    pairs = history[['ID', 'team_code']].dropna().drop_duplicates()
+    frame = pd.concat([history, next_season_rows(pairs)], ignore_index=True)
+    df_sorted = frame.sort_values(['ID', 'season']).copy()
+    df_sorted = df_sorted.join(calculate_same_team_minutes(df_sorted))
+    next_rows = df_sorted[df_sorted['season'] == NEXT_SEASON]
+    return next_rows[['ID', 'team_code'] + TEAM_FEATURES].reset_index(drop=True)
+
+def last_season_rows(state):
+    """
+    The rows of the latest past season, rebuilt from the player state.
+    """
+    last_season = state['season'].max()
+    columns = [col for col in state.columns if col in PAST_COLUMNS]
+    return state.loc[state['season'] == last_season, columns].reset_index(drop=True)
+
+def state_features(df, state, teams):
+    """
+    Looks up time_in_league and the history features of new season rows.
+
+    Args:
+        df (pd.DataFrame): The new season's rows, with ID and team_code.
+        state (pd.DataFrame): The player state, see player_state.
+        teams (pd.DataFrame): The team state, see team_state.
+
+    Returns:
+        pd.DataFrame: time_in_league, PLAYER_FEATURES and TEAM_FEATURES, aligned on df's index.
+        Players with no past seasons get 0 seasons in the league and NaN features.
+    """
+    rows = pd.Index(state['ID']).get_indexer(df['ID'])
+    found = rows >= 0
+
+    features = pd.DataFrame(index=df.index)
+    features['time_in_league'] = np.where(found, state['time_in_league'].to_numpy()[rows], 0).astype('int64')
+    for col in PLAYER_FEATURES:
+        features[col] = np.where(found, state[col].to_numpy(dtype='float64')[rows], np.nan)
+
+    team_keys = pd.MultiIndex.from_arrays([teams['ID'].to_numpy(), teams['team_code'].to_numpy(dtype='float64')])
+    team_rows = team_keys.get_indexer(pd.MultiIndex.from_arrays([df['ID'].to_numpy(), np.asarray(df['team_code'], dtype='float64')]))
+    for col in TEAM_FEATURES:
+        features[col] = np.where(team_rows >= 0, teams[col].to_numpy(dtype='float64')[team_rows], np.nan)
+    return features
+
+def read_state(history_file, path=STATE_FILE, team_path=TEAM_STATE_FILE):
+    """
+    Reads the player and team states written with a history table, or None if they are
+    missing or older than the history table.
+
+    Returns:
+        tuple: (player state, team state), or None.
+    """
+    for state_path in [path, team_path]:
+        if not os.path.exists(state_path) or not os.path.exists(history_file):
+            return None
+        if os.path.getmtime(state_path) < os.path.getmtime(history_file):
+            return None
+    # The CSVs are read with round_trip parsing so the averages are bit-identical to the
+    # ones computed over the whole history
+    return storage.read_csv(path, float_precision='round_trip'), storage.read_csv(team_path, float_precision='round_trip')
+
+def write_state(history, path=STATE_FILE, team_path=TEAM_STATE_FILE):
+    """
+    Builds and writes the player and team states of a history table.
+    """
+    storage.write_table(player_state(history), path)
+    storage.write_table(team_state(history), team_path)
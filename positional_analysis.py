@@ -1,60 +1,18 @@
-import pandas as pd
-import glob
-import os
+import argparse
+import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 from scipy.stats import linregress
+from data_loader import load_history
+from season_ranks import RankIndex
 
-def load_data():
+def points_ranks(df):
     """
-    Loads all player data from CSV files in the history_data directory,
-    selects specific columns, and adds a 'season' column based on the filename.
-
-    Returns:
-        pandas.DataFrame: A single DataFrame containing all historical data.
+    Total Points ranks by position of the players with more than 1200 minutes.
     """
-    path = 'history_data'
-    all_files = glob.glob(os.path.join(path, "*_data.csv"))
-    
-    li = []
-    
-    cols_to_use = ['code', 'minutes', 'points_per_game', 'total_points', 'birth_date', 'web_name', 'team_code', 'team_join_date', 'element_type']
-
-    for filename in all_files:
-        df = pd.read_csv(filename, index_col=None, header=0, encoding='utf-8-sig')
-        df.columns = df.columns.str.replace('"', '') # Clean column names
-
-        # Extract season from filename
-        season = os.path.basename(filename).split('_data.csv')[0]
-        df['season'] = season
-        
-        # Ensure all requested columns are present, fill missing with NaN
-        for col in cols_to_use:
-            if col not in df.columns:
-                df[col] = pd.NA
-
-        # Select only the required columns
-        df = df[cols_to_use + ['season']]
-        
-        li.append(df)
-
-    frame = pd.concat(li, axis=0, ignore_index=True)
-    
-    # Rename to old column names
-    frame.rename(columns={
-        'code': 'ID',
-        'web_name': 'Player Name',
-        'element_type': 'Position',
-        'total_points': 'Tot Pts',
-        'points_per_game': 'PPG',
-        'minutes': 'Min'
-    }, inplace=True)
-    
-    positions = {1: 'GK', 2: 'DEF', 3: 'MID', 4: 'FWD'}
-    frame['Position'] = frame.Position.map(positions)
-    return frame
+    return RankIndex(df[df['Min'] > 1200], 'Tot Pts', by=['Position'])
 
-def plot_position_curve_with_slope(df, position):
+def plot_position_curve_with_slope(df, position, ranks=None):
     """
     Filters data for a specific position, plots a curve of Total Points vs. Player Rank,
     and includes the slope in the title.
@@ -62,14 +20,17 @@ def plot_position_curve_with_slope(df, position):
     Args:
         df (pd.DataFrame): The DataFrame containing all player data.
         position (str): The position to plot (e.g., 'STR', 'MID', 'DEF').
+        ranks (RankIndex): The points_ranks of df, built once for all the positions when given.
     """
-    df_filtered = df[(df['Min'] > 1200) & (df['Position'] == position)].copy()
-    df_sorted = df_filtered.sort_values('Tot Pts', ascending=False).reset_index(drop=True)
+    if ranks is None:
+        ranks = points_ranks(df)
+    points = ranks.curve(position)
+    player_rank = np.arange(len(points))
     
-    slope, intercept, r_value, p_value, std_err = linregress(df_sorted.index, df_sorted['Tot Pts'])
+    slope, intercept, r_value, p_value, std_err = linregress(player_rank, points)
     
     plt.figure(figsize=(12, 8))
-    ax = sns.lineplot(x=df_sorted.index, y=df_sorted['Tot Pts'])
+    ax = sns.lineplot(x=player_rank, y=points)
     
     title = f'Total Points vs. Player Rank for {position}s (Minutes > 1200)\nSlope: {slope:.2f}'
     ax.set_title(title)
@@ -108,7 +69,7 @@ def plot_average_players_by_season(df):
         df (pd.DataFrame): The DataFrame containing all player data.
     """
     df_filtered = df[(df['PPG'] > 4.4) & (df['Min'] > 1200)]
-    season_counts = df_filtered.groupby(['season', 'Position']).size().unstack(fill_value=0)
+    season_counts = df_filtered.groupby(['season', 'Position'], observed=True).size().unstack(fill_value=0)
     average_counts = season_counts.mean()
 
     plt.figure(figsize=(10, 6))
@@ -128,16 +89,17 @@ def main():
     """
     Main function to run the analysis.
     """
-    all_data = load_data()
+    all_data = load_history()
     
     positions_to_plot = ['FWD', 'MID', 'DEF']
+    ranks = points_ranks(all_data)
     
     for position in positions_to_plot:
-        plot_position_curve_with_slope(all_data, position)
+        plot_position_curve_with_slope(all_data, position, ranks)
 
     plot_position_boxplot(all_data)
     
-    all_data[(all_data['Min'] > 1200)].groupby('Position')['PPG'].mean()
+    all_data[(all_data['Min'] > 1200)].groupby('Position', observed=True)['PPG'].mean()
     
     plot_average_players_by_season(all_data)
 
@@ -147,5 +109,10 @@ def main():
 
 
 
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Plot the points curves and distributions by position, interactively.')
+    parser.parse_args(argv)
+    main()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    command_line()
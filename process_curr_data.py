@@ -1,49 +1,48 @@
+import argparse
 import pandas as pd
 import numpy as np
+import gameweek_history
+import player_state
+import season_transitions
+import storage
+import team_context
+from instrumentation import PipelineReport, run_stage
+from data_loader import CURRENT_SEASON, HISTORY_FILE, PAST_COLUMNS, load_current_season
+from historical_features import calculate_historical_features
+
+def current_transitions(current_season_df, past_seasons_df):
+    """
+    Builds the transition table of the current season from the last past season only.
+    """
+    last_season = past_seasons_df['season'].max()
+    last_season_df = past_seasons_df[past_seasons_df['season'] == last_season]
+    return season_transitions.append_season(season_transitions.transition_table(last_season_df), current_season_df)
 
-def load_data():
-    cols_to_use = ['code', 'minutes', 'points_per_game', 'web_name', 'team_code', 'element_type', 'season']
-    
-    df = pd.read_csv('curr_data/2025-26_data.csv')
-    
-    df['season'] = ['2025-26']*len(df)
-    df = df[cols_to_use]
-    df.rename(columns={
-        'code': 'ID',
-        'web_name': 'Player Name',
-        'element_type': 'Position',
-        'points_per_game': 'PPG',
-        'minutes': 'Min'
-    }, inplace=True)
-
-    return df
-
-def calculate_new_in_league(current_season_df, past_seasons_df):
+def calculate_new_in_league(current_season_df, past_seasons_df, transitions=None):
     """
     Calculates the 'New In League' feature for each player for the current season.
+
+    transitions is a transition table with the current season appended (see
+    season_transitions.py). Built from the last past season if None.
     """
-    last_season = past_seasons_df['season'].max()
-    players_in_last_season = past_seasons_df[past_seasons_df['season'] == last_season]['ID'].unique()
+    if transitions is None:
+        transitions = current_transitions(current_season_df, past_seasons_df)
     
-    current_season_df['New In League'] = ~current_season_df['ID'].isin(players_in_last_season)
+    current_season_df['New In League'] = season_transitions.transition_flags(current_season_df, transitions)['New In League']
     
     return current_season_df
 
-def calculate_new_in_team(current_season_df, past_seasons_df):
+def calculate_new_in_team(current_season_df, past_seasons_df, transitions=None):
     """
     Calculates the 'New In Team' feature for each player for the current season.
+
+    transitions is a transition table with the current season appended (see
+    season_transitions.py). Built from the last past season if None.
     """
-    last_season = past_seasons_df['season'].max()
-    last_season_df = past_seasons_df[past_seasons_df['season'] == last_season]
+    if transitions is None:
+        transitions = current_transitions(current_season_df, past_seasons_df)
 
-    last_season_teams = last_season_df[['ID', 'team_code']].drop_duplicates(subset=['ID']).set_index('ID')['team_code']
-    
-    current_season_df['previous_team_code'] = current_season_df['ID'].map(last_season_teams)
-    
-    current_season_df['New In Team'] = (current_season_df['previous_team_code'].isnull()) | \
-                                       (current_season_df['team_code'] != current_season_df['previous_team_code'])
-    
-    current_season_df.drop(columns=['previous_team_code'], inplace=True)
+    current_season_df['New In Team'] = season_transitions.transition_flags(current_season_df, transitions)['New In Team']
 
     return current_season_df
 
@@ -67,125 +66,25 @@ def calculate_additional_features(df):
     seasons = sorted(df_sorted['season'].unique())
     season_map = {season: prev_season for season, prev_season in zip(seasons[1:], seasons[:-1])}
     
-    # Create a 'previous_season' column to merge on
+    # Create a 'previous_season' column to look up the context cube on
     df_sorted['previous_season'] = df_sorted['season'].map(season_map)
 
-    # --- Feature 1: max_minutes_in_position_past_season ---
-    # Pre-calculate max minutes per team/position for all seasons
-    max_min_pos = df_sorted.groupby(['season', 'team_code', 'Position'])['Min'].max().reset_index()
-    max_min_pos.rename(columns={'Min': 'max_minutes_in_position_past_season', 'season': 'previous_season'}, inplace=True)
-    
-    # Merge this data into the main dataframe
-    df_with_features = pd.merge(
-        df_sorted,
-        max_min_pos,
-        how='left',
-        left_on=['previous_season', 'team_code', 'Position'],
-        right_on=['previous_season', 'team_code', 'Position']
-    )
-    # Set the value to NaN if the player is not new in the team
-    df_with_features['max_minutes_in_position_past_season'] = df_with_features['max_minutes_in_position_past_season'].where(df_with_features['New In Team'], np.nan)
-
-    # --- Feature 2: max_minutes_by_signing_past_season ---
-    # Get all new signings from all seasons
-    new_signings = df_sorted[df_sorted['New In Team'] == True]
-    # Calculate the max minutes for these signings per team and season
-    max_min_signings = new_signings.groupby(['season', 'team_code'])['Min'].max().reset_index()
-    max_min_signings.rename(columns={'Min': 'max_minutes_by_signing_past_season', 'season': 'previous_season'}, inplace=True)
-
-    # Merge this data into the main dataframe
-    df_with_features = pd.merge(
-        df_with_features,
-        max_min_signings,
-        how='left',
-        left_on=['previous_season', 'team_code'],
-        right_on=['previous_season', 'team_code']
-    )
-    # Set the value to NaN if the player is not an existing player
-    df_with_features['max_minutes_by_signing_past_season'] = df_with_features['max_minutes_by_signing_past_season'].where(df_with_features['New In Team'] == False, np.nan)
-
-    # Clean up helper column
-    df_with_features.drop(columns=['previous_season'], inplace=True)
+    # --- Features 1 and 2: team context of the previous season, from the context cube ---
+    features = {feature: team_context.CONTEXT_FEATURES[feature] for feature in ['max_minutes_in_position_past_season', 'max_minutes_by_signing_past_season']}
+    cube = team_context.context_cube(df_sorted)
+    context = team_context.previous_season_context(df_sorted, cube, features)
+    df_with_features = df_sorted.drop(columns=['previous_season']).join(context)
     
     return df_with_features
 
-def calculate_historical_features(df):
-    """
-    Calculates historical performance metrics for each player.
-    This includes:
-    - PPG from prior seasons (last 1, avg last 2, avg last 3).
-    - Minutes played in prior seasons (last 1, avg last 2, avg last 3).
-    - Minutes played in prior seasons for the *same team* as the current season.
-    Args:
-        df (pd.DataFrame): The DataFrame with player data for all seasons.
-    Returns:
-        pd.DataFrame: The DataFrame with all historical columns added.
-    """
-    df_sorted = df.sort_values(by=['ID', 'season'])
-
-    def calculate_player_history(group):
-        # Ensure the group is sorted by season for correct shifting and rolling
-        group = group.sort_values('season')
-
-        # --- Historical PPG ---
-        shifted_ppg = group['PPG'].shift(1)
-        group['points_last_season'] = shifted_ppg
-        group['avg_points_last_2_seasons'] = shifted_ppg.rolling(2, min_periods=1).mean()
-        group['avg_points_last_3_seasons'] = shifted_ppg.rolling(3, min_periods=1).mean()
-
-        # --- Historical Minutes (Overall) ---
-        shifted_min = group['Min'].shift(1)
-        group['minutes_last_season'] = shifted_min
-        group['avg_minutes_last_2_seasons'] = shifted_min.rolling(2, min_periods=1).mean()
-        group['avg_minutes_last_3_seasons'] = shifted_min.rolling(3, min_periods=1).mean()
-
-        # --- Historical Minutes (Same Team) ---
-        same_team_hist_data = []
-        # Iterate through each row (season) of the player's history
-        for index, row in group.iterrows():
-            current_season = row['season']
-            current_team = row['team_code']
-
-            # Get all seasons for this player *before* the current one
-            history = group[group['season'] < current_season]
-
-            # From that history, get only the seasons played at the *same team*
-            same_team_history = history[history['team_code'] == current_team].sort_values('season', ascending=False)
-
-            # Calculate metrics based on this filtered, same-team history
-            if not same_team_history.empty:
-                min_last = same_team_history.head(1)['Min'].iloc[0]
-                # Use .mean() which handles cases with fewer than 2 or 3 seasons gracefully
-                avg_min_2 = same_team_history.head(2)['Min'].mean()
-                avg_min_3 = same_team_history.head(3)['Min'].mean()
-            else:
-                # If no history with this team, all metrics are NaN
-                min_last, avg_min_2, avg_min_3 = np.nan, np.nan, np.nan
-
-            same_team_hist_data.append({
-                'index': index,
-                'minutes_last_season_same_team': min_last,
-                'avg_minutes_last_2_seasons_same_team': avg_min_2,
-                'avg_minutes_last_3_seasons_same_team': avg_min_3
-            })
-
-        # Join the calculated same-team history back to the group
-        if same_team_hist_data:
-            same_team_df = pd.DataFrame(same_team_hist_data).set_index('index')
-            group = group.join(same_team_df)
-
-        return group
-
-    # Apply the complex calculation to each player group
-    df_with_hist = df_sorted.groupby('ID', group_keys=False).apply(calculate_player_history)
-
-    return df_with_hist
-
-def calculate_new_in_league_features(current_season_df, past_seasons_df):
+def calculate_new_in_league_features(current_season_df, past_seasons_df, cube=None):
     """
     Calculates features for players who are new to the league.
     - max_ppg_in_team_position_last_season: Max PPG in the same team/position last season.
     - influential_player_left: True if a player with >3 PPG and >1500 mins left the team.
+
+    cube is the team context cube of the past seasons (see team_context.py). Built from
+    the last past season if None.
     """
     if 'New In League' not in current_season_df.columns:
         return current_season_df
@@ -197,20 +96,15 @@ def calculate_new_in_league_features(current_season_df, past_seasons_df):
     last_season_df = past_seasons_df[past_seasons_df['season'] == last_season_name].copy()
     last_season_df['Position Name'] = last_season_df['Position']#.map(position_mapper)
 
-    # Feature 1: Max PPG in team/position last season
-    max_ppg_last_season = last_season_df[last_season_df.Min > 1500].groupby(['team_code', 'Position Name'])['PPG'].max().reset_index()
-    max_ppg_last_season.rename(columns={'PPG': 'max_ppg_in_team_position_last_season'}, inplace=True)
-
-    current_season_df = pd.merge(
-        current_season_df,
-        max_ppg_last_season,
-        how='left',
-        on=['team_code', 'Position Name']
-    )
-    current_season_df['max_ppg_in_team_position_last_season'] = current_season_df['max_ppg_in_team_position_last_season'].where(current_season_df['New In League'], np.nan)
+    # Feature 1: Max PPG in team/position last season, from the context cube
+    if cube is None:
+        cube = team_context.context_cube(last_season_df)
+    max_ppg_last_season = team_context.lookup(cube, np.full(len(current_season_df), last_season_name), current_season_df['team_code'],
+                                              current_season_df['Position Name'], ['max_ppg_high_minutes'])['max_ppg_high_minutes']
+    current_season_df['max_ppg_in_team_position_last_season'] = pd.Series(max_ppg_last_season, index=current_season_df.index).where(current_season_df['New In League'], np.nan)
 
     # Feature 2: Influential player left the team
-    influential_players = last_season_df[((last_season_df['PPG'] > 3) & (last_season_df['Min'] > 1500)) | ((last_season_df['Min'] > 2300))]
+    influential_players = last_season_df[((last_season_df['PPG'] > 3) & (last_season_df['Min'] > 1500)) | ((last_season_df['Min'] > 2300))].copy()
     current_player_teams = current_season_df.set_index('ID')['team_code']
     influential_players['current_team_code'] = influential_players['ID'].map(current_player_teams)
     influential_left = influential_players[
@@ -219,34 +113,106 @@ def calculate_new_in_league_features(current_season_df, past_seasons_df):
     ]
     teams_and_positions_that_lost_player = influential_left[['team_code', 'Position Name']].drop_duplicates()
     
-    current_season_df['influential_player_left'] = current_season_df.apply(
-        lambda row: tuple(row[['team_code', 'Position Name']]) in set(map(tuple, teams_and_positions_that_lost_player.to_numpy())),
-        axis=1
+    current_season_df['influential_player_left'] = team_context.team_position_isin(
+        current_season_df, teams_and_positions_that_lost_player, ['team_code', 'Position Name']
     )
     current_season_df['influential_player_left'] = current_season_df['influential_player_left'].where(current_season_df['New In League'], np.nan)
 
     return current_season_df
 
 
-def main():
-    df = load_data()
+def calculate_current_features(current_season_df, last_season_name, state, teams, cube):
+    """
+    Calculates time_in_league, the team context and the historical features of the
+    current season rows from the persisted past state, without the past seasons' rows.
 
-    past_data = pd.read_csv('fantasy_data_history.csv', usecols=['Player Name', 'ID', 'PPG', 'season', 'Min', 'team_code', 'New In Team', 'Position'])
-    
-    df = calculate_new_in_league(df, past_data)
-    df = calculate_new_in_team(df, past_data)
-    
-    df = calculate_new_in_league_features(df, past_data)
+    Gives the same values as calculate_additional_features and
+    calculate_historical_features over the past and current seasons combined.
 
-    # For historical features, we combine, calculate, and then filter
-    combined_data = pd.concat([past_data, df], ignore_index=True)
-    combined_data = calculate_additional_features(combined_data)
-    data_with_hist = calculate_historical_features(combined_data)
-    
-    # Filter for the current season
-    current_season_data = data_with_hist[data_with_hist['season'] == '2025-26'].copy()
-    
-    current_season_data.to_csv('25_26_data_parsed.csv', index=False)
+    Args:
+        current_season_df (pd.DataFrame): The current season rows, with New In Team.
+        last_season_name (str): The latest past season.
+        state (pd.DataFrame): The player state (see player_state.py).
+        teams (pd.DataFrame): The team state (see player_state.py).
+        cube (pd.DataFrame): The team context cube of the past seasons (see team_context.py).
+
+    Returns:
+        pd.DataFrame: The current season rows sorted by ID, with the feature columns added.
+    """
+    df = current_season_df.sort_values('ID', kind='stable').reset_index(drop=True)
+    features = player_state.state_features(df, state, teams)
+
+    df['time_in_league'] = features['time_in_league']
+    df['previous_season'] = last_season_name
+    context_features = {feature: team_context.CONTEXT_FEATURES[feature] for feature in ['max_minutes_in_position_past_season', 'max_minutes_by_signing_past_season']}
+    df = df.join(team_context.previous_season_context(df, cube, context_features)).drop(columns=['previous_season'])
+
+    return df.join(features.drop(columns=['time_in_league']))
+
+def main(report_file=None, profile=False, full=False, gameweek_features=False):
+    """
+    Builds the current season features from the history table and writes 25_26_data_parsed.csv.
+
+    Args:
+        report_file (str): Writes the JSON timing report of the stages to this file.
+        profile (bool): Adds cProfile and tracemalloc captures to the report.
+        full (bool): Recompute the features over the whole history table instead of
+            reading the past from the player state written with it.
+        gameweek_features (bool): Add the rolling form columns of the current season
+            computed from the gameweek store (see gameweek_history.py).
+    """
+    report = PipelineReport('process_curr_data', profile) if report_file or profile else None
+
+    df = run_stage(report, 'load', load_current_season)
+
+    states = None if full else player_state.read_state(HISTORY_FILE)
+    if states is None:
+        past_data = run_stage(report, 'load_history', storage.read_table, HISTORY_FILE, columns=PAST_COLUMNS)
+    else:
+        # Only the latest past season is needed as rows, and it is kept in the player state
+        state, teams = states
+        past_data = player_state.last_season_rows(state)
+    
+    # The transition table written with the history table, with the current season appended.
+    # With the player state, the latest past season's rows are all it needs.
+    transitions = None if states is not None else season_transitions.read_transitions(HISTORY_FILE)
+    if transitions is None:
+        transitions = current_transitions(df, past_data)
+    else:
+        transitions = run_stage(report, 'season_transitions', season_transitions.append_season, transitions, df)
+
+    df = run_stage(report, 'new_in_league', calculate_new_in_league, df, past_data, transitions)
+    df = run_stage(report, 'new_in_team', calculate_new_in_team, df, past_data, transitions)
+    
+    # The context cube written with the history table, or built from the last past season
+    cube = team_context.read_context(HISTORY_FILE)
+    df = run_stage(report, 'new_in_league_features', calculate_new_in_league_features, df, past_data, cube)
+
+    if states is None:
+        # For historical features, we combine, calculate, and then filter
+        combined_data = pd.concat([past_data, df], ignore_index=True)
+        combined_data = run_stage(report, 'additional_features', calculate_additional_features, combined_data)
+        data_with_hist = run_stage(report, 'historical_features', calculate_historical_features, combined_data)
+        
+        # Filter for the current season
+        current_season_data = data_with_hist[data_with_hist['season'] == '2025-26'].copy()
+    else:
+        if cube is None:
+            cube = team_context.context_cube(past_data)
+        current_season_data = run_stage(report, 'current_features', calculate_current_features, df, past_data['season'].max(), state, teams, cube)
+        # Same columns, in the same order, as the combined run
+        current_season_data = current_season_data[list(past_data.columns) + [col for col in current_season_data.columns if col not in past_data.columns]]
+    
+    if gameweek_features:
+        gameweeks = gameweek_history.read_gameweeks([CURRENT_SEASON])
+        current_season_data = run_stage(report, 'gameweek_features', gameweek_history.add_form_features, current_season_data, gameweeks)
+
+    run_stage(report, 'write', storage.write_table, current_season_data, '25_26_data_parsed.csv')
+
+    if report is not None:
+        print(report.summary())
+        if report_file:
+            report.write(report_file)
     '''
     ftier = current_season_data[(current_season_data.avg_points_last_2_seasons > 5) & (current_season_data.points_last_season > 5)]
     current_season_data[(current_season_data.avg_points_last_2_seasons > 4.4) & (current_season_data.points_last_season > 4.4) & (current_season_data.minutes_last_season > 1200) & (~current_season_data.ID.isin(ftier.ID.values.tolist()))]
@@ -256,6 +222,14 @@ def main():
 
     current_season_data[current_season_data['Player Name'] == 'Ødegaard']
     '''
-if __name__ == '__main__':
-    main()
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Build the current season features.')
+    parser.add_argument('--report', help='JSON file for the per-stage timing report')
+    parser.add_argument('--profile', action='store_true', help='add cProfile and tracemalloc captures to the stage timings')
+    parser.add_argument('--full', action='store_true', help='recompute over the whole history instead of the persisted player state')
+    parser.add_argument('--gameweek-features', action='store_true', help='add rolling form columns from the gameweek store')
+    args = parser.parse_args(argv)
+    main(args.report, args.profile, args.full, args.gameweek_features)
 
+if __name__ == '__main__':
+    command_line()
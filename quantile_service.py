@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+# The quantile service answers "quantile q of feature f among the players of a group
+# with PPG above X", the question behind every tier threshold. The rows of each season
+# window are grouped once by the group columns (e.g. Position and New In Team) and
+# sorted by PPG, so the players above any PPG threshold are a prefix of their group.
+# The sorted feature values of a prefix are kept, and any number of features,
+# quantiles and thresholds are answered in one call as a tidy table.
+#
+# Quantiles are linear interpolations computed as in pandas' Series.quantile, so the
+# values are the same as filtering the rows and calling .quantile(q).
+
+ALL_SEASONS = 'all'
+
+class QuantileService:
+    """
+    Feature quantiles of PPG-threshold slices of player seasons.
+
+    Args:
+        df (pd.DataFrame): The player seasons, e.g. target players with more than 1200 minutes.
+        features (list): Feature columns to answer queries on.
+        by (list): Group columns a query can select on, e.g. ['Position', 'New In Team'].
+        windows (dict): Season window name -> (first season, last season), both included,
+            None for open. Defaults to one window over all the seasons.
+        value (str): The column compared with the query thresholds.
+    """
+    def __init__(self, df, features, by=('Position', 'New In Team'), windows=None, value='PPG'):
+        self.features = list(features)
+        self.by = list(by)
+        self.windows = windows if windows is not None else {ALL_SEASONS: (None, None)}
+        self.value = value
+        self.frames = {}
+        for window, (first, last) in self.windows.items():
+            season = df['season'].astype(str)
+            rows = df[value].notna()
+            if first is not None:
+                rows &= season >= first
+            if last is not None:
+                rows &= season <= last
+            # Highest PPG first, so each threshold slice of a group is a prefix
+            frame = df.loc[rows.to_numpy(), self.by + [value] + self.features]
+            self.frames[window] = frame.iloc[np.argsort(-frame[value].to_numpy(dtype='float64'), kind='stable')]
+        self.groups = {}
+        self.sorted_values = {}
+
+    def _groups(self, window, keys):
+        """
+        Groups of a window by some of the group columns: key -> (PPG values, feature arrays),
+        both in descending PPG order. Computed once per window and columns.
+        """
+        cache_key = (window, tuple(keys))
+        if cache_key not in self.groups:
+            frame = self.frames[window]
+            grouped = frame.groupby(keys, observed=True, sort=True) if keys else [((), frame)]
+            self.groups[cache_key] = {
+                key if isinstance(key, tuple) else (key,): (
+                    group[self.value].to_numpy(dtype='float64'),
+                    {feature: group[feature].to_numpy(dtype='float64', na_value=np.nan) for feature in self.features},
+                )
+                for key, group in grouped
+            }
+        return self.groups[cache_key]
+
+    def _sorted(self, window, keys, key, feature, count):
+        """
+        The sorted non-missing values of a feature among the `count` highest-PPG rows of a group.
+        """
+        cache_key = (window, tuple(keys), key, feature, count)
+        if cache_key not in self.sorted_values:
+            values = self._groups(window, keys)[key][1][feature][:count]
+            self.sorted_values[cache_key] = np.sort(values[~np.isnan(values)])
+        return self.sorted_values[cache_key]
+
+    def query(self, min_ppg, features=None, quantiles=(0.25, 0.5, 0.75), where=None, window=ALL_SEASONS):
+        """
+        Quantiles of features among the rows with PPG above each threshold.
+
+        Args:
+            min_ppg (float or list): PPG thresholds, rows strictly above are kept.
+            features (list): Features to read, all the service's features by default.
+            quantiles (list): Quantiles to compute, between 0 and 1.
+            where (dict): Group column -> value or list of values, e.g.
+                {'Position': 'MID', 'New In Team': False}. Group columns left out are
+                not split on.
+            window (str): The season window.
+
+        Returns:
+            pd.DataFrame: One row per group, threshold, feature and quantile, with the
+            group columns of `where`, 'window', 'min_ppg', 'feature', 'quantile', 'value'
+            (NaN for an empty slice) and 'count' (rows with the feature).
+        """
+        features = self.features if features is None else list(features)
+        unknown = [feature for feature in features if feature not in self.features]
+        if unknown:
+            raise ValueError(f"Features not in the service: {unknown}")
+        where = where or {}
+        keys = [col for col in self.by if col in where]
+        if len(keys) < len(where):
+            raise ValueError(f"Group columns not in the service: {[col for col in where if col not in self.by]}")
+        wanted = {col: set(np.atleast_1d(where[col]).tolist()) for col in keys}
+
+        thresholds = np.atleast_1d(np.asarray(min_ppg, dtype='float64'))
+        percents = np.asarray(quantiles, dtype='float64') * 100
+
+        records = []
+        for key, (ppg, _) in self._groups(window, keys).items():
+            if any(value not in wanted[col] for col, value in zip(keys, key)):
+                continue
+            # Number of rows with PPG above each threshold, PPG being in descending order
+            counts = np.searchsorted(-ppg, -thresholds, side='left')
+            for threshold, count in zip(thresholds, counts):
+                for feature in features:
+                    values = self._sorted(window, keys, key, feature, count)
+                    results = np.percentile(values, percents) if len(values) else np.full(len(percents), np.nan)
+                    for q, result in zip(quantiles, results):
+                        records.append(key + (window, threshold, feature, q, result, len(values)))
+
+        columns = keys + ['window', 'min_ppg', 'feature', 'quantile', 'value', 'count']
+        return pd.DataFrame.from_records(records, columns=columns)
+
+    def quantile(self, min_ppg, feature, q, where=None, window=ALL_SEASONS):
+        """
+        A single quantile, e.g. the median points_last_season of MIDs above 4 PPG.
+
+        NaN when `where` selects no rows, as .quantile() of an empty filtered frame.
+        """
+        table = self.query(min_ppg, [feature], [q], where, window)
+        if table.empty:
+            return np.nan
+        if len(table) != 1:
+            raise ValueError(f"{where} selects {len(table)} groups, not one")
+        return table['value'].iloc[0]
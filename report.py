@@ -0,0 +1,278 @@
+import argparse
+import ast
+import hashlib
+import html
+import importlib
+import importlib.util
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import storage
+from data_loader import HISTORY_FILE, POSITION_DTYPE
+from season_manifest import file_sha256
+
+REPORT_DIR = 'report'
+FIGURES_MANIFEST = 'figures.json'
+
+# The report renders the plots of analysis.py and positional_analysis.py without a
+# display: every figure runs in a worker process on the non-interactive Agg backend,
+# the figures a plot function shows are saved as files instead, and one static HTML
+# page shows them all. A figure is only rendered again when its input frame, its
+# arguments, the output formats or the source of its module, or of a repository module
+# it imports, changed.
+
+FEATURES_POINTS = ['points_last_season', 'avg_points_last_2_seasons', 'avg_points_last_3_seasons']
+FEATURES_MINUTES = [
+    'minutes_last_season', 'avg_minutes_last_2_seasons', 'avg_minutes_last_3_seasons',
+    'minutes_last_season_same_team', 'avg_minutes_last_2_seasons_same_team', 'avg_minutes_last_3_seasons_same_team',
+]
+
+def report_figures():
+    """
+    The figures of the report, in page order.
+
+    Returns:
+        dict: Figure name -> (title, module, plot function, input frame, keyword arguments).
+        Input frames are the names of report_frames.
+    """
+    figures = {
+        'correlation_map': ('Correlation map of the target base', 'analysis', 'plot_correlation_map', 'target_base', {}),
+        'target_group': ('Target group (> 4.4 PPG, > 1200 minutes)', 'analysis', 'plot_analysis', 'anl_df', {}),
+        'target_group_5ppg': ('Target group (> 5 PPG, > 1200 minutes)', 'analysis', 'plot_analysis', 'anl_df', {'min_ppg': 5}),
+        'cumulative_ppg': ('Cumulative PPG by time in league', 'analysis', 'plot_cumulative_ppg_by_time_in_league', 'target_base', {}),
+        'cumulative_ppg_target': ('Cumulative PPG by time in league, > 4.4 PPG', 'analysis', 'plot_cumulative_ppg_by_time_in_league', 'target_base_above_4.4', {}),
+        'points_distribution': ('Points features by PPG group', 'analysis', 'plot_feature_distribution_by_ppg', 'target_base', {'features': FEATURES_POINTS}),
+        'minutes_distribution': ('Minutes features by PPG group', 'analysis', 'plot_feature_distribution_by_ppg', 'target_base', {'features': FEATURES_MINUTES}),
+        'position_distribution': ('PPG by position', 'analysis', 'plot_position_distribution_by_ppg', 'target_base', {}),
+    }
+    for base in ['target_base', 'target_new']:
+        for position in ['GK', 'DEF', 'MID', 'FWD']:
+            for kind, features in [('points', FEATURES_POINTS), ('minutes', FEATURES_MINUTES)]:
+                figures[f'{base}_{position}_{kind}'] = (
+                    f'{base} {position}: {kind} features by PPG group (3.8 PPG)', 'analysis',
+                    'plot_feature_distribution_by_ppg', f'{base}_{position}', {'min_ppg': 3.8, 'features': features},
+                )
+    for position in ['FWD', 'MID', 'DEF']:
+        figures[f'position_curve_{position}'] = (
+            f'Total points by rank, {position}', 'positional_analysis', 'plot_position_curve_with_slope', 'all_data', {'position': position},
+        )
+    figures['position_boxplot'] = ('Total points by position', 'positional_analysis', 'plot_position_boxplot', 'all_data', {})
+    figures['players_by_season'] = ('Target players per season by position', 'positional_analysis', 'plot_average_players_by_season', 'all_data', {})
+    return figures
+
+def report_frames(history_file=HISTORY_FILE):
+    """
+    The input frames of the report figures, as selected in analysis.main and positional_analysis.main.
+    """
+    df = storage.read_table(history_file)
+    anl_df = df[(df.season > '2019-20')]
+    frames = {
+        'anl_df': anl_df,
+        'target_base': anl_df[(anl_df.Min > 1200) & (anl_df['New In Team'] == False)],
+        'target_new': anl_df[(anl_df.Min > 1200) & (anl_df['New In Team'] == True)],
+        # The positional figures read the same table, with Position ordered as load_history orders it
+        'all_data': df.astype({'Position': POSITION_DTYPE}),
+    }
+    frames['target_base_above_4.4'] = frames['target_base'][frames['target_base'].PPG > 4.4]
+    for base in ['target_base', 'target_new']:
+        for position in ['GK', 'DEF', 'MID', 'FWD']:
+            frames[f'{base}_{position}'] = frames[base][frames[base].Position == position]
+    return frames
+
+def frame_sha256(frame):
+    """
+    Hash of a frame's columns, dtypes, index and values.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(map(str, frame.columns)), list(map(str, frame.dtypes))]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def local_imports(module):
+    """
+    The repository modules a module imports, directly or through other repository
+    modules, itself included.
+
+    Returns:
+        dict: Module name -> source file, sorted by name.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    found = {}
+    pending = [module]
+    while pending:
+        name = pending.pop()
+        spec = importlib.util.find_spec(name)
+        if name in found or spec is None or not spec.origin or not spec.origin.endswith('.py') \
+           or os.path.dirname(os.path.abspath(spec.origin)) != root:
+            continue
+        found[name] = spec.origin
+        with open(spec.origin, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), spec.origin)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0])
+    return dict(sorted(found.items()))
+
+def figure_sha256(module, function, frame_hash, kwargs, formats):
+    """
+    Hash of everything a figure's files depend on.
+    """
+    key = {
+        'module': module,
+        'sources_sha256': {name: file_sha256(path) for name, path in local_imports(module).items()},
+        'function': function,
+        'frame_sha256': frame_hash,
+        'kwargs': kwargs,
+        'formats': list(formats),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def render_figure(task):
+    """
+    Runs a plot function on the Agg backend and saves the figures it shows.
+
+    Plot functions call plt.show() (and sometimes plt.close()) after each figure, so
+    plt.show is replaced while the function runs by a call saving and closing every
+    open figure. Figures left open at the end are saved too.
+
+    Args:
+        task (tuple): (figure name, module, plot function, input frame, keyword arguments,
+            report directory, formats).
+
+    Returns:
+        tuple: (figure name, files written, relative to the report directory).
+    """
+    name, module, function, frame, kwargs, output_dir, formats = task
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plot = getattr(importlib.import_module(module), function)
+    files = []
+
+    def save_open_figures(*args, **kwargs):
+        for number in plt.get_fignums():
+            figure = plt.figure(number)
+            index = len(files) // len(formats) + 1
+            for fmt in formats:
+                filename = os.path.join('figures', f'{name}-{index}.{fmt}')
+                figure.savefig(os.path.join(output_dir, filename), format=fmt, bbox_inches='tight')
+                files.append(filename)
+            plt.close(figure)
+
+    show = plt.show
+    plt.show = save_open_figures
+    try:
+        plot(frame, **kwargs)
+        save_open_figures()
+    finally:
+        plt.show = show
+    return name, files
+
+def load_figures_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_html(path, figures, rendered, history_file):
+    """
+    Writes the report page, one section per figure with its files of the first format.
+    """
+    sections = []
+    for name, (title, module, function, frame_name, kwargs) in figures.items():
+        images = [f for f in rendered[name]['files'] if f.endswith('.' + rendered[name]['formats'][0])]
+        tags = '\n'.join(f'<img src="{html.escape(image)}" alt="{html.escape(name)}">' for image in images)
+        sections.append(
+            f'<section id="{html.escape(name)}">\n<h2>{html.escape(title)}</h2>\n'
+            f'<p><code>{html.escape(module)}.{html.escape(function)}({html.escape(frame_name)})</code></p>\n{tags}\n</section>'
+        )
+    page = (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>Fantasy analysis report</title>\n'
+        '<style>body { font-family: sans-serif; margin: 2em; } img { max-width: 100%; display: block; margin: 1em 0; }</style>\n'
+        f'</head>\n<body>\n<h1>Fantasy analysis report</h1>\n<p>Data: {html.escape(history_file)}</p>\n'
+        + '\n'.join(sections) + '\n</body>\n</html>\n'
+    )
+    with open(path, 'w') as f:
+        f.write(page)
+
+def build_report(output_dir=REPORT_DIR, formats=('png',), workers=1, force=False, names=None, history_file=HISTORY_FILE):
+    """
+    Renders the figures whose inputs changed and writes the report page.
+
+    Args:
+        output_dir (str): Report directory, with index.html and figures/.
+        formats (list): Figure file formats, e.g. ['png', 'svg']. The page shows the first.
+        workers (int): Worker processes rendering figures.
+        force (bool): Render every figure, even unchanged ones.
+        names (list): Figures to include, all of report_figures by default.
+        history_file (str): The history table the analysis figures read.
+
+    Returns:
+        dict: 'rendered' and 'skipped' figure names.
+    """
+    figures = report_figures()
+    if names is not None:
+        unknown = [name for name in names if name not in figures]
+        if unknown:
+            raise ValueError(f"Unknown figures: {unknown}")
+        figures = {name: figures[name] for name in names}
+    formats = list(formats)
+
+    os.makedirs(os.path.join(output_dir, 'figures'), exist_ok=True)
+    manifest_path = os.path.join(output_dir, FIGURES_MANIFEST)
+    manifest = load_figures_manifest(manifest_path)
+
+    frames = report_frames(history_file)
+    frame_hashes = {}
+    tasks = []
+    hashes = {}
+    skipped = []
+    for name, (_, module, function, frame_name, kwargs) in figures.items():
+        if frame_name not in frame_hashes:
+            frame_hashes[frame_name] = frame_sha256(frames[frame_name])
+        hashes[name] = figure_sha256(module, function, frame_hashes[frame_name], kwargs, formats)
+        previous = manifest.get(name)
+        unchanged = previous is not None and previous['sha256'] == hashes[name] \
+            and all(os.path.exists(os.path.join(output_dir, f)) for f in previous['files'])
+        if unchanged and not force:
+            skipped.append(name)
+        else:
+            tasks.append((name, module, function, frames[frame_name], kwargs, output_dir, formats))
+
+    if workers <= 1 or len(tasks) <= 1:
+        results = [render_figure(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(render_figure, tasks))
+
+    for name, files in results:
+        manifest[name] = {'sha256': hashes[name], 'files': files, 'formats': formats}
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    write_html(os.path.join(output_dir, 'index.html'), figures, manifest, history_file)
+    return {'rendered': [name for name, _ in results], 'skipped': skipped}
+
+def main(output_dir=REPORT_DIR, formats=('png',), workers=1, force=False, names=None):
+    result = build_report(output_dir, formats, workers, force, names)
+    print(f"Rendered {len(result['rendered'])} figures, skipped {len(result['skipped'])} unchanged.")
+    print(f"Report: {os.path.join(output_dir, 'index.html')}")
+
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Render the analysis plots to a static HTML report, without a display.')
+    parser.add_argument('--output', default=REPORT_DIR, help='report directory')
+    parser.add_argument('--format', nargs='+', default=['png'], choices=['png', 'svg'], help='figure file formats')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes rendering figures')
+    parser.add_argument('--force', action='store_true', help='render unchanged figures too')
+    parser.add_argument('--figure', nargs='+', help='figures to include (default: all)')
+    args = parser.parse_args(argv)
+    main(args.output, args.format, args.workers, args.force, args.figure)
+
+if __name__ == "__main__":
+    command_line()
@@ -0,0 +1,200 @@
+import json
+import operator
+
+import numpy as np
+import pandas as pd
+
+# A rule is a list of (column, relationship, value) predicates that must all hold.
+# Rules are compiled once into (column, test, value) steps, and evaluated into a
+# single boolean mask over the rows of a frame: the columns are read as arrays and
+# no intermediate DataFrame is built.
+
+def isin(values, options):
+    return pd.Series(values, copy=False).isin(options).to_numpy()
+
+def notin(values, options):
+    return ~isin(values, options)
+
+OPERATORS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    'in': isin,
+    'not in': notin,
+}
+
+def compile_rule(filters_columns, filters_values, relationships):
+    """
+    Compiles parallel lists of columns, values and relationships into predicate steps.
+
+    Args:
+        filters_columns (list): Columns to test.
+        filters_values (list): Value compared with each column. 'in' and 'not in'
+            take a list of values.
+        relationships (list): One of OPERATORS for each column.
+
+    Returns:
+        list: (column, test, value) steps, in the order given.
+    """
+    if len(filters_columns) != len(filters_values):
+        raise ValueError("The length of columns and values must be the same.")
+    if len(relationships) < len(filters_columns):
+        raise ValueError("Each column needs a relationship.")
+
+    steps = []
+    for column, value, relationship in zip(filters_columns, filters_values, relationships):
+        if relationship not in OPERATORS:
+            raise ValueError(f"Unknown relationship: {relationship}")
+        if relationship in ('in', 'not in'):
+            # Membership values are hashed once, not on every evaluation
+            value = pd.Index(value).unique()
+        steps.append((column, OPERATORS[relationship], value))
+    return steps
+
+def evaluate(data, steps, rows=None):
+    """
+    Evaluates compiled steps into one boolean mask.
+
+    Args:
+        data (pd.DataFrame): The frame to test.
+        steps (list): Steps from compile_rule.
+        rows (np.ndarray): Positions of the rows to test. Tests every row if None.
+
+    Returns:
+        np.ndarray: Boolean mask aligned with rows (or with data if rows is None).
+    """
+    mask = np.ones(len(data) if rows is None else len(rows), dtype=bool)
+    for column, test, value in steps:
+        values = data[column].to_numpy()
+        if rows is not None:
+            values = values[rows]
+        mask &= np.asarray(test(values, value), dtype=bool)
+    return mask
+
+def select(data, steps, rows=None):
+    """
+    Returns the rows of data passing all steps, keeping their order and index.
+    """
+    if rows is None:
+        rows = np.arange(len(data))
+    return data.iloc[rows[evaluate(data, steps, rows)]]
+
+def group_rows(data, column='Position'):
+    """
+    Computes the row positions of each value of a column once, so repeated
+    per-position selections do not rescan the column.
+
+    Returns:
+        dict: Column value -> sorted array of row positions.
+    """
+    return {key: np.sort(rows) for key, rows in data.groupby(column, sort=False).indices.items()}
+
+def available_rows(rows, available):
+    """
+    Keeps the positions in rows whose entry in the boolean available mask is set.
+    """
+    return rows[available[rows]]
+
+TIER_SPEC_FILE = 'tier_rules.json'
+
+# A tier spec (see tier_rules.json) lists tiers from best to worst. Each tier has
+# ordered rules with:
+# - 'filters': [column, relationship, value] predicates,
+# - 'positions' (optional): the values of the spec's position_column the rule applies to,
+# - 'exclude' (optional): player names the rule never matches.
+# A tier may also give a 'sheet_order' of its rule names for the output sheet and
+# 'columns' to take an output column from another column.
+
+def load_tier_spec(path):
+    """
+    Loads a tier spec from a JSON file.
+    """
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def compile_tier_spec(spec):
+    """
+    Compiles every rule of a tier spec, in precedence order.
+
+    Returns:
+        list: (tier name, rule name, positions, steps) for each rule. positions is
+        None for rules that apply to every position.
+    """
+    compiled = []
+    for tier in spec['tiers']:
+        for rule in tier['rules']:
+            columns, relationships, values = zip(*rule['filters']) if rule['filters'] else ((), (), ())
+            steps = compile_rule(list(columns), list(values), list(relationships))
+            if rule.get('exclude'):
+                steps += compile_rule(['Player Name'], [rule['exclude']], ['not in'])
+            compiled.append((tier['name'], rule['name'], rule.get('positions'), steps))
+    return compiled
+
+def assign_tiers(data, spec):
+    """
+    Assigns every player to the first rule of the spec they match.
+
+    All rules are evaluated on their position rows in one pass, and the first
+    matching rule of each row is picked from the stacked masks, so earlier tiers take
+    precedence without removing their players from the frame.
+
+    Args:
+        data (pd.DataFrame): The players.
+        spec (dict): The tier spec.
+
+    Returns:
+        tuple: (tier, rule) Series aligned with data, NaN for players in no tier.
+    """
+    compiled = compile_tier_spec(spec)
+    position_rows = group_rows(data, spec.get('position_column', 'Position'))
+    all_rows = np.arange(len(data))
+
+    matches = np.zeros((len(compiled), len(data)), dtype=bool)
+    for i, (_, _, positions, steps) in enumerate(compiled):
+        if positions is None:
+            rows = all_rows
+        else:
+            rows = np.sort(np.concatenate([position_rows.get(p, all_rows[:0]) for p in positions]))
+        matches[i, rows] = evaluate(data, steps, rows)
+
+    first = matches.argmax(axis=0)
+    matched = matches.any(axis=0)
+    tier_names = np.array([tier for tier, _, _, _ in compiled], dtype=object)
+    rule_names = np.array([rule for _, rule, _, _ in compiled], dtype=object)
+
+    tier = pd.Series(np.where(matched, tier_names[first], np.nan), index=data.index, dtype=object)
+    rule = pd.Series(np.where(matched, rule_names[first], np.nan), index=data.index, dtype=object)
+    return tier, rule
+
+def tier_tables(data, spec, tier, rule):
+    """
+    Splits tiered players into one table per tier of the spec.
+
+    Rows are grouped by rule in the tier's sheet order and keep their order in data
+    within a rule.
+
+    Args:
+        data (pd.DataFrame): The players.
+        spec (dict): The tier spec.
+        tier (pd.Series): Tier of each player, from assign_tiers.
+        rule (pd.Series): Rule of each player, from assign_tiers.
+
+    Returns:
+        list: One DataFrame per tier, in spec order.
+    """
+    tables = []
+    for spec_tier in spec['tiers']:
+        order = spec_tier.get('sheet_order', [r['name'] for r in spec_tier['rules']])
+        in_tier = (tier == spec_tier['name']).to_numpy()
+        rank = rule.map({name: i for i, name in enumerate(order)}).to_numpy()
+        rows = np.flatnonzero(in_tier)
+        # Stable sort: rule order first, data order within a rule
+        rows = rows[np.argsort(rank[rows], kind='stable')]
+        table = data.iloc[rows].copy()
+        for column, source in spec_tier.get('columns', {}).items():
+            table[column] = table[source]
+        tables.append(table)
+    return tables
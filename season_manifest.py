@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 hex digest of a file, reading it in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def fingerprint_file(path, previous=None):
+    """
+    Builds the fingerprint (content hash, mtime and size) of an input file.
+
+    If the file has the same mtime and size as the previous fingerprint, the
+    previous fingerprint is reused and the file is not hashed again.
+
+    Args:
+        path (str): Path to the file.
+        previous (dict): Fingerprint recorded on the last build, if any.
+
+    Returns:
+        dict: The fingerprint with 'file', 'sha256', 'mtime' and 'size' keys.
+    """
+    stat = os.stat(path)
+    if previous is not None and previous.get('file') == path and \
+       previous.get('mtime') == stat.st_mtime and previous.get('size') == stat.st_size:
+        return previous
+
+    return {
+        'file': path,
+        'sha256': file_sha256(path),
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+    }
+
+def fingerprint_seasons(season_files, manifest=None):
+    """
+    Fingerprints every season input file.
+
+    Args:
+        season_files (dict): Mapping of season name to input file path.
+        manifest (dict): The manifest from the last build, if any.
+
+    Returns:
+        dict: Mapping of season name to its fingerprint.
+    """
+    previous_seasons = manifest['seasons'] if manifest else {}
+    return {
+        season: fingerprint_file(path, previous_seasons.get(season))
+        for season, path in sorted(season_files.items())
+    }
+
+def changed_seasons(manifest, fingerprints):
+    """
+    Lists the seasons whose input is new, removed or has different content since the last build.
+
+    Returns:
+        list: Sorted season names.
+    """
+    previous_seasons = manifest['seasons'] if manifest else {}
+    changed = set(previous_seasons) ^ set(fingerprints)
+    for season in set(previous_seasons) & set(fingerprints):
+        if previous_seasons[season]['sha256'] != fingerprints[season]['sha256']:
+            changed.add(season)
+    return sorted(changed)
+
+def load_manifest(path):
+    """
+    Loads a manifest file. Returns None if it does not exist or has an unknown version.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def write_manifest(path, fingerprints, output_file):
+    """
+    Writes the manifest for a finished build, including the hash of the output table
+    so a table modified outside the build is detected on the next run.
+    """
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'output': {'file': output_file, 'sha256': file_sha256(output_file)},
+        'seasons': fingerprints,
+    }
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# A rank index sorts a value column once per group (by default per season) and keeps
+# the sorted values with each group's offset, so "the value at rank k" of any group is
+# an array lookup. Many ranks over all the groups are answered in one vectorized call,
+# e.g. the replacement-level PPG at ranks 50 to 150 of every season.
+
+class RankIndex:
+    """
+    Values of a column sorted within each group, for rank queries.
+
+    Ranks start at 1. Missing values rank after all the others, as with sort_values.
+    Rows with a missing group key are left out.
+
+    Args:
+        df (pd.DataFrame): The rows to rank.
+        value (str): The column to rank by.
+        by (list): The group columns, e.g. ['season'] or ['season', 'Position'].
+        ascending (bool): Rank 1 is the lowest value instead of the highest.
+    """
+    def __init__(self, df, value='PPG', by=('season',), ascending=False):
+        self.value = value
+        self.by = list(by)
+
+        grouped = df.groupby(self.by, observed=True, sort=True)
+        codes = grouped.ngroup().to_numpy()
+        values = df[value].to_numpy(dtype='float64', na_value=np.nan)
+        rows = np.flatnonzero(~np.isnan(codes))
+
+        sort_key = values[rows] if ascending else -values[rows]
+        sort_key = np.where(np.isnan(sort_key), np.inf, sort_key)
+        order = rows[np.lexsort((sort_key, codes[rows]))]
+
+        self.values = values[order]
+        self.groups = grouped.size().index
+        self.sizes = grouped.size().to_numpy()
+        self.starts = np.concatenate([[0], np.cumsum(self.sizes)[:-1]]).astype('int64')
+
+    def at(self, ranks, groups=None):
+        """
+        Values at the given ranks of each group.
+
+        Args:
+            ranks (list): Ranks to read, 1 for the first.
+            groups (list): Group keys to read, all the groups by default.
+
+        Returns:
+            pd.DataFrame: One row per group and one column per rank, NaN where the group
+            has fewer rows than the rank.
+        """
+        ranks = np.atleast_1d(np.asarray(ranks, dtype='int64'))
+        if groups is None:
+            index, starts, sizes = self.groups, self.starts, self.sizes
+        else:
+            index = pd.Index(groups) if len(self.by) == 1 else pd.MultiIndex.from_tuples(groups, names=self.by)
+            rows = self.groups.get_indexer(index)
+            if (rows < 0).any():
+                raise KeyError(f"Unknown groups: {list(index[rows < 0])}")
+            starts, sizes = self.starts[rows], self.sizes[rows]
+        index = index.set_names(self.by)
+
+        found = (ranks[None, :] >= 1) & (ranks[None, :] <= sizes[:, None])
+        positions = np.where(found, starts[:, None] + ranks[None, :] - 1, 0)
+        values = np.where(found, self.values[positions] if len(self.values) else np.nan, np.nan)
+        return pd.DataFrame(values, index=index, columns=pd.Index(ranks, name='rank'))
+
+    def mean_at(self, ranks, over='season'):
+        """
+        Mean value at the given ranks across the groups of one group column, e.g. the
+        average PPG of the 70th player over the seasons.
+
+        Returns:
+            pd.Series: Mean per rank if `over` is the only group column, otherwise a
+            DataFrame with one row per remaining group key.
+        """
+        values = self.at(ranks)
+        if self.by == [over]:
+            return values.mean()
+        keep = [col for col in self.by if col != over]
+        return values.groupby(level=keep, observed=True).mean()
+
+    def curve(self, group):
+        """
+        The sorted values of one group, rank 1 first.
+        """
+        row = self.groups.get_loc(group)
+        return self.values[self.starts[row]:self.starts[row] + self.sizes[row]]
@@ -0,0 +1,129 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+TRANSITIONS_FILE = 'season_transitions.csv'
+
+# The player-season transition table has one row per (ID, season) with the season's
+# ordinal among the seasons of the table, the player's team that season, whether the
+# player was in the league the season before and at which team. It is built with a
+# single sort over (ID, season ordinal) and a shift, and New In League / New In Team
+# of any row are read from it. A new season is appended from the last season's rows
+# only, so the current season never recomputes the past.
+
+TRANSITION_COLUMNS = ['ID', 'season', 'season_ordinal', 'team_code', 'in_previous_season', 'previous_team_code']
+
+def transition_table(df):
+    """
+    Builds the transition table of the player seasons in df.
+
+    The previous season of a season is the one before it among the seasons of df. If a
+    player has several rows in a season, the first one gives the team.
+
+    Args:
+        df (pd.DataFrame): Player data with ID, season and team_code.
+
+    Returns:
+        pd.DataFrame: TRANSITION_COLUMNS, sorted by ID and season.
+    """
+    seasons = pd.Index(sorted(df['season'].astype(str).unique()))
+    table = pd.DataFrame({
+        'ID': df['ID'].to_numpy(),
+        'season': df['season'].astype(str).to_numpy(),
+        'season_ordinal': seasons.get_indexer(df['season'].astype(str)),
+        'team_code': np.asarray(df['team_code'], dtype='float64'),
+    })
+    table = table.drop_duplicates(['ID', 'season_ordinal'])
+    table = table.sort_values(['ID', 'season_ordinal'], kind='stable').reset_index(drop=True)
+
+    same_player = table['ID'].eq(table['ID'].shift())
+    follows = table['season_ordinal'].eq(table['season_ordinal'].shift() + 1)
+    table['in_previous_season'] = same_player & follows
+    table['previous_team_code'] = table['team_code'].shift().where(table['in_previous_season'])
+    return table[TRANSITION_COLUMNS]
+
+def append_season(transitions, season_df, season=None):
+    """
+    Adds a season after the last season of a transition table, replacing any rows the
+    table already has for it. Only the rows of the table's last season are read.
+
+    Args:
+        transitions (pd.DataFrame): A transition table.
+        season_df (pd.DataFrame): The new season's players, with ID and team_code.
+        season (str): The new season. Defaults to the season column of season_df.
+
+    Returns:
+        pd.DataFrame: The table with the new season's rows at the end.
+    """
+    if season is None:
+        season = str(season_df['season'].iloc[0])
+    transitions = transitions[transitions['season'] != season]
+
+    if transitions.empty:
+        ordinal = 0
+        previous_teams = pd.Series(dtype='float64')
+    else:
+        ordinal = int(transitions['season_ordinal'].max()) + 1
+        last = transitions[transitions['season_ordinal'] == ordinal - 1]
+        previous_teams = last.set_index('ID')['team_code']
+
+    new = pd.DataFrame({
+        'ID': season_df['ID'].to_numpy(),
+        'season': season,
+        'season_ordinal': ordinal,
+        'team_code': np.asarray(season_df['team_code'], dtype='float64'),
+    }).drop_duplicates(['ID'])
+    new['in_previous_season'] = new['ID'].isin(previous_teams.index)
+    new['previous_team_code'] = new['ID'].map(previous_teams)
+    return pd.concat([transitions, new[TRANSITION_COLUMNS]], ignore_index=True)
+
+def transition_flags(df, transitions):
+    """
+    Looks up New In League and New In Team for every row of df.
+
+    A row is New In League if its player was not in the league the season before, and
+    New In Team if, in addition, the player was at another team that season. Both are
+    False in the first season of the table.
+
+    Args:
+        df (pd.DataFrame): Player rows with ID, season and team_code.
+        transitions (pd.DataFrame): A transition table covering the seasons of df.
+
+    Returns:
+        pd.DataFrame: 'New In League' and 'New In Team' columns, aligned on df's index.
+    """
+    keys = pd.MultiIndex.from_arrays([transitions['ID'].to_numpy(), transitions['season'].to_numpy()])
+    rows = keys.get_indexer(pd.MultiIndex.from_arrays([df['ID'].to_numpy(), df['season'].astype(str).to_numpy()]))
+    if (rows < 0).any():
+        raise ValueError("Some player seasons are missing from the transition table.")
+
+    first_season = transitions['season_ordinal'].to_numpy()[rows] == 0
+    in_previous = transitions['in_previous_season'].to_numpy(dtype=bool)[rows]
+    previous_team = transitions['previous_team_code'].to_numpy(dtype='float64')[rows]
+    # Compared with the row's own team, as a player's rows in a season may differ
+    team = np.asarray(df['team_code'], dtype='float64')
+
+    return pd.DataFrame({
+        'New In League': ~first_season & ~in_previous,
+        'New In Team': ~first_season & (np.isnan(previous_team) | (team != previous_team)),
+    }, index=df.index)
+
+def read_transitions(history_file, path=TRANSITIONS_FILE):
+    """
+    Reads the transition table written with a history table, or None if there is
+    none at least as recent as the history table.
+    """
+    if not os.path.exists(path) or not os.path.exists(history_file):
+        return None
+    if os.path.getmtime(path) < os.path.getmtime(history_file):
+        return None
+    return storage.read_table(path)
+
+def write_transitions(transitions, path=TRANSITIONS_FILE):
+    """
+    Writes a transition table next to the history table it was built from.
+    """
+    storage.write_table(transitions, path)
@@ -0,0 +1,168 @@
+import glob
+import os
+
+import pandas as pd
+
+# Tables are addressed by their CSV path (e.g. 'fantasy_data_history.csv'). The typed
+# columnar copy lives next to it with the same name and this extension.
+COLUMNAR_FORMAT = 'parquet'
+
+# Every table the pipeline reads or writes
+TABLE_PATTERNS = [
+    os.path.join('history_data', '*_data.csv'),
+    os.path.join('curr_data', '*_data.csv'),
+    'fantasy_data_history.csv',
+    '25_26_data_parsed.csv',
+    'season_transitions.csv',
+    'team_context.csv',
+    'player_state.csv',
+    'player_team_state.csv',
+]
+
+def columnar_path(csv_path, fmt=COLUMNAR_FORMAT):
+    """
+    Returns the path of the columnar copy of a CSV table.
+    """
+    return os.path.splitext(csv_path)[0] + '.' + fmt
+
+def has_fresh_columnar(csv_path, fmt=COLUMNAR_FORMAT):
+    """
+    Checks if a table has a columnar copy that is at least as recent as its CSV.
+
+    A CSV written after the columnar copy (e.g. by get_data.py) takes precedence,
+    so a stale columnar file is never read.
+    """
+    path = columnar_path(csv_path, fmt)
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+def clean_columns(df):
+    """
+    Removes stray quotes from column names, as done historically when loading the raw CSVs.
+    """
+    df.columns = df.columns.str.replace('"', '')
+    return df
+
+def read_columnar(path, columns=None, fmt=COLUMNAR_FORMAT):
+    """
+    Reads a columnar file, materializing only the requested columns.
+    """
+    if fmt == 'parquet':
+        return pd.read_parquet(path, columns=columns)
+    elif fmt == 'feather':
+        return pd.read_feather(path, columns=columns)
+    raise ValueError(f"Unknown columnar format: {fmt}")
+
+def write_columnar(df, path, fmt=COLUMNAR_FORMAT):
+    """
+    Writes a DataFrame to a columnar file, dropping the index.
+    """
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+
+def read_csv(csv_path, columns=None, **kwargs):
+    """
+    Reads a CSV table, tokenizing only the requested columns.
+    """
+    if columns is not None:
+        wanted = set(columns)
+        kwargs['usecols'] = lambda col: col.replace('"', '') in wanted
+    kwargs.setdefault('encoding', 'utf-8-sig')
+    return clean_columns(pd.read_csv(csv_path, **kwargs))
+
+def read_table(csv_path, columns=None, dtype=None, fmt=COLUMNAR_FORMAT, **csv_kwargs):
+    """
+    Reads a table, preferring its columnar copy and falling back to the CSV.
+
+    Args:
+        csv_path (str): The CSV path the table is known by.
+        columns (list): Columns to read. Columns missing from the table are skipped,
+            so callers decide how to fill them. Reads every column if None.
+        dtype (dict): Column -> dtype. Passed to the CSV parser, or applied after
+            reading the columnar copy.
+        fmt (str): Columnar format, 'parquet' or 'feather'.
+        **csv_kwargs: Extra arguments for pd.read_csv, used only for the CSV fallback.
+
+    Returns:
+        pd.DataFrame: The table, with the requested columns in their stored order.
+    """
+    if has_fresh_columnar(csv_path, fmt):
+        path = columnar_path(csv_path, fmt)
+        if columns is not None:
+            wanted = set(columns)
+            columns = [col for col in table_columns(csv_path, fmt) if col in wanted]
+        df = read_columnar(path, columns, fmt)
+        if dtype:
+            df = df.astype({col: dt for col, dt in dtype.items() if col in df.columns})
+        return df
+
+    return read_csv(csv_path, columns, dtype=dtype, **csv_kwargs)
+
+def table_columns(csv_path, fmt=COLUMNAR_FORMAT):
+    """
+    Lists the columns of a table without reading its data.
+    """
+    if has_fresh_columnar(csv_path, fmt):
+        path = columnar_path(csv_path, fmt)
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.read_schema(path).names
+        return list(read_columnar(path, fmt=fmt).columns)
+    return list(read_csv(csv_path, nrows=0).columns)
+
+def write_table(df, csv_path, fmt=COLUMNAR_FORMAT):
+    """
+    Writes a table as a CSV export plus its columnar copy.
+
+    The columnar copy is built from the CSV as written, so readers of either format get
+    exactly the same values (the default CSV parser rounds some 17-digit floats, and the
+    tier thresholds were tuned on the parsed values). The CSV is written first so the
+    columnar copy is never older than it.
+
+    Args:
+        df (pd.DataFrame): The table to write.
+        csv_path (str): The CSV path the table is known by.
+        fmt (str): Columnar format, 'parquet' or 'feather'.
+    """
+    df.to_csv(csv_path, index=False)
+    write_columnar(read_csv(csv_path), columnar_path(csv_path, fmt), fmt)
+
+def export_table_csv(csv_path, fmt=COLUMNAR_FORMAT):
+    """
+    Exports the columnar copy of a table back to its CSV path.
+    """
+    path = columnar_path(csv_path, fmt)
+    read_columnar(path, fmt=fmt).to_csv(csv_path, index=False)
+    # The export has the same content, so keep the columnar copy marked as fresh
+    os.utime(path)
+
+def migrate_csv_to_columnar(patterns=TABLE_PATTERNS, fmt=COLUMNAR_FORMAT, overwrite=False):
+    """
+    One-shot conversion of the pipeline CSV tables into typed columnar files.
+
+    The CSVs are left untouched. Tables that already have a fresh columnar copy are
+    skipped unless overwrite is True.
+
+    Returns:
+        list: The columnar files written.
+    """
+    written = []
+    for pattern in patterns:
+        for csv_path in sorted(glob.glob(pattern)):
+            if not overwrite and has_fresh_columnar(csv_path, fmt):
+                continue
+            df = read_csv(csv_path)
+            write_columnar(df, columnar_path(csv_path, fmt), fmt)
+            written.append(columnar_path(csv_path, fmt))
+    return written
+
+if __name__ == '__main__':
+    for path in migrate_csv_to_columnar():
+        print(f"Wrote {path}")
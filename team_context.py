@@ -0,0 +1,173 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import storage
+
+CONTEXT_FILE = 'team_context.csv'
+
+CUBE_KEYS = ['season', 'team_code', 'Position']
+
+# The team context cube holds, for every (season, team_code, Position), the stats the
+# context features read from a team's previous season. Each stat is one entry here:
+# stat -> (value column, row filter, aggregation, key). The row filter keeps the rows
+# the stat is computed on (None keeps all). Stats keyed by 'team' are aggregated over
+# the whole team and repeated on each of its positions.
+CUBE_STATS = {
+    'max_minutes': ('Min', None, 'max', 'position'),
+    'max_minutes_by_signing': ('Min', lambda df: df['New In Team'] == True, 'max', 'team'),
+    'avg_ppg_high_minutes': ('PPG', lambda df: df['Min'] > 1400, 'mean', 'position'),
+    'max_ppg_high_minutes': ('PPG', lambda df: df['Min'] > 1500, 'max', 'position'),
+}
+
+# Context feature -> (cube stat, New In Team value of the rows it applies to). The
+# feature is NaN on the other rows.
+CONTEXT_FEATURES = {
+    'max_minutes_in_position_past_season': ('max_minutes', True),
+    'max_minutes_by_signing_past_season': ('max_minutes_by_signing', False),
+    'avg_ppg_position_team_high_minutes': ('avg_ppg_high_minutes', True),
+}
+
+def cube_keys(season, team_code, position):
+    """
+    Normalizes key columns for cube lookups: seasons as strings, team codes as floats
+    (team_code is categorical, integer or float depending on the table) and positions
+    as stored.
+    """
+    return pd.MultiIndex.from_arrays([
+        np.asarray(season, dtype=object).astype(str),
+        np.asarray(team_code, dtype='float64'),
+        np.asarray(position, dtype=object),
+    ], names=CUBE_KEYS)
+
+def team_position_keys(team_code, position):
+    """
+    Normalizes (team_code, position) pairs into a MultiIndex, with the same key types as
+    cube_keys.
+    """
+    return pd.MultiIndex.from_arrays([
+        np.asarray(team_code, dtype='float64'),
+        np.asarray(position, dtype=object),
+    ])
+
+def team_position_isin(df, pairs, columns=('team_code', 'Position')):
+    """
+    Flags the rows of df whose (team_code, position) pair appears in pairs.
+
+    The pairs are hashed once into an index and every row is looked up in it in one
+    vectorized call.
+
+    Args:
+        df (pd.DataFrame): The rows to test.
+        pairs (pd.DataFrame): The (team_code, position) pairs, in the same columns.
+        columns (list): The team code and position columns.
+
+    Returns:
+        np.ndarray: Boolean mask aligned with df.
+    """
+    team, position = columns
+    lookup = team_position_keys(pairs[team], pairs[position]).unique()
+    return lookup.get_indexer(team_position_keys(df[team], df[position])) >= 0
+
+def context_cube(df, stats=CUBE_STATS):
+    """
+    Aggregates every cube stat of df in one grouped pass.
+
+    Args:
+        df (pd.DataFrame): Player seasons with the key columns and the stats' columns.
+        stats (dict): The stats to compute, see CUBE_STATS.
+
+    Returns:
+        pd.DataFrame: One row per (season, team_code, Position) of df, with a column per stat.
+    """
+    values = pd.DataFrame({
+        'season': df['season'].astype(str).to_numpy(),
+        'team_code': np.asarray(df['team_code'], dtype='float64'),
+        'Position': np.asarray(df['Position'], dtype=object),
+    })
+    for stat, (column, row_filter, _, _) in stats.items():
+        column_values = df[column].reset_index(drop=True)
+        values[stat] = column_values if row_filter is None else column_values.where(row_filter(df).to_numpy())
+
+    position_stats = [stat for stat, (_, _, _, key) in stats.items() if key == 'position']
+    team_stats = [stat for stat, (_, _, _, key) in stats.items() if key == 'team']
+
+    # Not sorted: the current season's positions are element_type numbers, the past ones names
+    cube = values.groupby(CUBE_KEYS, sort=False)[position_stats] \
+                 .agg({stat: stats[stat][2] for stat in position_stats})
+    if team_stats:
+        # Team stats include the rows without a position, which have no cube row
+        team = values.groupby(['season', 'team_code'], sort=False)[team_stats] \
+                     .agg({stat: stats[stat][2] for stat in team_stats})
+        rows = team.index.get_indexer(cube.index.droplevel('Position'))
+        for stat in team_stats:
+            cube[stat] = team[stat].to_numpy()[rows]
+    return cube[list(stats)]
+
+def lookup(cube, season, team_code, position, stats):
+    """
+    Reads stats of the cube at the given keys in one index lookup.
+
+    Team stats are read from any position of the team, so they are found even when the
+    team had no player at the position.
+
+    Returns:
+        dict: stat -> array aligned with the keys, NaN where the cube has no row.
+    """
+    keys = cube_keys(season, team_code, position)
+    if cube.empty:
+        return {stat: np.full(len(keys), np.nan) for stat in stats}
+
+    rows = cube.index.get_indexer(keys)
+    team_index = cube.index.droplevel('Position')
+    first = np.flatnonzero(~team_index.duplicated())
+    team_found = team_index[first].get_indexer(keys.droplevel('Position'))
+    team_rows = np.where(team_found >= 0, first[team_found], -1)
+
+    looked_up = {}
+    for stat in stats:
+        stat_rows = team_rows if CUBE_STATS[stat][3] == 'team' else rows
+        values = cube[stat].to_numpy(dtype='float64')
+        looked_up[stat] = np.where(stat_rows >= 0, values[stat_rows], np.nan)
+    return looked_up
+
+def previous_season_context(df, cube, features=CONTEXT_FEATURES):
+    """
+    Computes context features of every row from the cube row of its team and position
+    in the previous season.
+
+    Args:
+        df (pd.DataFrame): Player rows with the key columns, New In Team and a
+            'previous_season' column (NaN for the first season).
+        cube (pd.DataFrame): The context cube, see context_cube.
+        features (dict): The features to compute, see CONTEXT_FEATURES.
+
+    Returns:
+        pd.DataFrame: One column per feature, aligned on df's index.
+    """
+    stats = lookup(cube, df['previous_season'], df['team_code'], df['Position'], [stat for stat, _ in features.values()])
+    new_in_team = df['New In Team'].to_numpy()
+    return pd.DataFrame({
+        feature: np.where(new_in_team == applies_to, stats[stat], np.nan)
+        for feature, (stat, applies_to) in features.items()
+    }, index=df.index)
+
+def read_context(history_file, path=CONTEXT_FILE):
+    """
+    Reads the cube written with a history table, or None if there is none at least as
+    recent as the history table.
+    """
+    if not os.path.exists(path) or not os.path.exists(history_file):
+        return None
+    if os.path.getmtime(path) < os.path.getmtime(history_file):
+        return None
+    cube = storage.read_table(path)
+    cube.index = cube_keys(cube['season'], cube['team_code'], cube['Position'])
+    return cube.drop(columns=CUBE_KEYS)
+
+def write_context(cube, path=CONTEXT_FILE):
+    """
+    Writes the cube next to the history table it was built from.
+    """
+    storage.write_table(cube.reset_index(), path)
@@ -0,0 +1,200 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import rule_engine
+import storage
+from data_loader import HISTORY_FILE
+from rule_engine import TIER_SPEC_FILE
+
+# Relationships whose thresholds are swept. The other filters of a rule (e.g.
+# 'New In Team' == False) stay fixed.
+SWEPT_RELATIONSHIPS = ['>=', '>', '<=', '<']
+
+# How the sweep works: every swept column is cut at its candidate thresholds once, so
+# each row gets one level per column (a binary search in the sorted grid). Rows are
+# counted per combination of levels, and suffix sums over every axis turn those
+# counts into the number of rows passing each threshold combination. Scoring all
+# the candidates of a rule is then a lookup in that cube, with no DataFrame filter.
+
+def target_mask(df, min_ppg=4.4, min_minutes=1200):
+    """
+    Flags the players of the target group: PPG > min_ppg and Min > min_minutes.
+    """
+    return ((df.PPG > min_ppg) & (df.Min > min_minutes)).to_numpy()
+
+def candidate_grid(values, steps, current):
+    """
+    Candidate thresholds of a column: `steps` quantiles of its values, plus the
+    current threshold, sorted and unique.
+    """
+    values = values[~np.isnan(values)]
+    quantiles = np.quantile(values, np.linspace(0.05, 0.95, steps)) if len(values) else np.array([])
+    return np.unique(np.append(quantiles, current))
+
+def threshold_levels(values, grid, relationship):
+    """
+    Binary-searches each value in the ascending grid.
+
+    Returns:
+        np.ndarray: For each value, the number of grid thresholds it passes, counted
+        from the start of the grid. NaN passes none.
+    """
+    side = 'right' if relationship in ('>=', '<=') else 'left'
+    levels = np.searchsorted(grid, values, side=side)
+    levels[np.isnan(values)] = 0
+    return levels
+
+def sweep_rule(history, rule, steps=20, position_column='Position', min_ppg=4.4, min_minutes=1200):
+    """
+    Scores every combination of candidate thresholds of a tier rule on historical seasons.
+
+    Args:
+        history (pd.DataFrame): Historical player seasons, as in fantasy_data_history.csv.
+        rule (dict): A rule of the tier spec. Manual name exclusions are not applied.
+        steps (int): Candidate thresholds per swept column.
+        position_column (str): Column holding the positions of the rule's scope.
+        min_ppg (float): PPG above which a player season is on target.
+        min_minutes (int): Minutes above which a player season is on target.
+
+    Returns:
+        pd.DataFrame: One row per combination with the thresholds, 'selected', 'hits',
+        'precision', 'recall', 'f1' and 'current' (True for the spec's thresholds).
+        None if the rule has no threshold to sweep.
+    """
+    swept = [f for f in rule['filters'] if f[1] in SWEPT_RELATIONSHIPS and not isinstance(f[2], bool)]
+    fixed = [f for f in rule['filters'] if f not in swept]
+    if not swept:
+        return None
+
+    # Rows in the rule's position scope, then the ones passing its fixed filters
+    if rule.get('positions'):
+        scope = np.flatnonzero(history[position_column].isin(rule['positions']).to_numpy())
+    else:
+        scope = np.arange(len(history))
+    target = target_mask(history, min_ppg, min_minutes)
+    scope_targets = target[scope].sum()
+
+    if fixed:
+        columns, relationships, values = zip(*fixed)
+        steps_fixed = rule_engine.compile_rule(list(columns), list(values), list(relationships))
+        rows = scope[rule_engine.evaluate(history, steps_fixed, scope)]
+    else:
+        rows = scope
+
+    grids, levels = [], []
+    for column, relationship, current in swept:
+        # Upper bounds are swept on negated values so every axis counts passes the same way
+        sign = -1 if relationship in ('<=', '<') else 1
+        values = sign * history[column].to_numpy(dtype='float64')[rows]
+        grid = candidate_grid(values, steps, sign * current)
+        grids.append((column, relationship, sign * grid))
+        levels.append(threshold_levels(values, grid, relationship))
+
+    shape = tuple(len(grid) + 1 for _, _, grid in grids)
+    cells = np.ravel_multi_index(levels, shape)
+    selected = np.bincount(cells, minlength=int(np.prod(shape))).reshape(shape)
+    hits = np.bincount(cells, weights=target[rows], minlength=int(np.prod(shape))).reshape(shape)
+
+    # Suffix sums: entry k of an axis counts the rows with a level above k
+    for axis in range(len(shape)):
+        selected = np.flip(np.cumsum(np.flip(selected, axis), axis), axis)
+        hits = np.flip(np.cumsum(np.flip(hits, axis), axis), axis)
+    passing = tuple(slice(1, None) for _ in shape)
+    selected, hits = selected[passing], hits[passing]
+
+    thresholds = np.meshgrid(*[grid for _, _, grid in grids], indexing='ij')
+    result = pd.DataFrame({f'{column} {relationship}': values.ravel()
+                           for (column, relationship, _), values in zip(grids, thresholds)})
+    result['selected'] = selected.ravel()
+    result['hits'] = hits.ravel().astype('int64')
+    result['precision'] = result['hits'] / result['selected'].replace(0, np.nan)
+    result['recall'] = result['hits'] / scope_targets if scope_targets else np.nan
+    result['f1'] = 2 * result['precision'] * result['recall'] / (result['precision'] + result['recall'])
+    result['current'] = np.logical_and.reduce([
+        np.isclose(result[f'{column} {relationship}'], current) for column, relationship, current in swept
+    ])
+    return result
+
+def sweep_task(args):
+    """
+    Runs sweep_rule for one (tier, rule) in a worker process.
+    """
+    history, tier_name, rule, steps, position_column = args
+    result = sweep_rule(history, rule, steps, position_column)
+    if result is not None:
+        result.insert(0, 'rule', rule['name'])
+        result.insert(0, 'tier', tier_name)
+    return result
+
+def sweep_spec(history, spec, tiers=None, steps=20, position_column='Position', workers=1):
+    """
+    Sweeps the thresholds of every rule of a tier spec, one rule per worker.
+
+    Rules using columns missing from history (e.g. current-season only features) are skipped.
+
+    Args:
+        history (pd.DataFrame): Historical player seasons.
+        spec (dict): The tier spec.
+        tiers (list): Names of the tiers to sweep. Sweeps every tier if None.
+        steps (int): Candidate thresholds per swept column.
+        position_column (str): Column holding the positions in history.
+        workers (int): Number of worker processes.
+
+    Returns:
+        pd.DataFrame: The scored combinations of all rules, with tier and rule columns.
+    """
+    tasks = []
+    for tier in spec['tiers']:
+        if tiers is not None and tier['name'] not in tiers:
+            continue
+        for rule in tier['rules']:
+            missing = [f[0] for f in rule['filters'] if f[0] not in history.columns]
+            if missing:
+                print(f"Skipping {tier['name']} / {rule['name']}: {', '.join(missing)} not in the history table")
+                continue
+            tasks.append((history, tier['name'], rule, steps, position_column))
+
+    if workers <= 1 or len(tasks) <= 1:
+        results = [sweep_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(sweep_task, tasks))
+
+    results = [result for result in results if result is not None]
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results, ignore_index=True)
+
+def main(spec_file=TIER_SPEC_FILE, tiers=None, steps=20, workers=1, top=5, output=None):
+    """
+    Sweeps the tier thresholds against the historical seasons and prints the best
+    combinations of each rule next to the current ones.
+    """
+    history = storage.read_table(HISTORY_FILE)
+    spec = rule_engine.load_tier_spec(spec_file)
+    results = sweep_spec(history, spec, tiers, steps, workers=workers)
+
+    for (tier, rule), group in results.groupby(['tier', 'rule'], sort=False):
+        group = group.dropna(axis=1, how='all')
+        print(f"\n{tier} / {rule}: {len(group)} combinations")
+        print(pd.concat([group[group.current], group.sort_values('f1', ascending=False).head(top)]).to_string(index=False))
+
+    if output:
+        results.to_csv(output, index=False)
+
+def command_line(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description='Sweep the tier thresholds against the historical seasons.')
+    parser.add_argument('--spec', default=TIER_SPEC_FILE, help='tier spec file')
+    parser.add_argument('--tier', nargs='+', help='tiers to sweep (default: all)')
+    parser.add_argument('--steps', type=int, default=20, help='candidate thresholds per column')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes')
+    parser.add_argument('--top', type=int, default=5, help='best combinations printed per rule')
+    parser.add_argument('--output', help='CSV file for all the scored combinations')
+    args = parser.parse_args(argv)
+    main(args.spec, args.tier, args.steps, args.workers, args.top, args.output)
+
+if __name__ == '__main__':
+    command_line()